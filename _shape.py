@@ -21,6 +21,7 @@ import pymel.core.nodetypes as nt
 import pymel.core.datatypes as dt
 import maya.api.OpenMaya as om
 from pymel.internal.factories import virtualClasses
+import nodes
 
 ##### UTILITY FUNCTIONS #####
 
@@ -63,7 +64,7 @@ def create_shape_from_data(data):
     :return: The Transform node of the new shape.
     '''
 
-    assert isinstance(data, list), 'Data must be a list, received: %s' % str(type(data))
+    assert isinstance(data, (list, nodes.ShapeData)), 'Data must be a list, received: %s' % str(type(data))
     return ControlCurve(data=data).parent
 
 def set_shape_from_data(node, data):
@@ -77,7 +78,7 @@ def set_shape_from_data(node, data):
 
     assert isinstance(node, nt.Transform), 'Node must be a Transform, received: %s' % str(type(node))
     assert len(node.getShapes()) > 0, 'No shape found.'
-    assert isinstance(data, list), 'Data must be a list, received: %s' % str(type(data))
+    assert isinstance(data, (list, nodes.ShapeData)), 'Data must be a list, received: %s' % str(type(data))
 
     return ControlCurve(data=data, parent=node)
 
@@ -91,10 +92,7 @@ def set_shape_color(node, color):
     assert isinstance(node, nt.Transform), 'Node must be a Transform, received: %s' % str(type(node))
     assert len(node.getShapes()) > 0, 'No shape found.'
 
-    for shape in node.getShapes():
-        shape.overrideEnabled.set(True)
-        shape.overrideRGBColors.set(True)
-        shape.overrideColorRGB.set(color)
+    nodes.Shape.setColors([shape.name() for shape in node.getShapes()], [color[0], color[1], color[2]], undoable=True)
 
 
 ##### CLASSES #####
@@ -249,10 +247,7 @@ class ControlCurve(nt.Transform):
         :param node: The node to modify.
         :param color: The color to switch to.
         '''
-        for shape in node.getShapes():
-            shape.overrideEnabled.set(True)
-            shape.overrideRGBColors.set(True)
-            shape.overrideColorRGB.set(color)
+        nodes.Shape.setColors([shape.name() for shape in node.getShapes()], [color[0], color[1], color[2]], undoable=True)
 
 
     ##### Public Methods #####
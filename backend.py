@@ -0,0 +1,118 @@
+'''
+Selects the scene backend the library runs against.
+
+Modules import cmds, om and pmc from here instead of importing maya directly. These are proxies forwarding
+to either the live Maya modules or the in-memory stand-ins in the headless package, so rigs can be built,
+timed and call-counted on machines without a Maya license.
+
+The backend defaults to maya when it can be imported and falls back to headless otherwise.
+Setting the MAYALIB_BACKEND environment variable to maya or headless forces one or the other.
+
+Modules are only imported the first time something is looked up on their proxy, so code sticking to cmds and
+OpenMaya never pays for importing pymel.
+'''
+
+import importlib
+import os
+import sys
+
+BACKENDS = {
+    'maya': {
+        'cmds': 'maya.cmds',
+        'om': 'maya.api.OpenMaya',
+        'pmc': 'pymel.core',
+        'factories': 'pymel.internal.factories',
+    },
+    'headless': {
+        'cmds': 'headless.cmds',
+        'om': 'headless.OpenMaya',
+        'pmc': 'headless.pymel',
+        'factories': 'headless.pymel',
+    },
+}
+
+
+class ModuleProxy(object):
+    '''
+    Forwards attribute access to whichever module is active for its role, importing it on first use.
+    '''
+
+    def __init__(self, role):
+        self.__dict__['_role'] = role
+        self.__dict__['_path'] = None
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._load()
+        return getattr(module, attr)
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('Backend modules are read only, use backend.use() to switch them.')
+
+    def __repr__(self):
+        return '<backend %s: %r>' % (self._role, self._module or self._path)
+
+    def _set(self, path):
+        self.__dict__['_path'] = path
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = importlib.import_module(self._path)
+        self.__dict__['_module'] = module
+        return module
+
+
+cmds = ModuleProxy('cmds')
+om = ModuleProxy('om')
+pmc = ModuleProxy('pmc')
+factories = ModuleProxy('factories')
+
+_proxies = {'cmds': cmds, 'om': om, 'pmc': pmc, 'factories': factories}
+_active = None
+
+
+def use(name):
+    '''
+    Switches every proxy over to the given backend. The modules themselves are imported when first used.
+    Classes deriving from backend types (such as control_rig.RigNode) keep the base they were defined with,
+    so pick the backend before importing those modules.
+    :param name: Either 'maya' or 'headless'.
+    '''
+    global _active
+    assert name in BACKENDS, 'Unknown backend: %s' % name
+    for role, path in BACKENDS[name].items():
+        _proxies[role]._set(path)
+    _active = name
+
+
+def loaded(role):
+    '''
+    Checks whether the module behind a proxy has been imported, by the library or anyone else.
+    A PyNode can only exist once pymel has been imported, so this lets callers skip pymel checks until then.
+    :param role: One of 'cmds', 'om', 'pmc' or 'factories'.
+    :return: True if the active module for the role is imported.
+    '''
+    return _proxies[role]._path in sys.modules
+
+
+def active():
+    '''
+    :return: The name of the active backend.
+    '''
+    return _active
+
+
+def _default():
+    name = os.environ.get('MAYALIB_BACKEND')
+    if name:
+        return name
+    try:
+        importlib.import_module('maya.cmds')
+    except ImportError:
+        return 'headless'
+    return 'maya'
+
+
+use(_default())
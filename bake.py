@@ -1,4 +1,4 @@
-import pymel.core as pmc
+from backend import cmds
 import logging
 
 class BakeRange(object):
@@ -6,8 +6,7 @@ class BakeRange(object):
     def __init__(self, time_range=None, callback=None):
 
         if not time_range:
-            time_range = (pmc.playbackOptions(minTime=True, q=True), pmc.playbackOptions(maxTime=True, q=True))
+            time_range = (cmds.playbackOptions(minTime=True, q=True), cmds.playbackOptions(maxTime=True, q=True))
 
         for frame in range(int(time_range[1] - time_range[0])):
-            print frame
             callback(frame + time_range[0])
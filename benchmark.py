@@ -0,0 +1,743 @@
+'''
+Times the hot paths of the library against the headless backend and checks them against stored baselines.
+
+Each case reports its best wall time over a few repeats along with the number of cmds, OpenMaya and pymel calls
+it made. Call counts are deterministic, so any increase over the baseline is flagged. Wall times depend on the machine
+and its load, so they are only checked with --time, against baselines saved on the same machine.
+The import cases time each module being imported by a fresh interpreter and report whether pymel came with it.
+
+Usage:
+    python benchmark.py                       Run every case and compare against benchmark_baseline.json
+    python benchmark.py buffer fk_chain       Only run cases whose name contains one of the filters
+    python benchmark.py --save                Run and store the results as the new baselines
+    python benchmark.py --time                Also fail when wall times grow past the baseline by 25%
+    python benchmark.py --time --threshold 0.5    Allow wall times to grow by 50% before failing
+'''
+
+import argparse
+import ast
+import collections
+import json
+import os
+import pprint
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import backend
+backend.use('headless')
+
+import headless
+from backend import cmds, om, pmc
+import bake
+import control_rig
+import controls
+import nodes
+import shape_library
+from nodes import AttributeBatch, ShapeData, Transform, ControlCurve
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+# Sub-millisecond cases jitter by more than any sensible threshold, so allow this much on top of it
+TIME_SLACK = 0.001
+
+Result = collections.namedtuple('Result', ['name', 'seconds', 'calls', 'breakdown', 'operations', 'stats'])
+
+_cases = collections.OrderedDict()
+
+
+def benchmark(name, repeat=5, operations=1):
+    '''
+    Registers a benchmark case.
+    The decorated function builds whatever scene the case needs and returns a callable doing the timed work.
+    Both run against a freshly reset headless scene on every repeat.
+    If the timed work returns a dict, it is reported alongside the timings as extra stats.
+    :param name: The name the case is reported and stored under.
+    :param repeat: How many times to run the case, the best time is kept.
+    :param operations: How many operations the timed work performs, used to report the cost per operation.
+    '''
+    def register(func):
+        _cases[name] = (func, repeat, operations)
+        return func
+    return register
+
+
+def shape_presets():
+    '''
+    :return: The names of every preset shape on ShapeData.
+    '''
+    return ShapeData.presetNames()
+
+
+def create_joint_chain(count, length=10.0):
+    '''
+    Creates a straight chain of joints along x.
+    :param count: The number of joints.
+    :param length: The distance between each joint.
+    :return: The joints as a list of PyNodes, from root to tip.
+    '''
+    joints = []
+    parent = None
+    for index in range(count):
+        kwargs = {'parent': parent} if parent else {}
+        joint = cmds.createNode('joint', name='joint%d' % (index + 1), **kwargs)
+        if parent:
+            cmds.setAttr(joint + '.translateX', length)
+        joints.append(pmc.PyNode(joint))
+        parent = joint
+    return joints
+
+
+def create_buffered_control(depth):
+    control = ControlCurve.create('bench_CTRL')
+    for index in range(depth):
+        control.addBuffer(suffix='BUF%d' % (index + 1))
+    return control
+
+
+def create_control_rig(chains=50, length=10):
+    '''
+    Creates a rig of buffered controls, each chain parented control under control.
+    :param chains: The number of chains.
+    :param length: The number of controls in each chain.
+    :return: Every control in the rig.
+    '''
+    rig = []
+    for chain in range(chains):
+        parent = None
+        for index in range(length):
+            control = ControlCurve.create('chain%d_%d_CTRL' % (chain, index))
+            control.setTranslation([index * 10, chain * 10, 0])
+            control.addBuffer()
+            if parent:
+                pmc.parent(control.getTopBuffer().name, parent.name)
+            rig.append(control)
+            parent = control
+    return rig
+
+
+##### Cases #####
+
+def _register_shape_cases():
+    for preset in shape_presets():
+        def case(preset=preset):
+            return lambda: ControlCurve.create('bench_CTRL', shapeType=preset)
+        benchmark('ControlCurve.create[%s]' % preset)(case)
+
+        def bulk_case(preset=preset, count=1000):
+            def work():
+                for index in range(count):
+                    ControlCurve.create('bench%d_CTRL' % index, shapeType=preset, undoable=False)
+                return {'transforms': len(cmds.ls(type='transform'))}
+            return work
+        benchmark('ControlCurve.create[%s,controls=1000]' % preset, repeat=1, operations=1000)(bulk_case)
+
+
+def _register_shape_data_cases(repeat=100):
+    matrix = om.MMatrix([0, 1.5, 0, 0, -1.5, 0, 0, 0, 0, 0, 1.5, 0, 2, 3, 4, 1])
+    for preset in ('starburst', 'sphere', 'fourarrow'):
+        def case(preset=preset):
+            data = getattr(ShapeData, preset)()
+
+            def work():
+                for _ in range(repeat):
+                    data.transformCVs(matrix)
+                return {'cvs': sum(len(cvs) for cvs in data.cvs)}
+            return work
+        benchmark('ShapeData.transformCVs[%s]' % preset, operations=repeat)(case)
+
+    for preset in ('circle', 'fourarrow'):
+        def preset_case(preset=preset, count=1000):
+            build = getattr(ShapeData, preset)
+
+            def work():
+                shapes = [build() for _ in range(count)]
+                return {'pointArrays': len(set(id(data._points) for data in shapes))}
+            return work
+        benchmark('ShapeData.%s[calls=1000]' % preset, operations=1000)(preset_case)
+
+
+def _register_library_cases(count=1000, loads=100):
+    presets = shape_presets()
+    shapes = collections.OrderedDict(
+        ('shape%04d' % index, getattr(ShapeData, presets[index % len(presets)])()) for index in range(count))
+    names = list(shapes)[::count // loads]
+    literal = pprint.pformat(dict((name, data.asList()) for name, data in shapes.items()))
+
+    def library_case():
+        handle, path = tempfile.mkstemp(suffix='.mlsh')
+        os.close(handle)
+        shape_library.writeLibrary(path, shapes)
+
+        def work():
+            try:
+                with shape_library.ShapeLibrary(path) as library:
+                    for name in names:
+                        library.load(name)
+                return {'fileBytes': os.path.getsize(path), 'literalBytes': len(literal)}
+            finally:
+                os.remove(path)
+        return work
+    benchmark('ShapeLibrary.load[shapes=%d]' % count, repeat=3, operations=loads)(library_case)
+
+    def literal_case():
+        def work():
+            library = ast.literal_eval(literal)
+            for name in names:
+                ShapeData(library[name])
+        return work
+    benchmark('ShapeLibrary.literal[shapes=%d]' % count, repeat=3, operations=loads)(literal_case)
+
+
+def create_shape_directory(libraries=10, shapes=100):
+    '''
+    Writes a directory of shape libraries, cycling through the presets.
+    :param libraries: The number of library files.
+    :param shapes: The number of shapes in each library.
+    :return: The directory, which the caller should remove.
+    '''
+    presets = shape_presets()
+    directory = tempfile.mkdtemp()
+    for library in range(libraries):
+        names = ['library%d_shape%d' % (library, index) for index in range(shapes)]
+        shape_library.writeLibrary(os.path.join(directory, 'library%d.mlsh' % library), collections.OrderedDict(
+            (name, getattr(ShapeData, presets[index % len(presets)])()) for index, name in enumerate(names)))
+    return directory
+
+
+def _register_registry_cases(libraries=10, shapes=100, controls=100):
+    def refresh_case():
+        directory = create_shape_directory(libraries, shapes)
+
+        def work():
+            try:
+                registry = shape_library.ShapeRegistry([directory])
+                registry.refresh()
+                return {'shapes': len(registry)}
+            finally:
+                shutil.rmtree(directory)
+        return work
+    name = 'ShapeRegistry.refresh[libraries=%d,shapes=%d]' % (libraries, libraries * shapes)
+    benchmark(name, repeat=3, operations=libraries)(refresh_case)
+
+    def create_case():
+        directory = create_shape_directory(libraries, shapes)
+        names = ['library%d_shape%d' % (index % 4, index % 5) for index in range(controls)]
+
+        def work():
+            registry = shape_library.registry
+            shape_library.registry = shape_library.ShapeRegistry([directory], cacheSize=32)
+            try:
+                for index, shapeType in enumerate(names):
+                    ControlCurve.create('registry%d_CTRL' % index, shapeType=shapeType)
+                return shape_library.registry.stats()
+            finally:
+                shape_library.registry.clear()
+                shape_library.registry = registry
+                shutil.rmtree(directory)
+        return work
+    benchmark('ControlCurve.create[registry,controls=%d]' % controls, repeat=3, operations=controls)(create_case)
+
+
+def _register_dedupe_cases(chains=50, length=10):
+    def case():
+        rig = create_control_rig(chains, length)
+        for index, control in enumerate(rig):
+            if index % 5 == 0:
+                control.scaleShape([2, 2, 2])
+
+        def work():
+            index = shape_library.ShapeIndex()
+            index.addControls(rig)
+            return index.stats()
+        return work
+    count = chains * length
+    benchmark('ShapeIndex.addControls[controls=%d]' % count, repeat=3, operations=count)(case)
+
+
+def _register_stream_cases(chains=50, length=10):
+    count = chains * length
+
+    def export_case():
+        rig = create_control_rig(chains, length)
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+
+        def work():
+            try:
+                shape_library.exportControls(path, rig)
+                with open(path) as stream:
+                    longest = max(len(line) for line in stream)
+                return {'fileBytes': os.path.getsize(path), 'longestLine': longest}
+            finally:
+                os.remove(path)
+        return work
+    benchmark('exportControls[controls=%d]' % count, repeat=3, operations=count)(export_case)
+
+    def import_case():
+        rig = create_control_rig(chains, length)
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        shape_library.exportControls(path, rig)
+
+        def work():
+            try:
+                return {'controls': shape_library.importControls(path)}
+            finally:
+                os.remove(path)
+        return work
+    benchmark('importControls[controls=%d]' % count, repeat=3, operations=count)(import_case)
+
+    def pformat_case():
+        rig = create_control_rig(chains, length)
+        return lambda: {'bytes': len(pprint.pformat([control.getShapeData().asList() for control in rig]))}
+    benchmark('pformat[controls=%d]' % count, repeat=3, operations=count)(pformat_case)
+
+
+def _register_simplify_cases(tolerances=(1.0, 2.0, 5.0), count=100):
+    for preset in ('starburst', 'sphere', 'fourarrow', 'cross'):
+        def case(preset=preset):
+            data = getattr(ShapeData, preset)()
+            data.transformCVs([10, 0, 0, 0, 0, 10, 0, 0, 0, 0, 10, 0, 0, 0, 0, 1])
+
+            def work():
+                stats = {'cvs': data.getCVCount()}
+                for level, (simplified, deviation) in enumerate(data.buildLODs(tolerances)):
+                    stats['lod%dCvs' % level] = simplified.getCVCount()
+                    stats['lod%dDeviation' % level] = deviation
+                return stats
+            return work
+        benchmark('ShapeData.buildLODs[%s]' % preset, operations=len(tolerances))(case)
+
+    def bulk_case():
+        rig = [ControlCurve.create('simplify%d_CTRL' % index, shapeType='starburst') for index in range(count)]
+        for control in rig:
+            control.scaleShape([10, 10, 10])
+        return lambda: controls.simplify_controls(rig, tolerances[1])
+    benchmark('simplify_controls[controls=%d]' % count, repeat=3, operations=count)(bulk_case)
+
+
+def _register_create_many_cases(count=500):
+    names = ['finger%d_CTRL' % index for index in range(count)]
+    matrices = [om.MMatrix([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, index, 0, 0, 1]) for index in range(count)]
+    colors = [[1, 0.5, 0]] * count
+
+    def one_by_one_case():
+        root = Transform.create('root')
+
+        def work():
+            start = timeit.default_timer()
+            for name, matrix, color in zip(names, matrices, colors):
+                control = ControlCurve.create(name)
+                control.setMatrix(matrix, worldSpace=True)
+                control.setColor(color)
+                buffer = control.addBuffer()
+                cmds.parent(buffer.name, root.name)
+            return {'controlsPerSecond': count / (timeit.default_timer() - start)}
+        return work
+    benchmark('ControlCurve.create+addBuffer[controls=%d]' % count, repeat=3, operations=count)(one_by_one_case)
+
+    def create_many_case():
+        root = Transform.create('root')
+        parents = [root] * count
+
+        def work():
+            start = timeit.default_timer()
+            ControlCurve.createMany(names, 'circle', matrices, parents, colors)
+            return {'controlsPerSecond': count / (timeit.default_timer() - start)}
+        return work
+    benchmark('ControlCurve.createMany[controls=%d]' % count, repeat=3, operations=count)(create_many_case)
+
+    for mode, instance in (('unique', False), ('instanced', True)):
+        def shared_case(instance=instance):
+            root = Transform.create('root')
+            parents = [root] * count
+
+            def work():
+                ControlCurve.createMany(names, 'sphere', matrices, parents, colors, instance=instance)
+                return {'shapeNodes': len(cmds.ls(type='nurbsCurve'))}
+            return work
+        benchmark('ControlCurve.createMany[controls=%d,sphere,%s]' % (count, mode), repeat=3, operations=count)(
+            shared_case)
+
+    def collapse_case():
+        rig = create_control_rig(10, count // 10)
+
+        def work():
+            stats = controls.collapse_control_shapes(rig)
+            stats['shapeNodes'] = len(cmds.ls(type='nurbsCurve'))
+            return stats
+        return work
+    benchmark('collapse_control_shapes[controls=%d]' % count, repeat=3, operations=count)(collapse_case)
+
+
+def _register_buffer_cases():
+    for depth in range(1, 21):
+        def add_case(depth=depth):
+            control = create_buffered_control(depth - 1)
+            return control.addBuffer
+        benchmark('Transform.addBuffer[depth=%d]' % depth)(add_case)
+
+        def get_case(depth=depth):
+            control = create_buffered_control(depth)
+            return control.getBuffers
+        benchmark('Transform.getBuffers[depth=%d]' % depth)(get_case)
+
+
+def _register_fk_chain_cases():
+    for count, repeat in ((10, 5), (100, 3), (1000, 1)):
+        def case(count=count):
+            joints = create_joint_chain(count)
+            return lambda: controls.build_fk_chain(joints)
+        benchmark('build_fk_chain[joints=%d]' % count, repeat=repeat)(case)
+
+
+def walk_to_root(node):
+    parent = node.getParent()
+    while parent:
+        parent = parent.getParent()
+
+
+def _register_rig_cases(chains=50, length=10):
+    count = chains * length
+    matrix = om.MMatrix([1.5, 0, 0, 0, 0, 1.5, 0, 0, 0, 0, 1.5, 0, 0, 0, 0, 1])
+    work = (
+        ('Node.dagPath', lambda control: control.dagPath),
+        ('Node.mObject', lambda control: control.mObject),
+        ('Node.mFnDagNode', lambda control: control.mFnDagNode),
+        ('Transform.setTranslation', lambda control: control.setTranslation([0, 1, 0])),
+        ('Transform.setRotation', lambda control: control.setRotation([0, 45, 0])),
+        ('Transform.getShapes', lambda control: control.getShapes()),
+        ('Transform.getParent', walk_to_root),
+        ('ControlCurve.transformShape', lambda control: control.transformShape(matrix)),
+        ('ControlCurve.setColor', lambda control: control.setColor([1, 0.5, 0])),
+        ('Transform.lockTransform', lambda control: control.lockTransform(True, True, True, hide=True)),
+        ('ControlCurve.fitToSize', lambda control: control.fitToSize(5)),
+    )
+    for name, func in work:
+        def case(func=func):
+            rig = create_control_rig(chains, length)
+            return lambda: [func(control) for control in rig]
+        benchmark('%s[controls=%d]' % (name, count), repeat=3, operations=count)(case)
+
+    def shape_edits(control):
+        control.rotateShape([0, 0, 90])
+        control.scaleShape([10, 10, 10])
+        control.translateShape([0, 1, 0])
+
+    def deferred_shape_edits(control):
+        with control.deferShapeTransforms():
+            shape_edits(control)
+
+    for mode, edit in (('immediate', shape_edits), ('deferred', deferred_shape_edits)):
+        def edit_case(edit=edit):
+            rig = create_control_rig(chains, length)
+            return lambda: [edit(control) for control in rig]
+        name = 'ControlCurve.shapeEdits[controls=%d,%s]' % (count, mode)
+        benchmark(name, repeat=3, operations=count)(edit_case)
+
+    def transform_shapes_case():
+        rig = create_control_rig(chains, length)
+        return lambda: ControlCurve.transformShapes(rig, matrix, worldSpace=True)
+    benchmark('ControlCurve.transformShapes[controls=%d]' % count, repeat=3, operations=count)(transform_shapes_case)
+
+    def batch_case():
+        rig = create_control_rig(chains, length)
+
+        def work():
+            with AttributeBatch() as batch:
+                for control in rig:
+                    control.lockTransform(True, True, True, hide=True, batch=batch)
+                    control.setColor([1, 0.5, 0], batch=batch)
+        return work
+    benchmark('AttributeBatch[controls=%d]' % count, repeat=3, operations=count)(batch_case)
+
+    for mode, preset in (('sameTopology', 'circle'), ('newTopology', 'sphere')):
+        def set_shape_case(preset=preset):
+            rig = create_control_rig(chains, length)
+            data = getattr(ShapeData, preset)()
+            data.transformCVs(matrix)
+
+            def work():
+                stats = collections.Counter()
+                for control in rig:
+                    stats.update(control.setShape(data, undoable=False))
+                return dict(stats)
+            return work
+        benchmark('ControlCurve.setShape[controls=%d,%s]' % (count, mode), repeat=3, operations=count)(set_shape_case)
+
+    sides = ['left', 'right', 'center']
+
+    def color_loop_case():
+        rig = create_control_rig(chains, length)
+        colors = [nodes.resolveColor(sides[index % 3]) for index in range(count)]
+
+        def work():
+            for control, color in zip(rig, colors):
+                for shape in control.shapes:
+                    shape.setColor(color)
+        return work
+    benchmark('Shape.setColor[controls=%d,loop]' % count, repeat=3, operations=count)(color_loop_case)
+
+    for mode, recolor in (('bulk', False), ('recolor', True)):
+        def color_bulk_case(recolor=recolor):
+            rig = create_control_rig(chains, length)
+            colors = [sides[index % 3] for index in range(count)]
+            if recolor:
+                # Only every tenth control ends up with a different color
+                ControlCurve.setColors(rig, [sides[(index + (index % 10 == 0)) % 3] for index in range(count)])
+            return lambda: {'changed': ControlCurve.setColors(rig, colors)}
+        benchmark('ControlCurve.setColors[controls=%d,%s]' % (count, mode), repeat=3, operations=count)(
+            color_bulk_case)
+
+    def getattr_case():
+        rig = create_control_rig(chains, length)
+        shapes = [shape for control in rig for shape in control.shapes]
+
+        def work():
+            nodes.schemaCache.clear()
+            for _ in range(10):
+                for control in rig:
+                    control.visibility
+                    control.translateX
+                for shape in shapes:
+                    shape.overrideEnabled
+            return nodes.schemaCache.stats()
+        return work
+    benchmark('Node.__getattr__[controls=%d]' % count, repeat=3, operations=count * 10)(getattr_case)
+
+    for interned in (False, True):
+        def registry_case(interned=interned):
+            nodes.registry.clear()
+            nodes.registry.enabled = interned
+            rig = create_control_rig(chains, length)
+
+            def work():
+                try:
+                    for _ in range(10):
+                        for control in rig:
+                            control.getTopBuffer()
+                            for shape in control.shapes:
+                                shape.overrideEnabled
+                    return {'hits': nodes.registry.hits, 'misses': nodes.registry.misses,
+                            'interned': len(nodes.registry)}
+                finally:
+                    nodes.registry.enabled = False
+                    nodes.registry.clear()
+            return work
+        name = 'NodeRegistry[controls=%d,%s]' % (count, 'on' if interned else 'off')
+        benchmark(name, repeat=3, operations=count * 10)(registry_case)
+
+
+def wrapper_bytes(obj):
+    '''
+    :return: The size of an object along with its instance dict, if it has one, and any dicts, lists or sets it
+        holds in its slots.
+    '''
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    slots = set(slot for cls in type(obj).__mro__ for slot in getattr(cls, '__slots__', ()))
+    for slot in slots:
+        value = getattr(obj, slot, None)
+        if isinstance(value, (dict, list, set, frozenset)):
+            size += sys.getsizeof(value)
+    return size
+
+
+def _register_memory_cases(chains=50, length=10):
+    count = chains * length
+    wrappers = (
+        ('Transform', lambda control: Transform.fromMObject(control.mObject)),
+        ('Attribute', lambda control: nodes.Attribute('translateX', control)),
+        ('Struct', lambda control: control_rig.Struct(joint=control, control=control)),
+    )
+    for name, wrap in wrappers:
+        def case(wrap=wrap):
+            rig = create_control_rig(chains, length)
+
+            def work():
+                wrapped = [wrap(control) for control in rig]
+                total = sum(wrapper_bytes(wrapper) for wrapper in wrapped)
+                return {'bytesPerWrapper': total // len(wrapped)}
+            return work
+        benchmark('memory[%s,wrappers=%d]' % (name, count), repeat=3, operations=count)(case)
+
+
+_IMPORT_SCRIPT = '''
+import json, sys, timeit
+start = timeit.default_timer()
+import backend
+__import__(sys.argv[1])
+seconds = timeit.default_timer() - start
+print(json.dumps({'importSeconds': seconds, 'pymel': backend.loaded('pmc')}))
+'''
+
+
+def _register_import_cases():
+    modules = ('context_library', 'bake', 'nodes', 'controls', 'component', 'control_rig')
+    for module in modules:
+        def case(module=module):
+            env = dict(os.environ, MAYALIB_BACKEND='headless')
+            root = os.path.dirname(os.path.abspath(__file__))
+            command = [sys.executable, '-c', _IMPORT_SCRIPT, module]
+            return lambda: json.loads(subprocess.check_output(command, cwd=root, env=env).decode())
+        benchmark('import[%s]' % module, repeat=3)(case)
+
+
+_register_shape_cases()
+_register_shape_data_cases()
+_register_library_cases()
+_register_registry_cases()
+_register_dedupe_cases()
+_register_stream_cases()
+_register_simplify_cases()
+_register_create_many_cases()
+
+
+@benchmark('ControlCurve.transformShape')
+def transform_shape():
+    control = ControlCurve.create('bench_CTRL', shapeType='sphere')
+    control.setRotation([30, 45, 0], worldSpace=True)
+    matrix = om.MMatrix([2, 0, 0, 0, 0, 2, 0, 0, 0, 0, 2, 0, 0, 0, 0, 1])
+    return lambda: control.transformShape(matrix, worldSpace=True)
+
+
+_register_buffer_cases()
+_register_fk_chain_cases()
+_register_rig_cases()
+_register_memory_cases()
+_register_import_cases()
+
+
+@benchmark('FKIKBlendComponent')
+def fkik_blend_component():
+    joints = create_joint_chain(3)
+    fk_control = ControlCurve.create('proto_CTRL')
+    return lambda: control_rig.FKIKBlendComponent(list(joints), fk_control=fk_control.node, name='arm')
+
+
+@benchmark('RigComponent.bake[frames=1000]', repeat=1)
+def rig_component_bake():
+    joints = create_joint_chain(3)
+    fk_control = ControlCurve.create('proto_CTRL')
+    component = control_rig.FKIKBlendComponent(joints, fk_control=fk_control.node, name='arm')
+    return lambda: bake.BakeRange(time_range=(1, 1001), callback=lambda frame: component.bake(time=frame))
+
+
+##### Running #####
+
+def run_case(name):
+    '''
+    Runs a single case.
+    :param name: The registered name of the case.
+    :return: A Result holding the best time and the call counts of the timed work.
+    '''
+    func, repeat, operations = _cases[name]
+    best = None
+    calls = None
+    stats = None
+    for _ in range(repeat):
+        headless.reset()
+        work = func()
+        headless.calls.clear()
+        start = timeit.default_timer()
+        returned = work()
+        seconds = timeit.default_timer() - start
+        if isinstance(returned, dict):
+            stats = returned
+        if best is None or seconds < best:
+            best = seconds
+        calls = collections.Counter(headless.calls)
+    return Result(name, best, sum(calls.values()), calls, operations, stats)
+
+
+def load_baselines(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_baselines(results, path=BASELINE_PATH):
+    baselines = load_baselines(path)
+    for result in results:
+        baselines[result.name] = {'seconds': round(result.seconds, 6), 'calls': result.calls}
+    with open(path, 'w') as handle:
+        json.dump(baselines, handle, indent=4, sort_keys=True, separators=(',', ': '))
+        handle.write('\n')
+
+
+def compare(result, baseline, threshold=None):
+    '''
+    Compares a result against its stored baseline.
+    :param result: The Result to check.
+    :param baseline: The stored baseline dict, or None if the case has none yet.
+    :param threshold: The fraction wall time may grow by before it counts as a regression, or None to only check
+        the call count.
+    :return: A list of regression messages, empty if the result is within bounds.
+    '''
+    if not baseline:
+        return []
+    regressions = []
+    if result.calls > baseline['calls']:
+        regressions.append('calls %d > %d' % (result.calls, baseline['calls']))
+    if threshold is None:
+        return regressions
+    limit = baseline['seconds'] * (1.0 + threshold) + TIME_SLACK
+    if result.seconds > limit:
+        regressions.append('time %.4fs > %.4fs' % (result.seconds, limit))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks the library against the headless backend.')
+    parser.add_argument('filters', nargs='*', help='Only run cases whose name contains one of these.')
+    parser.add_argument('--save', action='store_true', help='Store the results as the new baselines.')
+    parser.add_argument('--time', action='store_true',
+                        help='Also fail on wall times, only meaningful against baselines saved on this machine.')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Fraction wall time may grow by before failing with --time (default %(default)s).')
+    parser.add_argument('--breakdown', type=int, default=0, metavar='N',
+                        help='Print the N most frequent calls of each case.')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='The baseline file to compare against.')
+    options = parser.parse_args(args)
+
+    names = [name for name in _cases if not options.filters or any(f in name for f in options.filters)]
+    baselines = load_baselines(options.baseline)
+    results = []
+    failures = 0
+
+    print('%-44s %12s %12s %10s %10s %10s' % ('case', 'seconds', 'baseline', 'calls', 'baseline', 'us/op'))
+    for name in names:
+        result = run_case(name)
+        results.append(result)
+        baseline = baselines.get(name)
+        regressions = compare(result, baseline, options.threshold if options.time else None)
+        failures += bool(regressions)
+        print('%-44s %12.6f %12s %10d %10s %10.1f %s' % (
+            name, result.seconds,
+            '%.6f' % baseline['seconds'] if baseline else '-',
+            result.calls,
+            baseline['calls'] if baseline else '-',
+            result.seconds * 1e6 / result.operations,
+            'REGRESSED: ' + ', '.join(regressions) if regressions else ''))
+        for key, value in sorted((result.stats or {}).items()):
+            print('    %-40s %10s' % (key, value if isinstance(value, bool) else round(value, 4)))
+        for call, count in result.breakdown.most_common(options.breakdown):
+            print('    %-40s %10d' % (call, count))
+
+    if options.save:
+        save_baselines(results, options.baseline)
+        print('Saved %d baselines to %s' % (len(results), options.baseline))
+        return 0
+    if failures:
+        print('%d of %d cases regressed' % (failures, len(results)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
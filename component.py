@@ -1,4 +1,4 @@
-import pymel.core as pmc
+from backend import pmc
 
 class Component(object):
 
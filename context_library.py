@@ -1,16 +1,16 @@
-import pymel.core as pmc
+from backend import cmds
 import logging
 
 class UndoOnError(object):
 
     def __enter__(self):
-        pmc.undoInfo(openChunk=True)
+        cmds.undoInfo(openChunk=True)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        pmc.undoInfo(closeChunk=True)
+        cmds.undoInfo(closeChunk=True)
         if exc_val is not None:
             try:
-                pmc.undo()
+                cmds.undo()
             except RuntimeError:
                 pass
         if exc_type == AssertionError:
@@ -4,9 +4,10 @@ This is a tricky module as since we cannot allow extra dependencies, shapes must
 So this module's goal is to isolate the mechanics behind rigs, not how they're assembled or organized.
 '''
 
-import pymel.core as pmc
-import pymel.core.nodetypes as nt
-from pymel.internal.factories import virtualClasses
+from backend import pmc, factories
+
+nt = pmc.nodetypes
+virtualClasses = factories.virtualClasses
 
 class RigNode(nt.Transform):
 
@@ -115,8 +116,32 @@ virtualClasses.register(FKRigNode, nameRequired=False)
 
 
 class Struct(object):
+    '''
+    A small record giving attribute access to the fields it was created with.
+    Each set of field names gets its own slotted subclass, so records carry no per-instance dict.
+    Fields can be reassigned but not added after creation.
+    '''
+
+    __slots__ = ()
+    _recordTypes = {}
+
+    def __new__(cls, **entries):
+        if '_fields' in cls.__dict__:
+            return object.__new__(cls)
+        fields = tuple(sorted(entries))
+        record_type = cls._recordTypes.get((cls, fields))
+        if record_type is None:
+            record_type = type(cls.__name__, (cls,), {'__slots__': fields, '_fields': fields})
+            cls._recordTypes[(cls, fields)] = record_type
+        return object.__new__(record_type)
+
     def __init__(self, **entries):
-        self.__dict__.update(entries)
+        for name, value in entries.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        fields = ', '.join('%s=%r' % (name, getattr(self, name)) for name in self._fields)
+        return '%s(%s)' % (type(self).__name__, fields)
 
 
 class RigComponent(object):
@@ -1,5 +1,4 @@
-import pymel.core as pmc
-import maya.cmds as cmds
+from backend import cmds, pmc
 from context_library import UndoOnError
 from nodes import ControlCurve
 
@@ -10,8 +9,9 @@ def build_fk_chain(targets, name='Unnamed'):
         for i, target in enumerate(targets):
             name = '_'.join([target.name(), 'CTRL'])
             ctrl = ControlCurve.create(name, 'circle')
-            ctrl.rotateShape([0,0,90])
-            ctrl.scaleShape([10,10,10])
+            with ctrl.deferShapeTransforms():
+                ctrl.rotateShape([0,0,90])
+                ctrl.scaleShape([10,10,10])
             cmds.matchTransform(ctrl, target.name())
             if previous_target:
                 pmc.parent(ctrl, previous_target)
@@ -71,14 +71,16 @@ def build_quad_leg(targets, name='Unnamed'):
         foot_ctrl.addBuffer()
 
         hoc_ctrl = ControlCurve.create(name=name + '_Hoc_CTRL', shapeType='circle')
-        hoc_ctrl.scaleShape([10,10,10])
+        with hoc_ctrl.deferShapeTransforms():
+            hoc_ctrl.scaleShape([10,10,10])
+            hoc_ctrl.rotateShape([0,0,90])
         hoc_ctrl.lockTransform(translate=True, scale=True, hide=True)
-        hoc_ctrl.rotateShape([0,0,90])
         hoc_ctrl.match(targets[-1].name())
 
         toe_ctrl = ControlCurve.create(name=name + '_Toe_CTRL', shapeType='circle')
-        toe_ctrl.scaleShape([10, 10, 10])
-        toe_ctrl.rotateShape([0,0,90])
+        with toe_ctrl.deferShapeTransforms():
+            toe_ctrl.scaleShape([10, 10, 10])
+            toe_ctrl.rotateShape([0,0,90])
         toe_ctrl.lockTransform(translate=True, scale=True, hide=True)
         toe_ctrl.match(targets[-1].name())
 
@@ -89,4 +91,44 @@ def build_quad_leg(targets, name='Unnamed'):
         pmc.parentConstraint(hoc_ctrl, ik_ctrl, mo=True)
         pmc.parentConstraint(toe_ctrl, targets[-1], mo=True)
 
-        return [ik_ctrl, pole_ctrl, base_ctrl, foot_ctrl]
\ No newline at end of file
+        return [ik_ctrl, pole_ctrl, base_ctrl, foot_ctrl]
+
+def simplify_controls(controls, tolerance):
+    '''
+    Simplifies the shape of every control, dropping CVs that lie within the tolerance of the rest.
+    :param controls: ControlCurves.
+    :param tolerance: The furthest a dropped CV can be from the simplified control polygon.
+    :return: The number of controls changed, the CV counts before and after and the largest deviation.
+    '''
+    with UndoOnError():
+        stats = {'controls': 0, 'cvsBefore': 0, 'cvsAfter': 0, 'deviation': 0.0}
+        for control in controls:
+            before, after, deviation = control.simplifyShape(tolerance)
+            stats['controls'] += after < before
+            stats['cvsBefore'] += before
+            stats['cvsAfter'] += after
+            stats['deviation'] = max(stats['deviation'], deviation)
+        return stats
+
+def collapse_control_shapes(controls):
+    '''
+    Replaces the shapes of controls matching an earlier control's curves and colors with instances of its shapes.
+    :param controls: ControlCurves.
+    :return: The number of controls collapsed and shape nodes removed.
+    '''
+    with UndoOnError():
+        stats = {'controls': 0, 'shapesRemoved': 0}
+        for control in controls:
+            removed = control.shareShapes()
+            stats['controls'] += removed > 0
+            stats['shapesRemoved'] += removed
+        return stats
+
+def expand_control_shapes(controls):
+    '''
+    Gives every control its own copy of any shapes it shares with other controls.
+    :param controls: ControlCurves.
+    :return: The number of shape nodes created.
+    '''
+    with UndoOnError():
+        return sum(control.expandShapes() for control in controls)
@@ -0,0 +1,982 @@
+'''
+A headless stand-in for the subset of maya.api.OpenMaya used by mayalib.
+'''
+
+import math
+
+from headless import scene as _scene
+from headless.scene import counted
+from headless.mmath import MSpace, MVector, MPoint, MMatrix, MQuaternion, MEulerRotation, MTransformationMatrix
+
+
+class MFn(object):
+    kInvalid = 0
+    kDependencyNode = 4
+    kDagNode = 107
+    kTransform = 110
+    kJoint = 121
+    kIkHandle = 120
+    kWorld = 258
+    kShape = 248
+    kNurbsCurve = 267
+    kMatrixData = 588
+
+_API_TYPES = (
+    ('nurbsCurve', MFn.kNurbsCurve),
+    ('shape', MFn.kShape),
+    ('joint', MFn.kJoint),
+    ('ikHandle', MFn.kIkHandle),
+    ('transform', MFn.kTransform),
+    ('world', MFn.kWorld),
+    ('dagNode', MFn.kDagNode),
+    ('dependNode', MFn.kDependencyNode),
+    ('matrixData', MFn.kMatrixData),
+)
+
+
+class MPointArray(list):
+
+    def __init__(self, points=()):
+        list.__init__(self, [point if isinstance(point, MPoint) else MPoint(point) for point in points])
+
+
+class MDoubleArray(list):
+
+    def __init__(self, values=()):
+        list.__init__(self, [float(value) for value in values])
+
+
+class MObject(object):
+
+    __slots__ = ('_record',)
+
+    def __init__(self, other=None):
+        self._record = other._record if isinstance(other, MObject) else other
+
+    def __eq__(self, other):
+        return isinstance(other, MObject) and self._record is other._record
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<MObject %s>' % (self._record.name if self._record else 'null')
+
+    def isNull(self):
+        return self._record is None
+
+    def apiType(self):
+        if self._record is None:
+            return MFn.kInvalid
+        for typeName, apiType in _API_TYPES:
+            if self._record.isA(typeName):
+                return apiType
+        return MFn.kInvalid
+
+    def hasFn(self, fnType):
+        if self._record is None:
+            return False
+        return any(apiType == fnType and self._record.isA(typeName) for typeName, apiType in _API_TYPES)
+
+MObject.kNullObj = MObject()
+
+
+def _record(obj):
+    if isinstance(obj, MDagPath):
+        obj = obj.node()
+    if not isinstance(obj, MObject) or obj.isNull():
+        raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+    if not obj._record.alive:
+        raise RuntimeError('(kInvalidParameter): Object does not exist')
+    return obj._record
+
+
+class MObjectHandle(object):
+
+    __slots__ = ('_record',)
+
+    def __init__(self, obj=None):
+        if isinstance(obj, MObjectHandle):
+            obj = obj.object()
+        self._record = obj._record if obj is not None else None
+
+    def __eq__(self, other):
+        return isinstance(other, MObjectHandle) and self._record is other._record
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def isValid(self):
+        return self._record is not None and self._record.alive
+
+    def isAlive(self):
+        return self._record is not None and self._record.alive
+
+    def object(self):
+        return MObject(self._record) if self.isValid() else MObject()
+
+    def hashCode(self):
+        return self._record.uid if self._record is not None else 0
+
+
+class MDagPath(object):
+
+    __slots__ = ('_chain',)
+
+    def __init__(self, other=None):
+        self._chain = list(other._chain) if other is not None else []
+
+    def __eq__(self, other):
+        return (isinstance(other, MDagPath) and len(self._chain) == len(other._chain)
+                and all(a is b for a, b in zip(self._chain, other._chain)))
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<MDagPath %s>' % ''.join('|' + record.name for record in self._chain)
+
+    @staticmethod
+    @counted('MDagPath.getAPathTo')
+    def getAPathTo(obj):
+        return MDagPath._pathTo(_record(obj))
+
+    @staticmethod
+    def _pathTo(record):
+        if not record.isDag:
+            raise TypeError('(kInvalidParameter): Object is not a DAG node')
+        path = MDagPath()
+        path._chain = list(reversed(list(record.ancestors()))) + [record]
+        return path
+
+    def isValid(self):
+        if not self._chain:
+            return False
+        parent = self._chain[0].parent
+        if parent is None or parent.type != 'world':
+            return False
+        for record in self._chain:
+            if not record.alive or (record.parent is not parent and parent not in record.instances):
+                return False
+            parent = record
+        return True
+
+    def _tail(self):
+        if not self._chain:
+            raise RuntimeError('(kFailure): Invalid DAG path')
+        return self._chain[-1]
+
+    def node(self):
+        return MObject(self._tail())
+
+    def transform(self):
+        for record in reversed(self._chain):
+            if record.isTransform:
+                return MObject(record)
+        raise RuntimeError('(kFailure): No transform in path')
+
+    def length(self):
+        return len(self._chain)
+
+    def apiType(self):
+        return self.node().apiType()
+
+    def hasFn(self, fnType):
+        return self.node().hasFn(fnType)
+
+    @counted('MDagPath.fullPathName')
+    def fullPathName(self):
+        return ''.join('|' + record.name for record in self._chain)
+
+    @counted('MDagPath.partialPathName')
+    def partialPathName(self):
+        return self._tail().name
+
+    def childCount(self):
+        return len(self._tail().children)
+
+    def child(self, index):
+        return MObject(self._tail().children[index])
+
+    def push(self, obj):
+        self._chain.append(_record(obj))
+        return self
+
+    def pop(self, count=1):
+        del self._chain[-count:]
+        return self
+
+    @counted('MDagPath.isInstanced')
+    def isInstanced(self):
+        return any(record.instances for record in self._chain)
+
+    def numberOfShapesDirectlyBelow(self):
+        return len([child for child in self._tail().children if child.isShape])
+
+    def extendToShape(self, index=0):
+        tail = self._tail()
+        if tail.isShape:
+            return self
+        shapes = [child for child in tail.children if child.isShape]
+        if index >= len(shapes):
+            raise RuntimeError('(kFailure): Object has no shape at index %d' % index)
+        self._chain.append(shapes[index])
+        return self
+
+    extendToShapeDirectlyBelow = extendToShape
+
+    def inclusiveMatrix(self):
+        scene = _scene.current()
+        tail = self._tail()
+        if tail.isTransform:
+            return MMatrix(scene.worldMatrix(tail))
+        # Instanced shapes take the matrix of the parent along this path
+        return MMatrix(scene.worldMatrix(self._chain[-2] if len(self._chain) > 1 else tail.parent))
+
+    def exclusiveMatrix(self):
+        return MMatrix(_scene.current().parentMatrix(self._tail()))
+
+    def inclusiveMatrixInverse(self):
+        return self.inclusiveMatrix().inverse()
+
+    def exclusiveMatrixInverse(self):
+        return self.exclusiveMatrix().inverse()
+
+
+class MSelectionList(object):
+
+    @counted('MSelectionList')
+    def __init__(self, other=None):
+        self._items = list(other._items) if other is not None else []
+
+    @counted('MSelectionList.add')
+    def add(self, item):
+        if isinstance(item, (MObject, MDagPath)):
+            self._items.append(_record(item))
+            return self
+        if isinstance(item, MPlug):
+            self._items.append(item._get())
+            return self
+        if '.' in str(item):
+            try:
+                self._items.append(_scene.current().plug(item))
+            except ValueError:
+                raise RuntimeError('(kInvalidParameter): Object does not exist')
+            return self
+        record = _scene.current().find(item)
+        if record is None:
+            raise RuntimeError('(kInvalidParameter): Object does not exist')
+        self._items.append(record)
+        return self
+
+    def length(self):
+        return len(self._items)
+
+    def clear(self):
+        self._items = []
+
+    def _item(self, index):
+        try:
+            item = self._items[index]
+        except IndexError:
+            raise IndexError('(kInvalidParameter): Index not within range')
+        return item.node if isinstance(item, _scene.Plug) else item
+
+    @counted('MSelectionList.getPlug')
+    def getPlug(self, index):
+        item = self._items[index] if 0 <= index < len(self._items) else None
+        if not isinstance(item, _scene.Plug):
+            raise TypeError('(kInvalidParameter): Item is not a plug')
+        return MPlug(item)
+
+    @counted('MSelectionList.getDagPath')
+    def getDagPath(self, index):
+        record = self._item(index)
+        return MDagPath._pathTo(record)
+
+    @counted('MSelectionList.getDependNode')
+    def getDependNode(self, index):
+        return MObject(self._item(index))
+
+
+class MFnBase(object):
+
+    def __init__(self, obj=None):
+        self._object = MObject()
+        if obj is not None:
+            self.setObject(obj)
+
+    def setObject(self, obj):
+        self._object = MObject(_record(obj))
+        return self
+
+    def object(self):
+        return MObject(self._object)
+
+    def _rec(self):
+        return _record(self._object)
+
+
+class MFnDependencyNode(MFnBase):
+
+    @counted('MFnDependencyNode.name')
+    def name(self):
+        return self._rec().name
+
+    @counted('MFnDependencyNode.setName')
+    def setName(self, name):
+        return _scene.current().rename(self._rec(), name)
+
+    @property
+    def typeName(self):
+        return self._rec().type
+
+    @counted('MFnDependencyNode.hasAttribute')
+    def hasAttribute(self, name):
+        return self._rec().spec(name) is not None
+
+    @counted('MFnDependencyNode.findPlug')
+    def findPlug(self, attr, wantNetworkedPlug=True):
+        record = self._rec()
+        spec = record.spec(str(attr))
+        if spec is None:
+            raise RuntimeError('(kInvalidParameter): Cannot find plug %s.%s' % (record.name, attr))
+        return MPlug(_scene.Plug(record, spec))
+
+    @property
+    def isFromReferencedFile(self):
+        return False
+
+
+class MFnDagNode(MFnDependencyNode):
+
+    def __init__(self, obj=None):
+        self._path = None
+        MFnDependencyNode.__init__(self, obj)
+
+    def setObject(self, obj):
+        if isinstance(obj, MDagPath):
+            self._path = MDagPath(obj)
+            obj = obj.node()
+        record = _record(obj)
+        if not record.isDag:
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        self._object = MObject(record)
+        return self
+
+    def _dagPath(self):
+        if self._path is not None and self._path.isValid():
+            return self._path
+        return None
+
+    kNextPos = 0xff
+
+    @counted('MFnDagNode.parentCount')
+    def parentCount(self):
+        record = self._rec()
+        return (1 if record.parent is not None else 0) + len(record.instances)
+
+    @counted('MFnDagNode.parent')
+    def parent(self, index=0):
+        record = self._rec()
+        parents = ([record.parent] if record.parent is not None else []) + record.instances
+        if index >= len(parents):
+            raise RuntimeError('(kInvalidParameter): Index not within range')
+        return MObject(parents[index])
+
+    @counted('MFnDagNode.isInstanced')
+    def isInstanced(self, indirect=True):
+        record = self._rec()
+        if indirect:
+            return any(node.instances for node in [record] + list(record.ancestors()))
+        return bool(record.instances)
+
+    @counted('MFnDagNode.addChild')
+    def addChild(self, child, index=kNextPos, keepExistingParents=False):
+        scene = _scene.current()
+        if keepExistingParents:
+            scene.addInstance(_record(child), self._rec())
+        else:
+            scene.reparent(_record(child), self._rec(), relative=True)
+        return self
+
+    @counted('MFnDagNode.removeChild')
+    def removeChild(self, child):
+        record = _record(child)
+        if record.parent is not self._rec() and self._rec() not in record.instances:
+            raise RuntimeError('(kInvalidParameter): Object is not a child of this node')
+        _scene.current().removeInstance(record, self._rec())
+        return self
+
+    @counted('MFnDagNode.childCount')
+    def childCount(self):
+        return len(self._rec().children)
+
+    @counted('MFnDagNode.child')
+    def child(self, index):
+        children = self._rec().children
+        if index >= len(children):
+            raise RuntimeError('(kInvalidParameter): Index not within range')
+        return MObject(children[index])
+
+    @counted('MFnDagNode.getPath')
+    def getPath(self):
+        return MDagPath(self._dagPath()) if self._dagPath() else MDagPath._pathTo(self._rec())
+
+    def dagPath(self):
+        return self.getPath()
+
+    @counted('MFnDagNode.fullPathName')
+    def fullPathName(self):
+        return _scene.current().fullPath(self._rec())
+
+    @counted('MFnDagNode.partialPathName')
+    def partialPathName(self):
+        return self._rec().name
+
+    @counted('MFnDagNode.transformationMatrix')
+    def transformationMatrix(self):
+        return MMatrix(_scene.current().localMatrix(self._rec()))
+
+
+class MFnTransform(MFnDagNode):
+
+    def setObject(self, obj):
+        MFnDagNode.setObject(self, obj)
+        if not self._rec().isTransform:
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        return self
+
+    def _requirePath(self, space):
+        if space == MSpace.kWorld and self._dagPath() is None:
+            raise RuntimeError('(kInvalidParameter): Must have a DAG path to do world space transforms')
+
+    @counted('MFnTransform.translation')
+    def translation(self, space=MSpace.kTransform):
+        self._requirePath(space)
+        scene = _scene.current()
+        if space == MSpace.kWorld:
+            return scene.worldTranslation(self._rec())
+        return MVector(scene._vector(self._rec(), 'translate'))
+
+    @counted('MFnTransform.setTranslation')
+    def setTranslation(self, vector, space=MSpace.kTransform):
+        self._requirePath(space)
+        scene = _scene.current()
+        if space == MSpace.kWorld:
+            scene.setWorldTranslation(self._rec(), MVector(vector))
+        else:
+            scene._setVector(self._rec(), 'translate', MVector(vector))
+        return self
+
+    @counted('MFnTransform.rotation')
+    def rotation(self, space=MSpace.kTransform, asQuaternion=False):
+        self._requirePath(space)
+        scene = _scene.current()
+        record = self._rec()
+        if space == MSpace.kWorld:
+            quaternion = scene.worldRotation(record)
+        else:
+            quaternion = MTransformationMatrix(scene.localMatrix(record)).rotation(True)
+        if asQuaternion:
+            return quaternion
+        return quaternion.asEulerRotation()
+
+    @counted('MFnTransform.setRotation')
+    def setRotation(self, rotation, space=MSpace.kTransform):
+        self._requirePath(space)
+        if isinstance(rotation, MEulerRotation):
+            rotation = rotation.asQuaternion()
+        elif not isinstance(rotation, MQuaternion):
+            rotation = MQuaternion(rotation)
+        scene = _scene.current()
+        if space == MSpace.kWorld:
+            scene.setWorldRotation(self._rec(), rotation)
+        else:
+            scene.setLocalRotation(self._rec(), rotation)
+        return self
+
+    @counted('MFnTransform.rotatePivot')
+    def rotatePivot(self, space=MSpace.kTransform):
+        self._requirePath(space)
+        scene = _scene.current()
+        pivot = MPoint(scene._vector(self._rec(), 'rotatePivot'))
+        if space == MSpace.kWorld:
+            return pivot * scene.worldMatrix(self._rec())
+        return pivot
+
+    @counted('MFnTransform.scale')
+    def scale(self):
+        return _scene.current()._vector(self._rec(), 'scale')
+
+    @counted('MFnTransform.setScale')
+    def setScale(self, scale):
+        _scene.current()._setVector(self._rec(), 'scale', scale)
+        return self
+
+    @counted('MFnTransform.transformation')
+    def transformation(self):
+        return MTransformationMatrix(_scene.current().localMatrix(self._rec()))
+
+
+class MFnNurbsCurve(MFnDagNode):
+
+    kOpen, kClosed, kPeriodic = 1, 2, 3
+
+    def setObject(self, obj):
+        MFnDagNode.setObject(self, obj)
+        record = self._rec()
+        if record.isTransform:
+            shapes = [child for child in record.children if child.type == 'nurbsCurve']
+            if len(shapes) != 1:
+                raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+            if self._path is not None:
+                self._path = MDagPath(self._path).push(MObject(shapes[0]))
+            self._object = MObject(shapes[0])
+        elif record.type != 'nurbsCurve':
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        return self
+
+    def _curve(self):
+        return self._rec().curve
+
+    def _worldMatrix(self, space):
+        if space != MSpace.kWorld:
+            return None
+        path = self._dagPath()
+        if path is None:
+            raise RuntimeError('(kInvalidParameter): Must have a DAG path to do world space transforms')
+        return path.inclusiveMatrix()
+
+    @counted('MFnNurbsCurve.cvPositions')
+    def cvPositions(self, space=MSpace.kObject):
+        matrix = self._worldMatrix(space)
+        points = MPointArray(self._curve().cvs)
+        if matrix is not None:
+            points = MPointArray([point * matrix for point in points])
+        return points
+
+    @counted('MFnNurbsCurve.setCVPositions')
+    def setCVPositions(self, points, space=MSpace.kObject):
+        curve = self._curve()
+        if len(points) != len(curve.cvs):
+            raise RuntimeError('(kInvalidParameter): Wrong number of CVs')
+        matrix = self._worldMatrix(space)
+        if matrix is not None:
+            inverse = matrix.inverse()
+            points = [MPoint(point) * inverse for point in points]
+        curve.cvs = [[float(v) for v in list(point)[:3]] for point in points]
+        return self
+
+    @counted('MFnNurbsCurve.cvPosition')
+    def cvPosition(self, index, space=MSpace.kObject):
+        matrix = self._worldMatrix(space)
+        point = MPoint(self._curve().cvs[index])
+        return point * matrix if matrix is not None else point
+
+    @counted('MFnNurbsCurve.setCVPosition')
+    def setCVPosition(self, index, point, space=MSpace.kObject):
+        matrix = self._worldMatrix(space)
+        point = MPoint(point)
+        if matrix is not None:
+            point = point * matrix.inverse()
+        self._curve().cvs[index] = [point.x, point.y, point.z]
+        return self
+
+    @counted('MFnNurbsCurve.create')
+    def create(self, cvs, knots, degree, form, is2D, rational, parent=MObject.kNullObj):
+        scene = _scene.current()
+        if parent is None or parent.isNull():
+            transform, shape = scene.createCurve(list(cvs), list(knots), degree, form=form)
+            self._object = MObject(shape)
+            return MObject(transform)
+        record = _record(parent)
+        if not record.isTransform:
+            raise RuntimeError('(kInvalidParameter): Parent must be a transform')
+        shape = scene.create('nurbsCurve', 'curveShape1', parent=record)
+        shape.curve = _scene.CurveData(cvs, knots, degree, form)
+        self._object = MObject(shape)
+        return MObject(shape)
+
+    @counted('MFnNurbsCurve.updateCurve')
+    def updateCurve(self):
+        return self
+
+    @counted('MFnNurbsCurve.knots')
+    def knots(self):
+        return MDoubleArray(self._curve().knots)
+
+    @property
+    def degree(self):
+        return self._curve().degree
+
+    @property
+    def numCVs(self):
+        return len(self._curve().cvs)
+
+    @property
+    def numKnots(self):
+        return len(self._curve().knots)
+
+    @property
+    def numSpans(self):
+        return len(self._curve().cvs) - self._curve().degree
+
+    @property
+    def form(self):
+        return self._curve().form
+
+
+##### Plugs #####
+
+class _MatrixData(object):
+    '''
+    The payload of a matrix data MObject, standing in for a node record.
+    '''
+
+    __slots__ = ('matrix',)
+
+    alive = True
+    name = 'matrixData'
+
+    def __init__(self, matrix):
+        self.matrix = MMatrix(matrix)
+
+    def isA(self, typeName):
+        return typeName == 'matrixData'
+
+
+class MFnMatrixData(object):
+
+    def __init__(self, obj=None):
+        self._object = obj
+
+    def create(self, matrix):
+        self._object = MObject(_MatrixData(matrix))
+        return self._object
+
+    def matrix(self):
+        if self._object is None or not isinstance(self._object._record, _MatrixData):
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        return MMatrix(self._object._record.matrix)
+
+    def set(self, matrix):
+        self.matrix()
+        self._object._record.matrix = MMatrix(matrix)
+        return self
+
+
+class MPlug(object):
+    '''
+    Angles are read and written in radians, as Maya works in internal units through the API.
+    '''
+
+    __slots__ = ('_plug',)
+
+    def __init__(self, other=None):
+        self._plug = other._plug if isinstance(other, MPlug) else other
+
+    def __eq__(self, other):
+        return isinstance(other, MPlug) and self._plug == other._plug
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<MPlug %s>' % (self._plug.name if self._plug else 'null')
+
+    def _get(self):
+        if self._plug is None:
+            raise RuntimeError('(kFailure): Plug is null')
+        if not self._plug.node.alive:
+            raise RuntimeError('(kInvalidParameter): Object does not exist')
+        return self._plug
+
+    def _read(self):
+        plug = self._get()
+        if plug.spec.children:
+            raise RuntimeError('(kFailure): Cannot get the value of compound plug %s' % plug.name)
+        value = _scene.current().getValue(plug)
+        if plug.spec.kind == 'doubleAngle':
+            value = math.radians(value)
+        return value
+
+    def _write(self, value):
+        plug = self._get()
+        if plug.spec.kind == 'doubleAngle':
+            value = math.degrees(value)
+        _scene.current().setValue(plug, value)
+        return self
+
+    @property
+    def isNull(self):
+        return self._plug is None
+
+    @property
+    def isCompound(self):
+        return bool(self._get().spec.children)
+
+    @property
+    def isArray(self):
+        plug = self._get()
+        return plug.spec.array and plug.index is None
+
+    @property
+    def isElement(self):
+        return self._get().index is not None
+
+    @property
+    def isChild(self):
+        return self._get().spec.parent is not None
+
+    @property
+    def isConnected(self):
+        return self.isDestination or self.isSource
+
+    @property
+    def isDestination(self):
+        plug = self._get()
+        return plug.spec.longName in plug.node.inputs
+
+    @property
+    def isSource(self):
+        plug = self._get()
+        return bool(plug.node.outputs.get(plug.spec.longName))
+
+    def _getLocked(self):
+        plug = self._get()
+        return plug.spec.longName in plug.node.locked
+
+    @counted('MPlug.isLocked')
+    def _setLocked(self, value):
+        _scene.current().setFlags(self._get(), lock=bool(value))
+
+    isLocked = property(_getLocked, _setLocked)
+
+    def _getKeyable(self):
+        return _scene.current().isKeyable(self._get())
+
+    @counted('MPlug.isKeyable')
+    def _setKeyable(self, value):
+        _scene.current().setFlags(self._get(), keyable=bool(value))
+
+    isKeyable = property(_getKeyable, _setKeyable)
+
+    def _getChannelBox(self):
+        return _scene.current().isChannelBox(self._get())
+
+    @counted('MPlug.isChannelBox')
+    def _setChannelBox(self, value):
+        _scene.current().setFlags(self._get(), channelBox=bool(value))
+
+    isChannelBox = property(_getChannelBox, _setChannelBox)
+
+    def node(self):
+        return MObject(self._get().node)
+
+    def name(self):
+        return self._get().name
+
+    def partialName(self, includeNodeName=False, includeNonMandatoryIndices=False, includeInstancedIndices=False,
+                    useAlias=False, useFullAttributePath=False, useLongNames=False, *args):
+        plug = self._get()
+        name = plug.spec.longName if useLongNames else plug.spec.shortName
+        if plug.index is not None:
+            name = '%s[%d]' % (name, plug.index)
+        return '%s.%s' % (plug.node.name, name) if includeNodeName else name
+
+    def numChildren(self):
+        return len(self._get().spec.children)
+
+    def child(self, index):
+        plug = self._get()
+        if not 0 <= index < len(plug.spec.children):
+            raise RuntimeError('(kInvalidParameter): Plug %s has no child %d' % (plug.name, index))
+        return MPlug(_scene.Plug(plug.node, plug.spec.children[index]))
+
+    def parent(self):
+        plug = self._get()
+        if plug.spec.parent is None:
+            raise RuntimeError('(kInvalidParameter): Plug %s is not a child' % plug.name)
+        return MPlug(_scene.Plug(plug.node, plug.spec.parent))
+
+    def elementByLogicalIndex(self, index):
+        plug = self._get()
+        return MPlug(_scene.Plug(plug.node, plug.spec, int(index)))
+
+    def source(self):
+        plug = self._get()
+        return MPlug(plug.node.inputs.get(plug.spec.longName))
+
+    def destinations(self):
+        plug = self._get()
+        return [MPlug(target) for target in plug.node.outputs.get(plug.spec.longName, [])]
+
+    def connectedTo(self, asDst, asSrc):
+        plugs = []
+        if asDst and self.isDestination:
+            plugs.append(self.source())
+        if asSrc:
+            plugs.extend(self.destinations())
+        return plugs
+
+    @counted('MPlug.asDouble')
+    def asDouble(self):
+        return float(self._read())
+
+    asFloat = asDouble
+
+    @counted('MPlug.asInt')
+    def asInt(self):
+        return int(self._read())
+
+    asShort = asInt
+
+    @counted('MPlug.asBool')
+    def asBool(self):
+        return bool(self._read())
+
+    @counted('MPlug.asString')
+    def asString(self):
+        return str(self._read() or '')
+
+    @counted('MPlug.asMObject')
+    def asMObject(self):
+        plug = self._get()
+        if plug.spec.kind != 'matrix':
+            raise RuntimeError('(kFailure): Plug %s does not hold data' % plug.name)
+        return MFnMatrixData().create(MMatrix(_scene.current().getValue(plug)))
+
+    @counted('MPlug.setDouble')
+    def setDouble(self, value):
+        return self._write(float(value))
+
+    setFloat = setDouble
+
+    @counted('MPlug.setInt')
+    def setInt(self, value):
+        return self._write(int(value))
+
+    setShort = setInt
+
+    @counted('MPlug.setBool')
+    def setBool(self, value):
+        return self._write(bool(value))
+
+    @counted('MPlug.setString')
+    def setString(self, value):
+        return self._write(str(value))
+
+    @counted('MPlug.setMObject')
+    def setMObject(self, obj):
+        return self._write(list(MFnMatrixData(obj).matrix()))
+
+
+class MDGModifier(object):
+    '''
+    Queues graph edits until doIt, and can revert everything it did with undoIt.
+    '''
+
+    def __init__(self):
+        self._queue = []
+        self._done = []
+
+    def connect(self, source, target):
+        source, target = source._get(), target._get()
+        scene = _scene.current()
+        self._queue.append((lambda: scene.connect(source, target), lambda: scene.disconnect(source, target)))
+        return self
+
+    def disconnect(self, source, target):
+        source, target = source._get(), target._get()
+        scene = _scene.current()
+        self._queue.append((lambda: scene.disconnect(source, target), lambda: scene.connect(source, target)))
+        return self
+
+    def renameNode(self, obj, name):
+        record = _record(obj)
+        scene = _scene.current()
+        previous = []
+
+        def do():
+            previous.append(record.name)
+            scene.rename(record, str(name))
+
+        self._queue.append((do, lambda: scene.rename(record, previous.pop())))
+        return self
+
+    def _newPlugValue(self, plug, value):
+        # Written through the uncounted path, the modifier applies its edits internally on doIt
+        scene = _scene.current()
+        target = plug._get()
+        previous = []
+
+        def do():
+            previous.append(scene.getValue(target))
+            MPlug(target)._write(value)
+
+        def undo():
+            old = previous.pop()
+            scene.setValue(target, old[0] if target.spec.children else old)
+
+        self._queue.append((do, undo))
+        return self
+
+    def newPlugValueDouble(self, plug, value):
+        return self._newPlugValue(plug, float(value))
+
+    newPlugValueFloat = newPlugValueDouble
+
+    def newPlugValueInt(self, plug, value):
+        return self._newPlugValue(plug, int(value))
+
+    newPlugValueShort = newPlugValueInt
+
+    def newPlugValueBool(self, plug, value):
+        return self._newPlugValue(plug, bool(value))
+
+    def newPlugValueString(self, plug, value):
+        return self._newPlugValue(plug, str(value))
+
+    def newPlugValue(self, plug, value):
+        return self._newPlugValue(plug, list(MFnMatrixData(value).matrix()))
+
+    @counted('MDGModifier.doIt')
+    def doIt(self):
+        queue, self._queue = self._queue, []
+        for do, undo in queue:
+            do()
+            self._done.append(undo)
+        return self
+
+    @counted('MDGModifier.undoIt')
+    def undoIt(self):
+        done, self._done = self._done, []
+        for undo in reversed(done):
+            undo()
+        return self
+
+
+class MDagModifier(MDGModifier):
+
+    def createNode(self, typeName, parent=MObject.kNullObj):
+        # The node exists as soon as it is queued, like in Maya, but only joins the scene on doIt
+        scene = _scene.current()
+        parentRecord = _record(parent) if parent is not None and not parent.isNull() else None
+        record = _scene.NodeRecord(typeName + '1', typeName)
+
+        def do():
+            record.name = scene.uniqueName(record.name)
+            scene.nodes[record.name] = record
+            scene._attach(record, parentRecord or scene.world)
+
+        self._queue.append((do, lambda: scene.delete(record)))
+        return MObject(record)
@@ -0,0 +1,11 @@
+'''
+An in-memory stand-in for the parts of Maya that mayalib uses.
+
+headless.cmds, headless.OpenMaya and headless.pymel mirror maya.cmds, maya.api.OpenMaya and pymel.core closely
+enough to build controls and rig components without a Maya license. Select it through backend.use('headless').
+
+The scene is deliberately simple: names are unique, nothing is evaluated and undo history is not recorded.
+Every command and API call is tallied in headless.calls so benchmarks can report backend round trips.
+'''
+
+from headless.scene import calls, current, reset
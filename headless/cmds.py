@@ -0,0 +1,470 @@
+'''
+A headless stand-in for the subset of maya.cmds used by mayalib.
+
+Commands accept the same long and short flags as Maya for the cases mayalib uses
+and raise the same exception types Maya does when something is wrong.
+'''
+
+import fnmatch
+
+from headless import scene as _scene
+from headless.scene import counted, Plug
+from headless.mmath import MMatrix, MTransformationMatrix
+
+
+def _flag(kwargs, longName, shortName=None, default=None):
+    if longName in kwargs:
+        return kwargs[longName]
+    if shortName and shortName in kwargs:
+        return kwargs[shortName]
+    return default
+
+
+def _names(args):
+    names = []
+    for arg in args:
+        if isinstance(arg, (list, tuple)):
+            names.extend(_names(arg))
+        elif arg is not None:
+            names.append(str(arg))
+    return names
+
+
+def _nodes(args):
+    scene = _scene.current()
+    return [scene.get(name) for name in _names(args)]
+
+
+##### Creation #####
+
+@counted('cmds.createNode')
+def createNode(nodeType, **kwargs):
+    scene = _scene.current()
+    parent = _flag(kwargs, 'parent', 'p')
+    parent = scene.get(parent) if parent else None
+    name = _flag(kwargs, 'name', 'n')
+    return scene.create(nodeType, name, parent).name
+
+
+@counted('cmds.group')
+def group(*args, **kwargs):
+    scene = _scene.current()
+    parent = _flag(kwargs, 'parent', 'p')
+    node = scene.create('transform', _flag(kwargs, 'name', 'n') or 'null1', scene.get(parent) if parent else None)
+    if not _flag(kwargs, 'empty', 'em', False):
+        for child in _nodes(args):
+            scene.reparent(child, node)
+    return node.name
+
+
+@counted('cmds.curve')
+def curve(*args, **kwargs):
+    scene = _scene.current()
+    points = _flag(kwargs, 'point', 'p')
+    degree = _flag(kwargs, 'degree', 'd', 3)
+    knots = _flag(kwargs, 'knot', 'k')
+    if knots is None:
+        knots = range(len(points) + degree - 1)
+    form = 3 if _flag(kwargs, 'periodic', 'per', False) else 1
+    if _flag(kwargs, 'replace', 'r', False):
+        node = _nodes(args)[0]
+        if node.isTransform:
+            node = [child for child in node.children if child.type == 'nurbsCurve'][0]
+        node.curve = _scene.CurveData(points, knots, degree, form)
+        return node.name
+    transform, shape = scene.createCurve(points, knots, degree, _flag(kwargs, 'name', 'n'), form)
+    return transform.name
+
+
+@counted('cmds.duplicate')
+def duplicate(*args, **kwargs):
+    scene = _scene.current()
+    copies = scene.duplicate(_nodes(args))
+    name = _flag(kwargs, 'name', 'n')
+    if name and copies:
+        scene.rename(copies[0], name)
+    return [copy.name for copy in copies]
+
+
+@counted('cmds.rename')
+def rename(*args, **kwargs):
+    scene = _scene.current()
+    node = scene.get(args[0])
+    return scene.rename(node, str(args[1]))
+
+
+@counted('cmds.delete')
+def delete(*args, **kwargs):
+    scene = _scene.current()
+    nodes = _nodes(args)
+    if not nodes:
+        raise ValueError('No object matches name')
+    for node in nodes:
+        scene.delete(node)
+
+
+##### Hierarchy #####
+
+@counted('cmds.parent')
+def parent(*args, **kwargs):
+    scene = _scene.current()
+    nodes = _nodes(args)
+    if _flag(kwargs, 'world', 'w', False):
+        target = scene.world
+    else:
+        nodes, target = nodes[:-1], nodes[-1]
+    relative = _flag(kwargs, 'relative', 'r', False)
+    if _flag(kwargs, 'shape', 's', False) and not all(node.isShape for node in nodes):
+        raise RuntimeError('Only shapes can be parented with the shape flag')
+    for node in nodes:
+        if node.parent is target and target is scene.world:
+            continue
+        if node.parent is target:
+            raise RuntimeError('Object %s is already a child of the given parent.' % node.name)
+        scene.reparent(node, target, relative)
+    return [node.name for node in nodes]
+
+
+@counted('cmds.listRelatives')
+def listRelatives(*args, **kwargs):
+    nodes = _nodes(args)
+    results = []
+    for node in nodes:
+        if _flag(kwargs, 'parent', 'p', False):
+            related = [node.parent] if node.parent is not None and node.parent.type != 'world' else []
+        elif _flag(kwargs, 'allDescendents', 'ad', False):
+            related = list(node.descendants())
+        else:
+            related = list(node.children)
+        if _flag(kwargs, 'shapes', 's', False):
+            related = [r for r in related if r.isShape]
+        nodeType = _flag(kwargs, 'type', 'typ')
+        if nodeType:
+            related = [r for r in related if r.isA(nodeType)]
+        if _flag(kwargs, 'fullPath', 'f', False):
+            results.extend(_scene.current().fullPath(r) for r in related)
+        else:
+            results.extend(r.name for r in related)
+    return results or None
+
+
+@counted('cmds.objExists')
+def objExists(name):
+    scene = _scene.current()
+    name = str(name)
+    if '.' in name:
+        try:
+            scene.plug(name)
+            return True
+        except ValueError:
+            return False
+    return scene.find(name) is not None
+
+
+@counted('cmds.nodeType')
+def nodeType(name, **kwargs):
+    node = _scene.current().get(name)
+    if _flag(kwargs, 'inherited', 'i', False):
+        return list(reversed(node.schema.lineage))
+    return node.type
+
+
+@counted('cmds.ls')
+def ls(*args, **kwargs):
+    scene = _scene.current()
+    nodes = scene.ls(_flag(kwargs, 'type', 'typ'))
+    patterns = _names(args)
+    if patterns:
+        nodes = [node for node in nodes if any(fnmatch.fnmatchcase(node.name, p) for p in patterns)]
+    return [node.name for node in nodes]
+
+
+##### Attributes #####
+
+@counted('cmds.attributeQuery')
+def attributeQuery(attr, **kwargs):
+    typeName = _flag(kwargs, 'type', 'typ')
+    if typeName is not None:
+        # Queries the static attributes of a node type rather than a node
+        spec = _scene.schema(typeName).specs.get(attr)
+        if _flag(kwargs, 'exists', 'ex', False):
+            return spec is not None
+        if spec is None:
+            raise RuntimeError('attributeQuery: Attribute %s not found on type %s' % (attr, typeName))
+        node = None
+    else:
+        node = _scene.current().get(_flag(kwargs, 'node', 'n'))
+        spec = node.spec(attr)
+        if _flag(kwargs, 'exists', 'ex', False):
+            return spec is not None
+        if spec is None:
+            raise RuntimeError('attributeQuery: Attribute %s not found on %s' % (attr, node.name))
+    if _flag(kwargs, 'listChildren', 'lc', False):
+        return [child.longName for child in spec.children] or None
+    if _flag(kwargs, 'keyable', 'k', False):
+        return _scene.current().isKeyable(Plug(node, spec)) if node else spec.keyable
+    if _flag(kwargs, 'attributeType', 'at', False):
+        return spec.kind
+    raise RuntimeError('attributeQuery: No query flag specified')
+
+
+@counted('cmds.getAttr')
+def getAttr(path, **kwargs):
+    scene = _scene.current()
+    plug = scene.plug(path)
+    if _flag(kwargs, 'lock', 'l', False):
+        return plug.spec.longName in plug.node.locked
+    if _flag(kwargs, 'keyable', 'k', False):
+        return scene.isKeyable(plug)
+    if _flag(kwargs, 'channelBox', 'cb', False):
+        return scene.isChannelBox(plug)
+    if _flag(kwargs, 'type', 'typ', False):
+        return plug.spec.kind
+    return scene.getValue(plug, _flag(kwargs, 'time', 't'))
+
+
+@counted('cmds.setAttr')
+def setAttr(path, *values, **kwargs):
+    scene = _scene.current()
+    plug = scene.plug(path)
+    lock = _flag(kwargs, 'lock', 'l')
+    keyable = _flag(kwargs, 'keyable', 'k')
+    channelBox = _flag(kwargs, 'channelBox', 'cb')
+    if values:
+        if lock is False:
+            scene.setFlags(plug, lock=False)
+        value = values[0] if len(values) == 1 else values
+        scene.setValue(plug, value)
+    scene.setFlags(plug, lock=lock, keyable=keyable, channelBox=channelBox)
+
+
+@counted('cmds.addAttr')
+def addAttr(*args, **kwargs):
+    longName = _flag(kwargs, 'longName', 'ln')
+    shortName = _flag(kwargs, 'shortName', 'sn')
+    kind = _flag(kwargs, 'attributeType', 'at') or _flag(kwargs, 'dataType', 'dt') or 'double'
+    for node in _nodes(args):
+        _scene.current().addAttribute(node, longName or shortName, shortName, kind,
+                                      default=_flag(kwargs, 'defaultValue', 'dv'),
+                                      keyable=bool(_flag(kwargs, 'keyable', 'k', False)),
+                                      parent=_flag(kwargs, 'parent', 'p'),
+                                      minimum=_flag(kwargs, 'minValue', 'min'),
+                                      maximum=_flag(kwargs, 'maxValue', 'max'))
+
+
+@counted('cmds.deleteAttr')
+def deleteAttr(*args, **kwargs):
+    scene = _scene.current()
+    if len(args) == 1:
+        plug = scene.plug(args[0])
+        scene.deleteAttribute(plug.node, plug.spec.longName)
+    else:
+        scene.deleteAttribute(scene.get(args[0]), _flag(kwargs, 'attribute', 'at'))
+
+
+@counted('cmds.listAttr')
+def listAttr(*args, **kwargs):
+    scene = _scene.current()
+    node = _nodes(args)[0]
+    if _flag(kwargs, 'userDefined', 'ud', False):
+        names = [name for name, spec in node.dynamic.items() if name == spec.longName]
+    elif _flag(kwargs, 'keyable', 'k', False):
+        names = [plug.spec.longName for plug in scene.keyablePlugs(node)]
+    else:
+        names = [spec.longName for spec in node.schema.ordered]
+        names += [name for name, spec in node.dynamic.items() if name == spec.longName]
+    return names or None
+
+
+@counted('cmds.connectAttr')
+def connectAttr(source, target, **kwargs):
+    scene = _scene.current()
+    scene.connect(scene.plug(source), scene.plug(target), _flag(kwargs, 'force', 'f', False))
+
+
+@counted('cmds.disconnectAttr')
+def disconnectAttr(source, target, **kwargs):
+    scene = _scene.current()
+    scene.disconnect(scene.plug(source), scene.plug(target))
+
+
+@counted('cmds.listConnections')
+def listConnections(path, **kwargs):
+    scene = _scene.current()
+    source = _flag(kwargs, 'source', 's', True)
+    destination = _flag(kwargs, 'destination', 'd', True)
+    plugs = _flag(kwargs, 'plugs', 'p', False)
+    if '.' in str(path):
+        plug = scene.plug(path)
+        inputs = [plug.node.inputs[plug.spec.longName]] if plug.spec.longName in plug.node.inputs else []
+        outputs = list(plug.node.outputs.get(plug.spec.longName, []))
+    else:
+        node = scene.get(path)
+        inputs = list(node.inputs.values())
+        outputs = [target for targets in node.outputs.values() for target in targets]
+    related = (inputs if source else []) + (outputs if destination else [])
+    return [p.name if plugs else p.node.name for p in related] or None
+
+
+##### Transforms #####
+
+@counted('cmds.xform')
+def xform(*args, **kwargs):
+    scene = _scene.current()
+    node = _nodes(args)[0]
+    worldSpace = _flag(kwargs, 'worldSpace', 'ws', False)
+    if _flag(kwargs, 'query', 'q', False):
+        matrix = scene.worldMatrix(node) if worldSpace else scene.localMatrix(node)
+        if _flag(kwargs, 'matrix', 'm', False):
+            return list(matrix)
+        transformation = MTransformationMatrix(matrix)
+        if _flag(kwargs, 'translation', 't', False):
+            return list(transformation.translation())
+        if _flag(kwargs, 'rotation', 'ro', False):
+            return [v * 57.29577951308232 for v in transformation.rotation()]
+        if _flag(kwargs, 'scale', 's', False):
+            return transformation.scale()
+        raise RuntimeError('xform: No query flag specified')
+    matrix = _flag(kwargs, 'matrix', 'm')
+    if matrix is not None:
+        if worldSpace:
+            scene.setWorldMatrix(node, MMatrix(matrix))
+        else:
+            scene.setLocalMatrix(node, MMatrix(matrix))
+    translation = _flag(kwargs, 'translation', 't')
+    if translation is not None:
+        if worldSpace:
+            scene.setWorldTranslation(node, translation)
+        else:
+            scene._setVector(node, 'translate', translation)
+
+
+@counted('cmds.matchTransform')
+def matchTransform(*args, **kwargs):
+    scene = _scene.current()
+    nodes = _nodes(args)
+    target = scene.worldMatrix(nodes[-1])
+    position = _flag(kwargs, 'position', 'pos', False)
+    rotation = _flag(kwargs, 'rotation', 'rot', False)
+    scale = _flag(kwargs, 'scale', 'scl', False)
+    if not (position or rotation or scale):
+        position = rotation = scale = True
+    for node in nodes[:-1]:
+        scene.setWorldMatrix(node, target, position, rotation, scale)
+
+
+@counted('cmds.hide')
+def hide(*args, **kwargs):
+    scene = _scene.current()
+    for node in _nodes(args):
+        scene.setValue(Plug(node, node.spec('visibility')), False)
+
+
+@counted('cmds.showHidden')
+def showHidden(*args, **kwargs):
+    scene = _scene.current()
+    for node in _nodes(args):
+        scene.setValue(Plug(node, node.spec('visibility')), True)
+
+
+##### Constraints and IK #####
+
+def _constraint(nodeType, args, kwargs):
+    nodes = _nodes(args)
+    constraint = _scene.current().constrain(nodeType, nodes[:-1], nodes[-1], _flag(kwargs, 'name', 'n'))
+    return [constraint.name]
+
+
+@counted('cmds.parentConstraint')
+def parentConstraint(*args, **kwargs):
+    return _constraint('parentConstraint', args, kwargs)
+
+
+@counted('cmds.orientConstraint')
+def orientConstraint(*args, **kwargs):
+    return _constraint('orientConstraint', args, kwargs)
+
+
+@counted('cmds.pointConstraint')
+def pointConstraint(*args, **kwargs):
+    return _constraint('pointConstraint', args, kwargs)
+
+
+@counted('cmds.poleVectorConstraint')
+def poleVectorConstraint(*args, **kwargs):
+    return _constraint('poleVectorConstraint', args, kwargs)
+
+
+@counted('cmds.ikHandle')
+def ikHandle(*args, **kwargs):
+    scene = _scene.current()
+    start = scene.get(_flag(kwargs, 'startJoint', 'sj'))
+    end = scene.get(_flag(kwargs, 'endEffector', 'ee'))
+    handle, effector = scene.ikHandle(start, end, _flag(kwargs, 'name', 'n'))
+    return [handle.name, effector.name]
+
+
+##### Animation #####
+
+@counted('cmds.setKeyframe')
+def setKeyframe(*args, **kwargs):
+    scene = _scene.current()
+    time = _flag(kwargs, 'time', 't', scene.time)
+    if isinstance(time, (list, tuple)):
+        time = time[0]
+    attributes = _flag(kwargs, 'attribute', 'at')
+    if isinstance(attributes, str):
+        attributes = [attributes]
+    count = 0
+    for node in _nodes(args):
+        if attributes:
+            plugs = [Plug(node, node.spec(attr)) for attr in attributes if node.spec(attr) is not None]
+        else:
+            plugs = scene.keyablePlugs(node)
+        for plug in plugs:
+            scene.setKey(plug, time)
+            count += len(plug.spec.leaves())
+    return count
+
+
+@counted('cmds.currentTime')
+def currentTime(*args, **kwargs):
+    scene = _scene.current()
+    if _flag(kwargs, 'query', 'q', False):
+        return scene.time
+    scene.time = float(args[0] if args else _flag(kwargs, 'edit', 'e'))
+    return scene.time
+
+
+@counted('cmds.playbackOptions')
+def playbackOptions(**kwargs):
+    scene = _scene.current()
+    minTime = _flag(kwargs, 'minTime', 'min')
+    maxTime = _flag(kwargs, 'maxTime', 'max')
+    if _flag(kwargs, 'query', 'q', False):
+        return scene.playback[0] if minTime else scene.playback[1]
+    if minTime is not None:
+        scene.playback[0] = float(minTime)
+    if maxTime is not None:
+        scene.playback[1] = float(maxTime)
+
+
+##### Undo #####
+
+@counted('cmds.undoInfo')
+def undoInfo(**kwargs):
+    '''
+    Tracks open undo chunks. The headless scene does not record undo history.
+    '''
+    scene = _scene.current()
+    if _flag(kwargs, 'openChunk', 'ock', False):
+        scene.undoDepth += 1
+    elif _flag(kwargs, 'closeChunk', 'cck', False):
+        scene.undoDepth = max(0, scene.undoDepth - 1)
+    elif _flag(kwargs, 'query', 'q', False):
+        return True
+
+
+@counted('cmds.undo')
+def undo(*args, **kwargs):
+    raise RuntimeError('There are no more commands to undo.')
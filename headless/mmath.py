@@ -0,0 +1,510 @@
+'''
+Pure python versions of the OpenMaya math classes mayalib relies on.
+
+The conventions follow Maya: matrices are row major, points are row vectors (point * matrix),
+a * b applies a first then b, and angles are in radians.
+'''
+
+import math
+
+_TOLERANCE = 1e-10
+
+
+class MSpace(object):
+    kInvalid = 0
+    kTransform = 1
+    kPreTransform = 2
+    kObject = 2
+    kPostTransform = 3
+    kWorld = 4
+
+
+class MVector(object):
+
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, *args):
+        if not args:
+            self.x, self.y, self.z = 0.0, 0.0, 0.0
+        elif len(args) == 1:
+            values = tuple(args[0])
+            self.x, self.y, self.z = float(values[0]), float(values[1]), float(values[2])
+        else:
+            self.x, self.y, self.z = float(args[0]), float(args[1]), float(args[2])
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z)[index]
+
+    def __repr__(self):
+        return '%s(%r, %r, %r)' % (type(self).__name__, self.x, self.y, self.z)
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)[:3]
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __add__(self, other):
+        if isinstance(other, MPoint):
+            return MPoint(self.x + other.x, self.y + other.y, self.z + other.z)
+        return type(self)(self.x + other[0], self.y + other[1], self.z + other[2])
+
+    def __sub__(self, other):
+        return type(self)(self.x - other[0], self.y - other[1], self.z - other[2])
+
+    def __neg__(self):
+        return type(self)(-self.x, -self.y, -self.z)
+
+    def __mul__(self, other):
+        if isinstance(other, MMatrix):
+            m = other._m
+            return type(self)(self.x * m[0] + self.y * m[4] + self.z * m[8],
+                              self.x * m[1] + self.y * m[5] + self.z * m[9],
+                              self.x * m[2] + self.y * m[6] + self.z * m[10])
+        if isinstance(other, MVector):
+            return self.x * other.x + self.y * other.y + self.z * other.z
+        return type(self)(self.x * other, self.y * other, self.z * other)
+
+    def __rmul__(self, other):
+        return type(self)(self.x * other, self.y * other, self.z * other)
+
+    def __truediv__(self, other):
+        return type(self)(self.x / other, self.y / other, self.z / other)
+
+    __div__ = __truediv__
+
+    def __xor__(self, other):
+        return type(self)(self.y * other.z - self.z * other.y,
+                          self.z * other.x - self.x * other.z,
+                          self.x * other.y - self.y * other.x)
+
+    def length(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def normal(self):
+        length = self.length()
+        if length < _TOLERANCE:
+            return type(self)(self)
+        return type(self)(self.x / length, self.y / length, self.z / length)
+
+    def normalize(self):
+        normal = self.normal()
+        self.x, self.y, self.z = normal.x, normal.y, normal.z
+        return self
+
+    def isEquivalent(self, other, tolerance=_TOLERANCE):
+        return all(abs(a - b) <= tolerance for a, b in zip(self, other))
+
+
+class MPoint(object):
+
+    __slots__ = ('x', 'y', 'z', 'w')
+
+    def __init__(self, *args):
+        if not args:
+            values = (0.0, 0.0, 0.0)
+        elif len(args) == 1:
+            values = tuple(args[0])
+        else:
+            values = args
+        self.x, self.y, self.z = float(values[0]), float(values[1]), float(values[2])
+        self.w = float(values[3]) if len(values) > 3 else 1.0
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.w))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z, self.w)[index]
+
+    def __repr__(self):
+        return 'MPoint(%r, %r, %r, %r)' % (self.x, self.y, self.z, self.w)
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(MPoint(other))
+        except (TypeError, IndexError):
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return MPoint(self.x + other[0], self.y + other[1], self.z + other[2], self.w)
+
+    def __sub__(self, other):
+        if isinstance(other, MPoint):
+            return MVector(self.x - other.x, self.y - other.y, self.z - other.z)
+        return MPoint(self.x - other[0], self.y - other[1], self.z - other[2], self.w)
+
+    def __mul__(self, other):
+        if isinstance(other, MMatrix):
+            m = other._m
+            x, y, z, w = self.x, self.y, self.z, self.w
+            return MPoint(x * m[0] + y * m[4] + z * m[8] + w * m[12],
+                          x * m[1] + y * m[5] + z * m[9] + w * m[13],
+                          x * m[2] + y * m[6] + z * m[10] + w * m[14],
+                          x * m[3] + y * m[7] + z * m[11] + w * m[15])
+        return MPoint(self.x * other, self.y * other, self.z * other, self.w)
+
+    def distanceTo(self, other):
+        return (self - MPoint(other)).length()
+
+    def isEquivalent(self, other, tolerance=_TOLERANCE):
+        return all(abs(a - b) <= tolerance for a, b in zip(self, MPoint(other)))
+
+
+class MMatrix(object):
+
+    __slots__ = ('_m',)
+
+    def __init__(self, values=None):
+        if values is None:
+            self._m = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+        elif isinstance(values, MMatrix):
+            self._m = list(values._m)
+        else:
+            values = list(values)
+            if len(values) == 4:
+                values = [float(v) for row in values for v in row]
+            if len(values) != 16:
+                raise ValueError('MMatrix expects 16 values, received %d' % len(values))
+            self._m = [float(v) for v in values]
+
+    def __iter__(self):
+        return iter(self._m)
+
+    def __len__(self):
+        return 16
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            return self._m[index[0] * 4 + index[1]]
+        return self._m[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            index = index[0] * 4 + index[1]
+        self._m[index] = float(value)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, [self._m[i:i + 4] for i in range(0, 16, 4)])
+
+    def __eq__(self, other):
+        return isinstance(other, MMatrix) and self._m == other._m
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __mul__(self, other):
+        if not isinstance(other, MMatrix):
+            return type(self)([v * other for v in self._m])
+        a, b = self._m, other._m
+        result = []
+        for row in range(0, 16, 4):
+            a0, a1, a2, a3 = a[row], a[row + 1], a[row + 2], a[row + 3]
+            result.extend([a0 * b[0] + a1 * b[4] + a2 * b[8] + a3 * b[12],
+                           a0 * b[1] + a1 * b[5] + a2 * b[9] + a3 * b[13],
+                           a0 * b[2] + a1 * b[6] + a2 * b[10] + a3 * b[14],
+                           a0 * b[3] + a1 * b[7] + a2 * b[11] + a3 * b[15]])
+        return type(self)(result)
+
+    def getElement(self, row, column):
+        return self._m[row * 4 + column]
+
+    def setElement(self, row, column, value):
+        self._m[row * 4 + column] = float(value)
+
+    def transpose(self):
+        m = self._m
+        return type(self)([m[c * 4 + r] for r in range(4) for c in range(4)])
+
+    def inverse(self):
+        # Gauss-Jordan elimination with partial pivoting
+        rows = [self._m[i:i + 4] + [1.0 if j == i // 4 else 0.0 for j in range(4)] for i in range(0, 16, 4)]
+        for column in range(4):
+            pivot = max(range(column, 4), key=lambda r: abs(rows[r][column]))
+            if abs(rows[pivot][column]) < _TOLERANCE:
+                raise RuntimeError('(kFailure): Matrix is singular')
+            rows[column], rows[pivot] = rows[pivot], rows[column]
+            scale = rows[column][column]
+            rows[column] = [v / scale for v in rows[column]]
+            for r in range(4):
+                if r != column and rows[r][column] != 0.0:
+                    factor = rows[r][column]
+                    rows[r] = [v - factor * p for v, p in zip(rows[r], rows[column])]
+        return type(self)([v for row in rows for v in row[4:]])
+
+    def det3x3(self):
+        m = self._m
+        return (m[0] * (m[5] * m[10] - m[6] * m[9])
+                - m[1] * (m[4] * m[10] - m[6] * m[8])
+                + m[2] * (m[4] * m[9] - m[5] * m[8]))
+
+    def isEquivalent(self, other, tolerance=_TOLERANCE):
+        return all(abs(a - b) <= tolerance for a, b in zip(self._m, MMatrix(other)._m))
+
+MMatrix.kIdentity = MMatrix()
+
+
+class MQuaternion(object):
+
+    __slots__ = ('x', 'y', 'z', 'w')
+
+    def __init__(self, *args):
+        if not args:
+            self.x, self.y, self.z, self.w = 0.0, 0.0, 0.0, 1.0
+        elif len(args) == 1:
+            self.x, self.y, self.z, self.w = [float(v) for v in tuple(args[0])]
+        elif len(args) == 2:
+            # angle, axis
+            angle, axis = args
+            axis = MVector(axis).normal()
+            s = math.sin(angle / 2.0)
+            self.x, self.y, self.z, self.w = axis.x * s, axis.y * s, axis.z * s, math.cos(angle / 2.0)
+        else:
+            self.x, self.y, self.z, self.w = [float(v) for v in args[:4]]
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.w))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z, self.w)[index]
+
+    def __repr__(self):
+        return 'MQuaternion(%r, %r, %r, %r)' % (self.x, self.y, self.z, self.w)
+
+    def __mul__(self, other):
+        # Maya composes quaternions like matrices: (a * b).asMatrix() == a.asMatrix() * b.asMatrix()
+        a, b = other, self
+        return MQuaternion(a.w * b.x + a.x * b.w + a.y * b.z - a.z * b.y,
+                           a.w * b.y - a.x * b.z + a.y * b.w + a.z * b.x,
+                           a.w * b.z + a.x * b.y - a.y * b.x + a.z * b.w,
+                           a.w * b.w - a.x * b.x - a.y * b.y - a.z * b.z)
+
+    def conjugate(self):
+        return MQuaternion(-self.x, -self.y, -self.z, self.w)
+
+    def inverse(self):
+        norm = self.x * self.x + self.y * self.y + self.z * self.z + self.w * self.w
+        return MQuaternion(-self.x / norm, -self.y / norm, -self.z / norm, self.w / norm)
+
+    def normal(self):
+        norm = math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z + self.w * self.w)
+        return MQuaternion(self.x / norm, self.y / norm, self.z / norm, self.w / norm)
+
+    def asMatrix(self):
+        x, y, z, w = self.normal()
+        # Row vector form, the transpose of the usual column vector rotation matrix
+        return MMatrix([1 - 2 * (y * y + z * z), 2 * (x * y + z * w), 2 * (x * z - y * w), 0.0,
+                        2 * (x * y - z * w), 1 - 2 * (x * x + z * z), 2 * (y * z + x * w), 0.0,
+                        2 * (x * z + y * w), 2 * (y * z - x * w), 1 - 2 * (x * x + y * y), 0.0,
+                        0.0, 0.0, 0.0, 1.0])
+
+    def asEulerRotation(self):
+        return MEulerRotation.decompose(self.asMatrix(), MEulerRotation.kXYZ)
+
+    def isEquivalent(self, other, tolerance=_TOLERANCE):
+        same = all(abs(a - b) <= tolerance for a, b in zip(self, other))
+        flipped = all(abs(a + b) <= tolerance for a, b in zip(self, other))
+        return same or flipped
+
+    @classmethod
+    def fromMatrix(cls, matrix):
+        m = matrix._m if isinstance(matrix, MMatrix) else matrix
+        # Column vector entries r[i][j] are the transposed row vector entries m[j][i]
+        r00, r01, r02 = m[0], m[4], m[8]
+        r10, r11, r12 = m[1], m[5], m[9]
+        r20, r21, r22 = m[2], m[6], m[10]
+        trace = r00 + r11 + r22
+        if trace > 0.0:
+            s = math.sqrt(trace + 1.0) * 2.0
+            return cls((r21 - r12) / s, (r02 - r20) / s, (r10 - r01) / s, 0.25 * s)
+        if r00 > r11 and r00 > r22:
+            s = math.sqrt(1.0 + r00 - r11 - r22) * 2.0
+            return cls(0.25 * s, (r01 + r10) / s, (r02 + r20) / s, (r21 - r12) / s)
+        if r11 > r22:
+            s = math.sqrt(1.0 + r11 - r00 - r22) * 2.0
+            return cls((r01 + r10) / s, 0.25 * s, (r12 + r21) / s, (r02 - r20) / s)
+        s = math.sqrt(1.0 + r22 - r00 - r11) * 2.0
+        return cls((r02 + r20) / s, (r12 + r21) / s, 0.25 * s, (r10 - r01) / s)
+
+
+class MEulerRotation(object):
+
+    kXYZ, kYZX, kZXY, kXZY, kYXZ, kZYX = range(6)
+    _orders = ('xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx')
+
+    __slots__ = ('x', 'y', 'z', 'order')
+
+    def __init__(self, *args):
+        order = MEulerRotation.kXYZ
+        if not args:
+            values = (0.0, 0.0, 0.0)
+        elif len(args) <= 2 and not isinstance(args[0], (int, float)):
+            values = tuple(args[0])
+            if isinstance(args[0], MEulerRotation):
+                order = args[0].order
+            if len(args) == 2:
+                order = args[1]
+        else:
+            values = args[:3]
+            if len(args) > 3:
+                order = args[3]
+        self.x, self.y, self.z = float(values[0]), float(values[1]), float(values[2])
+        self.order = order
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z)[index]
+
+    def __repr__(self):
+        return 'MEulerRotation(%r, %r, %r, %r)' % (self.x, self.y, self.z, self.order)
+
+    @staticmethod
+    def _axisMatrix(axis, angle):
+        c, s = math.cos(angle), math.sin(angle)
+        if axis == 'x':
+            return MMatrix([1, 0, 0, 0, 0, c, s, 0, 0, -s, c, 0, 0, 0, 0, 1])
+        if axis == 'y':
+            return MMatrix([c, 0, -s, 0, 0, 1, 0, 0, s, 0, c, 0, 0, 0, 0, 1])
+        return MMatrix([c, s, 0, 0, -s, c, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1])
+
+    def asMatrix(self):
+        angles = {'x': self.x, 'y': self.y, 'z': self.z}
+        matrix = MMatrix()
+        for axis in self._orders[self.order]:
+            if angles[axis]:
+                matrix = matrix * self._axisMatrix(axis, angles[axis])
+        return matrix
+
+    def asQuaternion(self):
+        return MQuaternion.fromMatrix(self.asMatrix())
+
+    def asVector(self):
+        return MVector(self.x, self.y, self.z)
+
+    def isEquivalent(self, other, tolerance=_TOLERANCE):
+        return all(abs(a - b) <= tolerance for a, b in zip(self, other))
+
+    @classmethod
+    def decompose(cls, matrix, order):
+        if order != cls.kXYZ:
+            raise NotImplementedError('Only the XYZ rotate order can be decomposed headlessly')
+        m = MMatrix(matrix)
+        # Normalise the rows so scaled matrices decompose cleanly
+        rows = []
+        for r in range(3):
+            row = MVector(m[r * 4], m[r * 4 + 1], m[r * 4 + 2]).normal()
+            rows.append(row)
+        sy = -rows[0].z
+        sy = max(-1.0, min(1.0, sy))
+        y = math.asin(sy)
+        if abs(math.cos(y)) > 1e-8:
+            x = math.atan2(rows[1].z, rows[2].z)
+            z = math.atan2(rows[0].y, rows[0].x)
+        else:
+            x = math.atan2(-rows[2].y, rows[1].y)
+            z = 0.0
+        return cls(x, y, z, order)
+
+
+class MTransformationMatrix(object):
+
+    def __init__(self, matrix=None):
+        self._translation = MVector()
+        self._rotation = MQuaternion()
+        self._scale = [1.0, 1.0, 1.0]
+        if isinstance(matrix, MTransformationMatrix):
+            self._translation = MVector(matrix._translation)
+            self._rotation = MQuaternion(matrix._rotation)
+            self._scale = list(matrix._scale)
+        elif matrix is not None:
+            self._decompose(MMatrix(matrix))
+
+    def _decompose(self, matrix):
+        m = matrix._m
+        self._translation = MVector(m[12], m[13], m[14])
+        rows = [MVector(m[0], m[1], m[2]), MVector(m[4], m[5], m[6]), MVector(m[8], m[9], m[10])]
+        scale = [row.length() for row in rows]
+        if matrix.det3x3() < 0:
+            scale[0] = -scale[0]
+        self._scale = scale
+        rows = [row / s if abs(s) > _TOLERANCE else row for row, s in zip(rows, scale)]
+        self._rotation = MQuaternion.fromMatrix([v for row in rows for v in (row.x, row.y, row.z, 0.0)]
+                                                + [0.0, 0.0, 0.0, 1.0])
+
+    def asMatrix(self):
+        s = self._scale
+        scale = MMatrix([s[0], 0, 0, 0, 0, s[1], 0, 0, 0, 0, s[2], 0, 0, 0, 0, 1])
+        matrix = scale * self._rotation.asMatrix()
+        t = self._translation
+        matrix[12], matrix[13], matrix[14] = t.x, t.y, t.z
+        return matrix
+
+    def translation(self, space=MSpace.kTransform):
+        return MVector(self._translation)
+
+    def setTranslation(self, vector, space=MSpace.kTransform):
+        self._translation = MVector(vector)
+        return self
+
+    def translateBy(self, vector, space=MSpace.kTransform):
+        self._translation = self._translation + MVector(vector)
+        return self
+
+    def rotation(self, asQuaternion=False):
+        if asQuaternion:
+            return MQuaternion(self._rotation)
+        return MEulerRotation.decompose(self._rotation.asMatrix(), MEulerRotation.kXYZ)
+
+    def setRotation(self, rotation):
+        if isinstance(rotation, MEulerRotation):
+            rotation = rotation.asQuaternion()
+        self._rotation = MQuaternion(rotation)
+        return self
+
+    def rotateBy(self, rotation, space=MSpace.kTransform):
+        if isinstance(rotation, MEulerRotation):
+            rotation = rotation.asQuaternion()
+        if space == MSpace.kWorld:
+            self._rotation = self._rotation * rotation
+        else:
+            self._rotation = rotation * self._rotation
+        return self
+
+    def scale(self, space=MSpace.kTransform):
+        return list(self._scale)
+
+    def setScale(self, scale, space=MSpace.kTransform):
+        self._scale = [float(v) for v in scale]
+        return self
+
+    def scaleBy(self, scale, space=MSpace.kTransform):
+        self._scale = [a * float(b) for a, b in zip(self._scale, scale)]
+        return self
@@ -0,0 +1,753 @@
+'''
+A headless stand-in for the subset of pymel.core used by mayalib.
+
+PyNodes hold a reference to their scene record rather than a name, so like real PyNodes they survive renames
+and reparenting. Virtual classes registered through virtualClasses are honoured when wrapping nodes.
+'''
+
+from headless import scene as _scene
+from headless import OpenMaya as api
+from headless.scene import counted, Plug
+from headless.mmath import MVector, MPoint, MMatrix, MQuaternion, MEulerRotation, MTransformationMatrix, MSpace
+
+
+class MayaNodeError(ValueError):
+    pass
+
+
+class MayaAttributeError(AttributeError):
+    pass
+
+
+##### Data Types #####
+
+class Vector(MVector):
+
+    __slots__ = ()
+
+
+class Point(MPoint):
+
+    __slots__ = ()
+
+
+class Matrix(MMatrix):
+
+    __slots__ = ()
+
+    @property
+    def translate(self):
+        return Vector(self[12], self[13], self[14])
+
+
+class Color(MVector):
+
+    __slots__ = ()
+
+    @property
+    def r(self):
+        return self.x
+
+    @property
+    def g(self):
+        return self.y
+
+    @property
+    def b(self):
+        return self.z
+
+
+class _Namespace(object):
+
+    def __init__(self, **members):
+        self.__dict__.update(members)
+
+
+datatypes = _Namespace(Vector=Vector, Point=Point, Matrix=Matrix, Color=Color, Quaternion=MQuaternion,
+                       EulerRotation=MEulerRotation, TransformationMatrix=MTransformationMatrix)
+
+
+##### Virtual Classes #####
+
+class _VirtualClassManager(object):
+
+    def __init__(self):
+        self._classes = []
+
+    def register(self, cls, nameRequired=False):
+        if cls not in self._classes:
+            self._classes.append(cls)
+
+    def unregister(self, cls):
+        self._classes.remove(cls)
+
+    def find(self, base, record):
+        for cls in reversed(self._classes):
+            if issubclass(cls, base) and cls._isVirtual(api.MObject(record), record.name):
+                return cls
+        return None
+
+
+virtualClasses = _VirtualClassManager()
+
+
+##### Nodes #####
+
+def _record(node):
+    if isinstance(node, DependNode):
+        if not node._record.alive:
+            raise MayaNodeError('Object no longer exists: %s' % node._record.name)
+        return node._record
+    if isinstance(node, api.MObject):
+        return node._record
+    record = _scene.current().find(node)
+    if record is None:
+        raise MayaNodeError('No object matches name: %s' % node)
+    return record
+
+
+def _flatten(args):
+    nodes = []
+    for arg in args:
+        if isinstance(arg, (list, tuple)):
+            nodes.extend(_flatten(arg))
+        elif arg is not None:
+            nodes.append(arg)
+    return nodes
+
+
+def _classFor(record):
+    if record.type == 'joint':
+        return Joint
+    if record.isTransform:
+        return Transform
+    if record.type == 'nurbsCurve':
+        return NurbsCurve
+    if record.isDag:
+        return DagNode
+    return DependNode
+
+
+def _wrap(record, cls=None):
+    cls = cls or _classFor(record)
+    cls = virtualClasses.find(cls, record) or cls
+    node = object.__new__(cls)
+    node._record = record
+    return node
+
+
+class PyNode(object):
+    '''
+    Wraps a node name, MObject or record in the most specific node class, like pymel.core.PyNode.
+    '''
+
+    def __new__(cls, *args, **kwargs):
+        if cls is PyNode:
+            if isinstance(args[0], Attribute) or '.' in str(args[0]):
+                return Attribute(args[0])
+            return _wrap(_record(args[0]))
+        if args:
+            return _wrap(_record(args[0]), cls)
+        # Constructing a node class with no arguments creates a new node, as in pymel
+        if hasattr(cls, '_preCreateVirtual'):
+            kwargs, postKwargs = cls._preCreateVirtual(**kwargs)
+        else:
+            postKwargs = None
+        record = _scene.current().create(cls._nodeType, kwargs.get('name', kwargs.get('n')))
+        node = _wrap(record, cls)
+        if postKwargs is not None:
+            cls._postCreateVirtual(node, **postKwargs)
+        return node
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class DependNode(PyNode):
+
+    _nodeType = 'dependNode'
+
+    def __str__(self):
+        return self._record.name
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self._record.name)
+
+    def __eq__(self, other):
+        if isinstance(other, DependNode):
+            return self._record is other._record
+        return isinstance(other, str) and other == self._record.name
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self._record.uid
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        spec = self.__dict__.get('_record') and self._record.spec(attr)
+        if spec is None:
+            raise MayaAttributeError('%s.%s' % (self, attr))
+        return Attribute(Plug(self._record, spec))
+
+    def __melobject__(self):
+        return self._record.name
+
+    def exists(self):
+        return self._record.alive
+
+    def name(self, long=False):
+        return self._record.name
+
+    def nodeName(self):
+        return self._record.name
+
+    def type(self):
+        return self._record.type
+
+    nodeType = type
+
+    def __apimobject__(self):
+        return api.MObject(self._record)
+
+    def hasAttr(self, attr):
+        return self._record.spec(attr) is not None
+
+    def attr(self, attr):
+        spec = self._record.spec(attr)
+        if spec is None:
+            raise MayaAttributeError('%s.%s' % (self, attr))
+        return Attribute(Plug(self._record, spec))
+
+    @counted('pmc.DependNode.addAttr')
+    def addAttr(self, attr=None, **kwargs):
+        attr = attr or kwargs.pop('name', None) or kwargs.pop('longName', None) or kwargs.pop('ln', None)
+        kind = kwargs.get('attributeType', kwargs.get('at')) or kwargs.get('dataType', kwargs.get('dt')) or 'double'
+        _scene.current().addAttribute(self._record, attr, kwargs.get('shortName', kwargs.get('sn')), kind,
+                                      default=kwargs.get('defaultValue', kwargs.get('dv')),
+                                      keyable=bool(kwargs.get('keyable', kwargs.get('k', False))),
+                                      parent=kwargs.get('parent', kwargs.get('p')),
+                                      minimum=kwargs.get('minValue', kwargs.get('min')),
+                                      maximum=kwargs.get('maxValue', kwargs.get('max')))
+
+    @counted('pmc.DependNode.deleteAttr')
+    def deleteAttr(self, attr):
+        _scene.current().deleteAttribute(self._record, attr)
+
+    @counted('pmc.DependNode.listAttr')
+    def listAttr(self, userDefined=False, keyable=False, **kwargs):
+        scene = _scene.current()
+        if userDefined or kwargs.get('ud'):
+            specs = [spec for name, spec in self._record.dynamic.items() if name == spec.longName]
+            return [Attribute(Plug(self._record, spec)) for spec in specs]
+        if keyable or kwargs.get('k'):
+            return [Attribute(plug) for plug in scene.keyablePlugs(self._record)]
+        return [Attribute(Plug(self._record, spec)) for spec in self._record.schema.ordered]
+
+    @counted('pmc.DependNode.rename')
+    def rename(self, name):
+        _scene.current().rename(self._record, str(name))
+        return self
+
+    @counted('pmc.DependNode.duplicate')
+    def duplicate(self, **kwargs):
+        return [_wrap(copy) for copy in _scene.current().duplicate([self._record])]
+
+    @counted('pmc.DependNode.connections')
+    def connections(self, source=True, destination=True):
+        record = self._record
+        related = (list(record.inputs.values()) if source else [])
+        if destination:
+            related += [target for targets in record.outputs.values() for target in targets]
+        return [_wrap(plug.node) for plug in related]
+
+
+class DagNode(DependNode):
+
+    _nodeType = 'dagNode'
+
+    def name(self, long=False):
+        if long:
+            return _scene.current().fullPath(self._record)
+        return self._record.name
+
+    def fullPath(self):
+        return _scene.current().fullPath(self._record)
+
+    @counted('pmc.DagNode.getParent')
+    def getParent(self, generations=1):
+        record = self._record
+        for _ in range(generations):
+            record = record.parent
+            if record is None or record.type == 'world':
+                return None
+        return _wrap(record)
+
+    @counted('pmc.DagNode.getChildren')
+    def getChildren(self, **kwargs):
+        return self._related(list(self._record.children), **kwargs)
+
+    @counted('pmc.DagNode.listRelatives')
+    def listRelatives(self, allDescendents=False, ad=False, children=False, c=False, parent=False, p=False,
+                      shapes=False, s=False, type=None):
+        if parent or p:
+            parentNode = self._record.parent
+            related = [parentNode] if parentNode is not None and parentNode.type != 'world' else []
+        elif allDescendents or ad:
+            related = list(self._record.descendants())
+        else:
+            related = list(self._record.children)
+        return self._related(related, shapes=shapes or s, type=type)
+
+    def _related(self, records, shapes=False, type=None):
+        if shapes:
+            records = [r for r in records if r.isShape]
+        if type:
+            records = [r for r in records if r.isA(type)]
+        return [_wrap(r) for r in records]
+
+    def getShapes(self):
+        return self._related(list(self._record.children), shapes=True)
+
+    def getShape(self):
+        shapes = self.getShapes()
+        return shapes[0] if shapes else None
+
+    @counted('pmc.DagNode.setParent')
+    def setParent(self, parent=None, world=False, relative=False):
+        scene = _scene.current()
+        scene.reparent(self._record, None if world or parent is None else _record(parent), relative)
+        return self
+
+    @counted('pmc.DagNode.hide')
+    def hide(self):
+        _scene.current().setValue(Plug(self._record, self._record.spec('visibility')), False)
+
+    @counted('pmc.DagNode.show')
+    def show(self):
+        _scene.current().setValue(Plug(self._record, self._record.spec('visibility')), True)
+
+    def isVisible(self):
+        return bool(_scene.current().getValue(Plug(self._record, self._record.spec('visibility'))))
+
+
+def _worldSpace(space=None, worldSpace=False, **kwargs):
+    return worldSpace or kwargs.get('ws', False) or space in ('world', MSpace.kWorld)
+
+
+class Transform(DagNode):
+
+    _nodeType = 'transform'
+
+    @counted('pmc.Transform.getMatrix')
+    def getMatrix(self, worldSpace=False, **kwargs):
+        scene = _scene.current()
+        if _worldSpace(worldSpace=worldSpace, **kwargs):
+            return Matrix(scene.worldMatrix(self._record))
+        return Matrix(scene.localMatrix(self._record))
+
+    @counted('pmc.Transform.setMatrix')
+    def setMatrix(self, matrix, worldSpace=False, **kwargs):
+        scene = _scene.current()
+        if _worldSpace(worldSpace=worldSpace, **kwargs):
+            scene.setWorldMatrix(self._record, MMatrix(matrix))
+        else:
+            scene.setLocalMatrix(self._record, MMatrix(matrix))
+
+    @counted('pmc.Transform.getTranslation')
+    def getTranslation(self, space='object', worldSpace=False, **kwargs):
+        scene = _scene.current()
+        if _worldSpace(space, worldSpace, **kwargs):
+            return Vector(scene.worldTranslation(self._record))
+        return Vector(scene._vector(self._record, 'translate'))
+
+    @counted('pmc.Transform.setTranslation')
+    def setTranslation(self, vector, space='object', worldSpace=False, **kwargs):
+        scene = _scene.current()
+        if _worldSpace(space, worldSpace, **kwargs):
+            scene.setWorldTranslation(self._record, MVector(vector))
+        else:
+            scene._setVector(self._record, 'translate', MVector(vector))
+
+    @counted('pmc.Transform.getRotation')
+    def getRotation(self, space='object', quaternion=False, worldSpace=False, **kwargs):
+        scene = _scene.current()
+        if _worldSpace(space, worldSpace, **kwargs):
+            rotation = scene.worldRotation(self._record)
+        else:
+            rotation = MTransformationMatrix(scene.localMatrix(self._record)).rotation(True)
+        if quaternion:
+            return rotation
+        return Vector([v * 57.29577951308232 for v in rotation.asEulerRotation()])
+
+    @counted('pmc.Transform.setRotation')
+    def setRotation(self, rotation, space='object', worldSpace=False, **kwargs):
+        scene = _scene.current()
+        if not isinstance(rotation, MQuaternion):
+            rotation = MEulerRotation([v / 57.29577951308232 for v in rotation]).asQuaternion()
+        if _worldSpace(space, worldSpace, **kwargs):
+            scene.setWorldRotation(self._record, rotation)
+        else:
+            scene.setLocalRotation(self._record, rotation)
+
+    @counted('pmc.Transform.getScale')
+    def getScale(self):
+        return _scene.current()._vector(self._record, 'scale')
+
+    @counted('pmc.Transform.setScale')
+    def setScale(self, scale):
+        _scene.current()._setVector(self._record, 'scale', scale)
+
+
+class Joint(Transform):
+
+    _nodeType = 'joint'
+
+
+class NurbsCurve(DagNode):
+
+    _nodeType = 'nurbsCurve'
+
+    @counted('pmc.NurbsCurve.getCVs')
+    def getCVs(self, space='preTransform'):
+        matrix = _scene.current().worldMatrix(self._record.parent) if space == 'world' else None
+        points = [Point(cv) for cv in self._record.curve.cvs]
+        return [Point(point * matrix) for point in points] if matrix is not None else points
+
+    @counted('pmc.NurbsCurve.setCVs')
+    def setCVs(self, points, space='preTransform'):
+        if space == 'world':
+            inverse = _scene.current().worldMatrix(self._record.parent).inverse()
+            points = [MPoint(point) * inverse for point in points]
+        self._record.curve.cvs = [[float(v) for v in list(point)[:3]] for point in points]
+
+    def getKnots(self):
+        return list(self._record.curve.knots)
+
+    def degree(self):
+        return self._record.curve.degree
+
+    def numCVs(self):
+        return len(self._record.curve.cvs)
+
+    def updateCurve(self):
+        pass
+
+
+nodetypes = _Namespace(DependNode=DependNode, DagNode=DagNode, Transform=Transform, Joint=Joint,
+                       NurbsCurve=NurbsCurve)
+
+
+##### Attributes #####
+
+class Attribute(object):
+
+    def __init__(self, plug):
+        if not isinstance(plug, Plug):
+            plug = _scene.current().plug(plug)
+        self._plug = plug
+
+    def __str__(self):
+        return self._plug.name
+
+    def __repr__(self):
+        return 'Attribute(%r)' % self._plug.name
+
+    def __eq__(self, other):
+        return isinstance(other, Attribute) and self._plug == other._plug
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._plug)
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        for child in self._plug.spec.children:
+            if attr in (child.longName, child.shortName):
+                return Attribute(Plug(self._plug.node, child))
+        raise MayaAttributeError('%s.%s' % (self, attr))
+
+    def __rshift__(self, other):
+        self.connect(other)
+
+    def name(self):
+        return self._plug.name
+
+    def attrName(self, longName=False):
+        return self._plug.spec.longName if longName else self._plug.spec.shortName
+
+    def longName(self):
+        return self._plug.spec.longName
+
+    def node(self):
+        return _wrap(self._plug.node)
+
+    plugNode = node
+
+    def exists(self):
+        return self._plug.node.alive and self._plug.node.spec(self._plug.spec.longName) is not None
+
+    @counted('pmc.Attribute.get')
+    def get(self, time=None, **kwargs):
+        scene = _scene.current()
+        value = scene.getValue(self._plug, time if time is not None else kwargs.get('t'))
+        spec = self._plug.spec
+        if spec.kind == 'matrix':
+            return Matrix(value)
+        if spec.kind == 'message':
+            return _wrap(scene.get(value)) if value else None
+        if spec.children:
+            return Vector(value[0]) if len(spec.children) == 3 else value[0]
+        return value
+
+    @counted('pmc.Attribute.set')
+    def set(self, *values, **kwargs):
+        scene = _scene.current()
+        if values:
+            scene.setValue(self._plug, values[0] if len(values) == 1 else values)
+        scene.setFlags(self._plug, lock=kwargs.get('lock', kwargs.get('l')),
+                       keyable=kwargs.get('keyable', kwargs.get('k')),
+                       channelBox=kwargs.get('channelBox', kwargs.get('cb')))
+
+    @counted('pmc.Attribute.connect')
+    def connect(self, other, force=False, **kwargs):
+        target = other._plug if isinstance(other, Attribute) else _scene.current().plug(other)
+        _scene.current().connect(self._plug, target, force or kwargs.get('f', False))
+
+    @counted('pmc.Attribute.disconnect')
+    def disconnect(self, other=None):
+        scene = _scene.current()
+        if other is not None:
+            scene.disconnect(self._plug, other._plug)
+            return
+        source = self._plug.node.inputs.get(self._plug.spec.longName)
+        if source is not None:
+            scene.disconnect(source, self._plug)
+
+    def inputs(self):
+        source = self._plug.node.inputs.get(self._plug.spec.longName)
+        return [_wrap(source.node)] if source else []
+
+    def outputs(self):
+        return [_wrap(plug.node) for plug in self._plug.node.outputs.get(self._plug.spec.longName, [])]
+
+    def getChildren(self):
+        return [Attribute(Plug(self._plug.node, child)) for child in self._plug.spec.children]
+
+    def lock(self):
+        _scene.current().setFlags(self._plug, lock=True)
+
+    def unlock(self):
+        _scene.current().setFlags(self._plug, lock=False)
+
+    def isLocked(self):
+        return self._plug.spec.longName in self._plug.node.locked
+
+    def setKeyable(self, keyable):
+        _scene.current().setFlags(self._plug, keyable=keyable)
+
+    def isKeyable(self):
+        return _scene.current().isKeyable(self._plug)
+
+    def showInChannelBox(self, show):
+        _scene.current().setFlags(self._plug, channelBox=show)
+
+
+##### Commands #####
+
+def _nodes(args):
+    return [_record(arg) for arg in _flatten(args)]
+
+
+def objExists(name):
+    return _scene.current().find(str(name)) is not None
+
+
+@counted('pmc.ls')
+def ls(*args, **kwargs):
+    scene = _scene.current()
+    if args:
+        return [_wrap(record) for record in _nodes(args)]
+    return [_wrap(record) for record in scene.ls(kwargs.get('type'))]
+
+
+@counted('pmc.createNode')
+def createNode(nodeType, name=None, parent=None, **kwargs):
+    scene = _scene.current()
+    name = name or kwargs.get('n')
+    parent = parent or kwargs.get('p')
+    return _wrap(scene.create(nodeType, name, _record(parent) if parent else None))
+
+
+@counted('pmc.group')
+def group(*args, **kwargs):
+    scene = _scene.current()
+    parent = kwargs.get('parent', kwargs.get('p'))
+    name = kwargs.get('name', kwargs.get('n')) or 'null1'
+    record = scene.create('transform', name, _record(parent) if parent else None)
+    if not kwargs.get('empty', kwargs.get('em', False)):
+        for child in _nodes(args):
+            scene.reparent(child, record)
+    return _wrap(record)
+
+
+@counted('pmc.parent')
+def parent(*args, **kwargs):
+    scene = _scene.current()
+    nodes = _nodes(args)
+    if kwargs.get('world', kwargs.get('w', False)):
+        target = scene.world
+    else:
+        nodes, target = nodes[:-1], nodes[-1]
+    relative = kwargs.get('relative', kwargs.get('r', False))
+    for node in nodes:
+        if node.parent is target and target is scene.world:
+            continue
+        if node.parent is target:
+            raise RuntimeError('Object %s is already a child of the given parent.' % node.name)
+        scene.reparent(node, target, relative)
+    return [_wrap(node) for node in nodes]
+
+
+@counted('pmc.delete')
+def delete(*args, **kwargs):
+    scene = _scene.current()
+    for node in _nodes(args):
+        scene.delete(node)
+
+
+@counted('pmc.duplicate')
+def duplicate(*args, **kwargs):
+    return [_wrap(copy) for copy in _scene.current().duplicate(_nodes(args))]
+
+
+@counted('pmc.rename')
+def rename(node, name):
+    record = _record(node)
+    _scene.current().rename(record, str(name))
+    return _wrap(record)
+
+
+@counted('pmc.hide')
+def hide(*args, **kwargs):
+    scene = _scene.current()
+    for node in _nodes(args):
+        scene.setValue(Plug(node, node.spec('visibility')), False)
+
+
+@counted('pmc.showHidden')
+def showHidden(*args, **kwargs):
+    scene = _scene.current()
+    for node in _nodes(args):
+        scene.setValue(Plug(node, node.spec('visibility')), True)
+
+
+@counted('pmc.matchTransform')
+def matchTransform(*args, **kwargs):
+    scene = _scene.current()
+    nodes = _nodes(args)
+    target = scene.worldMatrix(nodes[-1])
+    for node in nodes[:-1]:
+        scene.setWorldMatrix(node, target)
+
+
+def _constraint(nodeType, args, kwargs):
+    nodes = _nodes(args)
+    name = kwargs.get('name', kwargs.get('n'))
+    return _wrap(_scene.current().constrain(nodeType, nodes[:-1], nodes[-1], name))
+
+
+@counted('pmc.parentConstraint')
+def parentConstraint(*args, **kwargs):
+    return _constraint('parentConstraint', args, kwargs)
+
+
+@counted('pmc.orientConstraint')
+def orientConstraint(*args, **kwargs):
+    return _constraint('orientConstraint', args, kwargs)
+
+
+@counted('pmc.pointConstraint')
+def pointConstraint(*args, **kwargs):
+    return _constraint('pointConstraint', args, kwargs)
+
+
+@counted('pmc.poleVectorConstraint')
+def poleVectorConstraint(*args, **kwargs):
+    return _constraint('poleVectorConstraint', args, kwargs)
+
+
+@counted('pmc.ikHandle')
+def ikHandle(*args, **kwargs):
+    start = _record(kwargs.get('startJoint', kwargs.get('sj')))
+    end = _record(kwargs.get('endEffector', kwargs.get('ee')))
+    handle, effector = _scene.current().ikHandle(start, end, kwargs.get('name', kwargs.get('n')))
+    return [_wrap(handle), _wrap(effector)]
+
+
+@counted('pmc.setKeyframe')
+def setKeyframe(*args, **kwargs):
+    scene = _scene.current()
+    time = kwargs.get('time', kwargs.get('t', scene.time))
+    if isinstance(time, (list, tuple)):
+        time = time[0]
+    attributes = kwargs.get('attribute', kwargs.get('at'))
+    if isinstance(attributes, str):
+        attributes = [attributes]
+    count = 0
+    for node in _nodes(args):
+        if attributes:
+            plugs = [Plug(node, node.spec(attr)) for attr in attributes if node.spec(attr) is not None]
+        else:
+            plugs = scene.keyablePlugs(node)
+        for plug in plugs:
+            scene.setKey(plug, time)
+            count += len(plug.spec.leaves())
+    return count
+
+
+@counted('pmc.currentTime')
+def currentTime(*args, **kwargs):
+    scene = _scene.current()
+    if kwargs.get('query', kwargs.get('q', False)):
+        return scene.time
+    scene.time = float(args[0])
+    return scene.time
+
+
+@counted('pmc.playbackOptions')
+def playbackOptions(**kwargs):
+    scene = _scene.current()
+    minTime = kwargs.get('minTime', kwargs.get('min'))
+    maxTime = kwargs.get('maxTime', kwargs.get('max'))
+    if kwargs.get('query', kwargs.get('q', False)):
+        return scene.playback[0] if minTime else scene.playback[1]
+    if minTime is not None:
+        scene.playback[0] = float(minTime)
+    if maxTime is not None:
+        scene.playback[1] = float(maxTime)
+
+
+@counted('pmc.undoInfo')
+def undoInfo(**kwargs):
+    scene = _scene.current()
+    if kwargs.get('openChunk', kwargs.get('ock', False)):
+        scene.undoDepth += 1
+    elif kwargs.get('closeChunk', kwargs.get('cck', False)):
+        scene.undoDepth = max(0, scene.undoDepth - 1)
+    elif kwargs.get('query', kwargs.get('q', False)):
+        return True
+
+
+@counted('pmc.undo')
+def undo(*args, **kwargs):
+    raise RuntimeError('There are no more commands to undo.')
+
+
+nt = nodetypes
+dt = datatypes
@@ -0,0 +1,926 @@
+'''
+The in-memory scene graph behind the headless backend.
+
+Nodes are plain records holding their attribute values, connections, keys and curve data.
+Connections are followed one level when reading values, but nothing is evaluated: constraints,
+ik handles and expressions are recorded so the scene has the right structure, they just don't drive anything.
+
+Every public command and API method of the headless backend is wrapped with counted(),
+which tallies calls in the module level calls Counter so benchmarks can report backend round trips.
+'''
+
+import collections
+import functools
+import itertools
+import math
+import re
+import struct
+
+from headless.mmath import MMatrix, MVector, MPoint, MQuaternion, MEulerRotation, MTransformationMatrix
+
+calls = collections.Counter()
+
+
+def counted(name):
+    '''
+    Decorates a backend entry point so calls to it are tallied in calls under the given name.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+##### Attribute Schemas #####
+
+class AttributeSpec(object):
+
+    __slots__ = ('longName', 'shortName', 'kind', 'default', 'children', 'parent', 'array',
+                 'keyable', 'writable', 'dynamic', 'minimum', 'maximum')
+
+    def __init__(self, longName, shortName=None, kind='double', default=0.0, children=(), array=False,
+                 keyable=False, writable=True, dynamic=False, minimum=None, maximum=None):
+        self.longName = longName
+        self.shortName = shortName or longName
+        self.kind = kind
+        self.default = default
+        self.children = tuple(children)
+        self.parent = None
+        self.array = array
+        self.keyable = keyable
+        self.writable = writable
+        self.dynamic = dynamic
+        self.minimum = minimum
+        self.maximum = maximum
+        for child in self.children:
+            child.parent = self
+
+    def __repr__(self):
+        return 'AttributeSpec(%r, %r)' % (self.longName, self.kind)
+
+    @property
+    def numeric(self):
+        return self.kind in _NUMERIC_KINDS
+
+    def leaves(self):
+        if self.children:
+            return [leaf for child in self.children for leaf in child.leaves()]
+        return [self]
+
+
+_NUMERIC_KINDS = frozenset(['double', 'float', 'doubleLinear', 'doubleAngle', 'bool', 'long', 'short',
+                            'byte', 'enum', 'time'])
+_INTEGER_KINDS = frozenset(['long', 'short', 'byte', 'enum'])
+_VECTOR_KINDS = frozenset(['double3', 'float3', 'long3', 'short3'])
+
+
+def _compound(longName, shortName, kind, suffixes, shortSuffixes, default=0.0, keyable=False,
+              childKind='double', childBase=None, childShortBase=None):
+    childBase = childBase or longName
+    childShortBase = childShortBase or shortName
+    children = [AttributeSpec(childBase + suffix, childShortBase + shortSuffix, childKind, default, keyable=keyable)
+                for suffix, shortSuffix in zip(suffixes, shortSuffixes)]
+    return AttributeSpec(longName, shortName, kind, children=children, keyable=keyable)
+
+
+def _xyz(longName, shortName, default=0.0, keyable=False, kind='double3', childKind='double'):
+    return _compound(longName, shortName, kind, 'XYZ', 'xyz', default, keyable, childKind)
+
+
+def _rgb(longName, shortName, default=0.0, kind='float3', childBase=None, childShortBase=None):
+    return _compound(longName, shortName, kind, 'RGB', 'rgb', default, childKind='float', childBase=childBase,
+                     childShortBase=childShortBase)
+
+
+def _matrix(longName, shortName, array=False):
+    return AttributeSpec(longName, shortName, 'matrix', array=array, writable=False)
+
+
+class Schema(object):
+    '''
+    The static attributes of a node type, including those inherited from its parent types.
+    '''
+
+    def __init__(self, typeName, parent, specs):
+        self.typeName = typeName
+        self.parent = parent
+        self.lineage = (typeName,) + (parent.lineage if parent else ())
+        self.ordered = (list(parent.ordered) if parent else []) + list(specs)
+        self.specs = dict(parent.specs) if parent else {}
+        for spec in specs:
+            for attr in [spec] + [child for child in _walk(spec)]:
+                self.specs[attr.longName] = attr
+                self.specs[attr.shortName] = attr
+
+    def isA(self, typeName):
+        return typeName in self.lineage
+
+
+def _walk(spec):
+    for child in spec.children:
+        yield child
+        for grandchild in _walk(child):
+            yield grandchild
+
+
+_SCHEMA_SPECS = [
+    ('dependNode', None, lambda: [
+        AttributeSpec('message', 'msg', 'message', None),
+        AttributeSpec('caching', 'cch', 'bool', False),
+        AttributeSpec('nodeState', 'nds', 'enum', 0),
+    ]),
+    ('dagNode', 'dependNode', lambda: [
+        AttributeSpec('visibility', 'v', 'bool', True, keyable=True),
+        AttributeSpec('template', 'tmp', 'bool', False),
+        AttributeSpec('lodVisibility', 'lodv', 'bool', True),
+        _matrix('matrix', 'm'),
+        _matrix('inverseMatrix', 'im'),
+        _matrix('worldMatrix', 'wm', array=True),
+        _matrix('worldInverseMatrix', 'wim', array=True),
+        _matrix('parentMatrix', 'pm', array=True),
+        _matrix('parentInverseMatrix', 'pim', array=True),
+        AttributeSpec('overrideEnabled', 'ove', 'bool', False),
+        AttributeSpec('overrideDisplayType', 'ovdt', 'enum', 0),
+        AttributeSpec('overrideRGBColors', 'ovrgbf', 'bool', False),
+        AttributeSpec('overrideColor', 'ovc', 'byte', 0),
+        _rgb('overrideColorRGB', 'ovrgb', childBase='overrideColor', childShortBase='ovc'),
+    ]),
+    ('world', 'dagNode', lambda: []),
+    ('transform', 'dagNode', lambda: [
+        _xyz('translate', 't', keyable=True, childKind='doubleLinear'),
+        _xyz('rotate', 'r', keyable=True, childKind='doubleAngle'),
+        _xyz('scale', 's', 1.0, keyable=True),
+        _xyz('shear', 'sh'),
+        AttributeSpec('rotateOrder', 'ro', 'enum', 0),
+        _xyz('rotatePivot', 'rp', kind='double3', childKind='doubleLinear'),
+        _xyz('scalePivot', 'sp', kind='double3', childKind='doubleLinear'),
+        _xyz('rotateAxis', 'ra', childKind='doubleAngle'),
+        AttributeSpec('inheritsTransform', 'it', 'bool', True),
+        AttributeSpec('displayHandle', 'dh', 'bool', False),
+    ]),
+    ('joint', 'transform', lambda: [
+        _xyz('jointOrient', 'jo', childKind='doubleAngle'),
+        AttributeSpec('radius', 'radi', 'double', 1.0),
+        AttributeSpec('segmentScaleCompensate', 'ssc', 'bool', True),
+        AttributeSpec('drawStyle', 'ds', 'enum', 0),
+    ]),
+    ('ikHandle', 'transform', lambda: [
+        _xyz('poleVector', 'pv'),
+        AttributeSpec('twist', 'twi', 'doubleAngle', 0.0, keyable=True),
+        AttributeSpec('ikBlend', 'ikb', 'double', 1.0, keyable=True),
+        AttributeSpec('startJoint', 'hsj', 'message', None),
+        AttributeSpec('endEffector', 'hee', 'message', None),
+    ]),
+    ('ikEffector', 'transform', lambda: []),
+    ('constraint', 'transform', lambda: [
+        AttributeSpec('enableRestPosition', 'erp', 'bool', True),
+        AttributeSpec('target', 'tg', 'message', None, array=True),
+    ]),
+    ('parentConstraint', 'constraint', lambda: []),
+    ('orientConstraint', 'constraint', lambda: []),
+    ('pointConstraint', 'constraint', lambda: []),
+    ('poleVectorConstraint', 'constraint', lambda: []),
+    ('shape', 'dagNode', lambda: []),
+    ('nurbsCurve', 'shape', lambda: [
+        AttributeSpec('create', 'cr', 'nurbsCurve', None),
+        AttributeSpec('local', 'l', 'nurbsCurve', None, writable=False),
+        AttributeSpec('worldSpace', 'ws', 'nurbsCurve', None, array=True, writable=False),
+        AttributeSpec('lineWidth', 'lw', 'float', -1.0),
+        AttributeSpec('dispCV', 'dcv', 'bool', False),
+    ]),
+    ('reverse', 'dependNode', lambda: [
+        _xyz('input', 'i', kind='float3', childKind='float'),
+        _xyz('output', 'o', kind='float3', childKind='float'),
+    ]),
+    ('blendColors', 'dependNode', lambda: [
+        AttributeSpec('blender', 'b', 'float', 0.5, keyable=True),
+        _rgb('color1', 'c1'),
+        _rgb('color2', 'c2'),
+        _rgb('output', 'op'),
+    ]),
+    ('multiplyDivide', 'dependNode', lambda: [
+        AttributeSpec('operation', 'op', 'enum', 1),
+        _xyz('input1', 'i1', kind='float3', childKind='float'),
+        _xyz('input2', 'i2', 1.0, kind='float3', childKind='float'),
+        _xyz('output', 'o', kind='float3', childKind='float'),
+    ]),
+    ('decomposeMatrix', 'dependNode', lambda: [
+        AttributeSpec('inputMatrix', 'imat', 'matrix', None),
+        _xyz('outputTranslate', 'ot'),
+        _xyz('outputRotate', 'or', childKind='doubleAngle'),
+        _xyz('outputScale', 'os', 1.0),
+    ]),
+]
+
+SCHEMAS = {}
+for _typeName, _parentName, _specs in _SCHEMA_SPECS:
+    SCHEMAS[_typeName] = Schema(_typeName, SCHEMAS.get(_parentName), _specs())
+
+_TRANSFORM_TYPES = frozenset(name for name, schema in SCHEMAS.items() if schema.isA('transform'))
+
+
+def schema(typeName):
+    if typeName not in SCHEMAS:
+        raise RuntimeError('Unknown object type: %s' % typeName)
+    return SCHEMAS[typeName]
+
+
+##### Scene Records #####
+
+class CurveData(object):
+
+    __slots__ = ('cvs', 'knots', 'degree', 'form')
+
+    kOpen, kClosed, kPeriodic = 1, 2, 3
+
+    def __init__(self, cvs, knots, degree, form=1):
+        cvs = [[float(v) for v in list(cv)[:3]] for cv in cvs]
+        knots = [float(k) for k in knots]
+        degree = int(degree)
+        if len(knots) != len(cvs) + degree - 1:
+            raise RuntimeError('Number of knots (%d) does not match %d cvs of degree %d'
+                               % (len(knots), len(cvs), degree))
+        self.cvs = cvs
+        self.knots = knots
+        self.degree = degree
+        self.form = form
+
+    def copy(self):
+        return CurveData([list(cv) for cv in self.cvs], list(self.knots), self.degree, self.form)
+
+
+class NodeRecord(object):
+
+    __slots__ = ('uid', 'name', 'type', 'schema', 'parent', 'instances', 'children', 'values', 'locked',
+                 'keyable', 'channelBox', 'dynamic', 'inputs', 'outputs', 'keys', 'curve', 'alive', 'localCache',
+                 'worldCache', '__weakref__')
+
+    _uids = itertools.count(1)
+
+    def __init__(self, name, typeName):
+        self.uid = next(NodeRecord._uids)
+        self.name = name
+        self.type = typeName
+        self.schema = schema(typeName)
+        self.parent = None
+        # Any further parents the node is instanced under, after its first one
+        self.instances = []
+        self.children = []
+        self.values = {}
+        self.locked = set()
+        self.keyable = {}
+        self.channelBox = {}
+        self.dynamic = collections.OrderedDict()
+        self.inputs = {}
+        self.outputs = collections.defaultdict(list)
+        self.keys = {}
+        self.curve = None
+        self.alive = True
+        self.localCache = None
+        self.worldCache = None
+
+    def __repr__(self):
+        return '<NodeRecord %s (%s)>' % (self.name, self.type)
+
+    def spec(self, attr):
+        spec = self.schema.specs.get(attr)
+        if spec is None:
+            spec = self.dynamic.get(attr)
+        return spec
+
+    def isA(self, typeName):
+        return self.schema.isA(typeName)
+
+    @property
+    def isDag(self):
+        return self.schema.isA('dagNode')
+
+    @property
+    def isTransform(self):
+        return self.type in _TRANSFORM_TYPES
+
+    @property
+    def isShape(self):
+        return self.schema.isA('shape')
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None and node.type != 'world':
+            yield node
+            node = node.parent
+
+    def descendants(self):
+        for child in self.children:
+            yield child
+            for grandchild in child.descendants():
+                yield grandchild
+
+
+class Plug(object):
+    '''
+    A resolved attribute: the node record, the attribute spec and an optional array index.
+    '''
+
+    __slots__ = ('node', 'spec', 'index')
+
+    def __init__(self, node, spec, index=None):
+        self.node = node
+        self.spec = spec
+        self.index = index
+
+    def __eq__(self, other):
+        return (isinstance(other, Plug) and self.node is other.node and self.spec is other.spec
+                and self.index == other.index)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.node.uid, self.spec.longName, self.index))
+
+    @property
+    def name(self):
+        if self.index is not None:
+            return '%s.%s[%d]' % (self.node.name, self.spec.longName, self.index)
+        return '%s.%s' % (self.node.name, self.spec.longName)
+
+
+_PLUG_PATTERN = re.compile(r'^([^\[\]]+?)(?:\[(\d+)\])?$')
+_TRAILING_DIGITS = re.compile(r'^(.*?)(\d*)$')
+
+
+class Scene(object):
+
+    def __init__(self):
+        self.world = NodeRecord('world', 'world')
+        self.nodes = {}
+        self.time = 1.0
+        self.playback = [1.0, 120.0]
+        self.undoDepth = 0
+        self._counters = {}
+
+    ##### Lookup #####
+
+    def find(self, name):
+        if isinstance(name, NodeRecord):
+            return name if name.alive else None
+        name = str(name)
+        if '|' in name:
+            return self._findPath(name)
+        return self.nodes.get(name)
+
+    def _findPath(self, path):
+        parts = [part for part in path.split('|') if part]
+        if not parts:
+            return None
+        node = self.nodes.get(parts[-1])
+        if node is None:
+            return None
+        chain = [n.name for n in reversed(list(node.ancestors()))] + [node.name]
+        if path.startswith('|'):
+            return node if chain == parts else None
+        return node if chain[-len(parts):] == parts else None
+
+    def get(self, name):
+        node = self.find(name)
+        if node is None:
+            raise ValueError('No object matches name: %s' % name)
+        return node
+
+    def plug(self, path):
+        path = str(path)
+        if '.' not in path:
+            raise ValueError('No object matches name: %s' % path)
+        nodeName, attrPath = path.split('.', 1)
+        node = self.get(nodeName)
+        attrName = attrPath.split('.')[-1]
+        match = _PLUG_PATTERN.match(attrName)
+        spec = node.spec(match.group(1)) if match else None
+        if spec is None:
+            raise ValueError('No object matches name: %s' % path)
+        index = match.group(2)
+        return Plug(node, spec, int(index) if index is not None else None)
+
+    def ls(self, typeName=None):
+        return [node for node in self.nodes.values() if typeName is None or node.isA(typeName)]
+
+    ##### Naming #####
+
+    def uniqueName(self, name):
+        if name not in self.nodes:
+            return name
+        base, digits = _TRAILING_DIGITS.match(name).groups()
+        index = max(self._counters.get(base, 1), int(digits) + 1 if digits else 1)
+        while '%s%d' % (base, index) in self.nodes:
+            index += 1
+        self._counters[base] = index + 1
+        return '%s%d' % (base, index)
+
+    def rename(self, node, name):
+        if name == node.name:
+            return name
+        del self.nodes[node.name]
+        node.name = self.uniqueName(name)
+        self.nodes[node.name] = node
+        return node.name
+
+    def fullPath(self, node):
+        if node.type == 'world':
+            return ''
+        return '|' + '|'.join([n.name for n in reversed(list(node.ancestors()))] + [node.name])
+
+    ##### Creation #####
+
+    def create(self, typeName, name=None, parent=None):
+        node = NodeRecord(self.uniqueName(name or typeName + '1'), typeName)
+        self.nodes[node.name] = node
+        if node.isDag:
+            self._attach(node, parent or self.world)
+        return node
+
+    def createCurve(self, cvs, knots, degree, name=None, form=CurveData.kOpen, parent=None):
+        data = CurveData(cvs, knots, degree, form)
+        transform = parent
+        if transform is None:
+            transform = self.create('transform', name or 'curve1')
+        shape = self.create('nurbsCurve', transform.name + 'Shape', parent=transform)
+        shape.curve = data
+        return transform, shape
+
+    def duplicate(self, nodes):
+        selected = set(node.uid for node in nodes)
+        mapping = {}
+        for node in nodes:
+            if any(ancestor.uid in selected for ancestor in node.ancestors()):
+                continue
+            self._duplicateTree(node, node.parent or self.world, mapping)
+        return [mapping[node.uid] for node in nodes]
+
+    def _duplicateTree(self, node, parent, mapping):
+        copy = NodeRecord(self.uniqueName(node.name), node.type)
+        self.nodes[copy.name] = copy
+        copy.values = dict(node.values)
+        copy.locked = set(node.locked)
+        copy.keyable = dict(node.keyable)
+        copy.channelBox = dict(node.channelBox)
+        copy.dynamic = collections.OrderedDict(node.dynamic)
+        copy.curve = node.curve.copy() if node.curve else None
+        if node.isDag:
+            self._attach(copy, parent)
+        mapping[node.uid] = copy
+        for child in list(node.children):
+            self._duplicateTree(child, copy, mapping)
+        return copy
+
+    ##### Deletion #####
+
+    def delete(self, node):
+        if not node.alive:
+            return
+        for child in list(node.children):
+            if child.instances:
+                self.removeInstance(child, node)
+            else:
+                self.delete(child)
+        for attr, source in list(node.inputs.items()):
+            self.disconnect(source, Plug(node, node.spec(attr)))
+        for attr, targets in list(node.outputs.items()):
+            for target in list(targets):
+                self.disconnect(Plug(node, node.spec(attr)), target)
+        if node.parent is not None:
+            node.parent.children.remove(node)
+            node.parent = None
+        for parent in node.instances:
+            parent.children.remove(node)
+        node.instances = []
+        del self.nodes[node.name]
+        node.alive = False
+
+    ##### Hierarchy #####
+
+    def _attach(self, node, parent):
+        node.parent = parent
+        parent.children.append(node)
+
+    def addInstance(self, node, parent):
+        if parent is node.parent or parent in node.instances:
+            raise RuntimeError('%s is already a child of %s' % (node.name, parent.name))
+        if not node.isShape or not parent.isTransform:
+            raise RuntimeError('Only shapes can be instanced under transforms: %s' % node.name)
+        node.instances.append(parent)
+        parent.children.append(node)
+
+    def removeInstance(self, node, parent):
+        '''
+        Takes one parent away from a node. Like MFnDagNode.removeChild in Maya, a node losing its only parent is
+        left under the world rather than deleted.
+        '''
+        if not node.instances:
+            parent.children.remove(node)
+            self._attach(node, self.world)
+            return
+        if parent is node.parent:
+            node.parent = node.instances.pop(0)
+        else:
+            node.instances.remove(parent)
+        parent.children.remove(node)
+
+    def reparent(self, node, parent=None, relative=False):
+        parent = parent or self.world
+        if node.parent is parent:
+            return
+        if parent is node or node in parent.ancestors():
+            raise RuntimeError('Cannot parent %s to its own descendant %s' % (node.name, parent.name))
+        if node.isShape:
+            if not parent.isTransform:
+                raise RuntimeError('Shapes can only be parented under transforms: %s' % parent.name)
+            relative = True
+        world = None if relative or not node.isTransform else self.worldMatrix(node)
+        node.parent.children.remove(node)
+        self._attach(node, parent)
+        self._invalidate(node)
+        if world is not None:
+            self.setWorldMatrix(node, world)
+
+    ##### Values #####
+
+    def _leaf(self, node, spec, time=None, depth=0):
+        source = node.inputs.get(spec.longName)
+        if source is None and spec.parent is not None and spec.parent.longName in node.inputs:
+            parent = node.inputs[spec.parent.longName]
+            index = spec.parent.children.index(spec)
+            if parent.spec.children and depth < 8:
+                return self._leaf(parent.node, parent.spec.children[index], time, depth + 1)
+        if source is not None and depth < 8 and source.spec.kind not in ('message', 'matrix'):
+            return self._leaf(source.node, source.spec, time, depth + 1)
+        if time is not None and spec.longName in node.keys:
+            return self._evaluate(node.keys[spec.longName], time)
+        return node.values.get(spec.longName, spec.default)
+
+    def _evaluate(self, keys, time):
+        times = sorted(keys)
+        if time <= times[0]:
+            return keys[times[0]]
+        if time >= times[-1]:
+            return keys[times[-1]]
+        for start, end in zip(times, times[1:]):
+            if start <= time <= end:
+                weight = (time - start) / float(end - start)
+                return keys[start] + (keys[end] - keys[start]) * weight
+
+    def getValue(self, plug, time=None):
+        node, spec = plug.node, plug.spec
+        if spec.kind == 'matrix':
+            if not spec.writable:
+                return list(self._computedMatrix(node, spec.longName, time))
+            return list(node.values.get(spec.longName) or MMatrix())
+        if spec.kind == 'message':
+            source = node.inputs.get(spec.longName)
+            return source.node.name if source else None
+        if spec.kind == 'nurbsCurve':
+            return node.curve
+        if spec.children:
+            values = tuple(self._convert(child, self._leaf(node, child, time)) for child in spec.children)
+            return [values]
+        return self._convert(spec, self._leaf(node, spec, time))
+
+    def _convert(self, spec, value):
+        if spec.kind == 'bool':
+            return bool(value)
+        if spec.kind in _INTEGER_KINDS:
+            return int(value)
+        if spec.kind == 'float':
+            # Single precision like Maya, so 0.2 reads back as 0.20000000298
+            return struct.unpack('f', struct.pack('f', float(value)))[0]
+        if spec.numeric:
+            return float(value)
+        return value
+
+    def setValue(self, plug, value):
+        node, spec = plug.node, plug.spec
+        if not spec.writable:
+            raise RuntimeError('The attribute \'%s\' is read-only' % plug.name)
+        if spec.children:
+            values = _flatten(value)
+            leaves = spec.children
+            if len(values) != len(leaves):
+                raise RuntimeError('Error while parsing arguments for %s' % plug.name)
+            for leaf in leaves:
+                self._checkLocked(Plug(node, leaf))
+            self._checkLocked(plug)
+            for leaf, leafValue in zip(leaves, values):
+                node.values[leaf.longName] = self._clamp(leaf, leafValue)
+            self._invalidate(node)
+            return
+        self._checkLocked(plug)
+        self._invalidate(node)
+        if spec.kind == 'matrix':
+            node.values[spec.longName] = MMatrix(_flatten(value))
+        elif spec.kind == 'string':
+            node.values[spec.longName] = str(value)
+        else:
+            node.values[spec.longName] = self._clamp(spec, _flatten(value)[0] if _isSequence(value) else value)
+
+    def _clamp(self, spec, value):
+        value = self._convert(spec, value)
+        if spec.minimum is not None:
+            value = max(spec.minimum, value)
+        if spec.maximum is not None:
+            value = min(spec.maximum, value)
+        return value
+
+    def _checkLocked(self, plug):
+        if plug.spec.longName in plug.node.locked:
+            raise RuntimeError('The attribute \'%s\' is locked or connected and cannot be modified.' % plug.name)
+        if plug.spec.longName in plug.node.inputs:
+            raise RuntimeError('The attribute \'%s\' is locked or connected and cannot be modified.' % plug.name)
+
+    def isKeyable(self, plug):
+        return plug.node.keyable.get(plug.spec.longName, plug.spec.keyable)
+
+    def isChannelBox(self, plug):
+        return plug.node.channelBox.get(plug.spec.longName, False)
+
+    def setFlags(self, plug, lock=None, keyable=None, channelBox=None):
+        node, name = plug.node, plug.spec.longName
+        if lock is not None:
+            if lock:
+                node.locked.add(name)
+            else:
+                node.locked.discard(name)
+        if keyable is not None:
+            node.keyable[name] = bool(keyable)
+            if keyable:
+                node.channelBox[name] = False
+        if channelBox is not None:
+            node.channelBox[name] = bool(channelBox) and not self.isKeyable(plug)
+
+    def addAttribute(self, node, longName, shortName=None, kind='double', default=None, keyable=False,
+                     parent=None, minimum=None, maximum=None, children=0):
+        if node.spec(longName) is not None or (shortName and node.spec(shortName) is not None):
+            raise RuntimeError('Found attribute with the same name: %s.%s' % (node.name, longName))
+        if default is None:
+            default = None if kind in ('message', 'compound', 'string', 'matrix') else 0.0
+        spec = AttributeSpec(longName, shortName, kind, default, keyable=keyable, dynamic=True,
+                             minimum=minimum, maximum=maximum)
+        if parent is not None:
+            parentSpec = node.spec(parent)
+            if parentSpec is None:
+                raise RuntimeError('Parent attribute not found: %s.%s' % (node.name, parent))
+            parentSpec.children = parentSpec.children + (spec,)
+            spec.parent = parentSpec
+        node.dynamic[spec.longName] = spec
+        if spec.shortName != spec.longName:
+            node.dynamic[spec.shortName] = spec
+        return spec
+
+    def deleteAttribute(self, node, attr):
+        spec = node.dynamic.get(attr)
+        if spec is None:
+            raise RuntimeError('Attribute not found or not dynamic: %s.%s' % (node.name, attr))
+        for child in list(spec.children):
+            self.deleteAttribute(node, child.longName)
+        node.dynamic.pop(spec.longName, None)
+        node.dynamic.pop(spec.shortName, None)
+        node.values.pop(spec.longName, None)
+
+    ##### Connections #####
+
+    def connect(self, source, target, force=False):
+        existing = target.node.inputs.get(target.spec.longName)
+        if existing is not None:
+            if existing == source:
+                raise RuntimeError('%s is already connected to %s' % (source.name, target.name))
+            if not force:
+                raise RuntimeError('%s already has an incoming connection from %s'
+                                   % (target.name, existing.name))
+            self.disconnect(existing, target)
+        if target.spec.longName in target.node.locked:
+            raise RuntimeError('The destination attribute \'%s\' cannot be connected to because it is locked'
+                               % target.name)
+        target.node.inputs[target.spec.longName] = source
+        source.node.outputs[source.spec.longName].append(target)
+        self._invalidate(target.node)
+
+    def disconnect(self, source, target):
+        if target.node.inputs.get(target.spec.longName) != source:
+            raise RuntimeError('There is no connection from %s to %s' % (source.name, target.name))
+        del target.node.inputs[target.spec.longName]
+        self._invalidate(target.node)
+        outputs = source.node.outputs[source.spec.longName]
+        outputs.remove(target)
+        if not outputs:
+            del source.node.outputs[source.spec.longName]
+
+    ##### Constraints and IK #####
+
+    def constrain(self, typeName, targets, constrained, name=None):
+        if not targets:
+            raise RuntimeError('%s: Target list was empty or contained no valid targets.' % typeName)
+        name = name or '%s_%s1' % (constrained.name, typeName)
+        constraint = self.create(typeName, name, constrained if constrained.isTransform else None)
+        for target in targets:
+            self.connect(Plug(target, target.spec('message')), Plug(constraint, constraint.spec('target')), True)
+        return constraint
+
+    def ikHandle(self, start, end, name=None):
+        if start not in end.ancestors():
+            raise RuntimeError('ikHandle: %s is not an ancestor of %s' % (start.name, end.name))
+        handle = self.create('ikHandle', name or 'ikHandle1')
+        self.setWorldTranslation(handle, self.worldTranslation(end))
+        effector = self.create('ikEffector', 'effector1', end.parent)
+        self.connect(Plug(start, start.spec('message')), Plug(handle, handle.spec('startJoint')))
+        self.connect(Plug(effector, effector.spec('message')), Plug(handle, handle.spec('endEffector')))
+        return handle, effector
+
+    ##### Keys #####
+
+    def setKey(self, plug, time):
+        for leaf in plug.spec.leaves():
+            if leaf.numeric:
+                value = self._leaf(plug.node, leaf)
+                plug.node.keys.setdefault(leaf.longName, {})[float(time)] = float(value)
+
+    def keyablePlugs(self, node):
+        plugs = []
+        specs = list(node.schema.ordered) + [spec for name, spec in node.dynamic.items() if name == spec.longName]
+        for spec in specs:
+            for leaf in [spec] + list(_walk(spec)):
+                if not leaf.children and self.isKeyable(Plug(node, leaf)):
+                    plugs.append(Plug(node, leaf))
+        return plugs
+
+    ##### Transforms #####
+
+    def _vector(self, node, attr, time=None):
+        spec = node.spec(attr)
+        return [self._leaf(node, child, time) for child in spec.children]
+
+    def _invalidate(self, node):
+        '''
+        Drops the cached matrices of a transform and everything below it. A node without a cached world
+        matrix never has cached descendants, so the walk stops at the first uncached node.
+        '''
+        if not node.isTransform:
+            return
+        node.localCache = None
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.worldCache is None and current is not node:
+                continue
+            current.worldCache = None
+            stack.extend(current.children)
+
+    def _cacheable(self, node):
+        # Connected transforms are driven by other nodes, so their values can change without a set
+        return not node.inputs
+
+    def localMatrix(self, node, time=None):
+        if not node.isTransform:
+            return MMatrix()
+        if time is None and node.localCache is not None:
+            return node.localCache
+        tx, ty, tz = self._vector(node, 'translate', time)
+        rotation = [math.radians(v) for v in self._vector(node, 'rotate', time)]
+        sx, sy, sz = self._vector(node, 'scale', time)
+        order = int(self._leaf(node, node.spec('rotateOrder'), time))
+        matrix = MMatrix([sx, 0, 0, 0, 0, sy, 0, 0, 0, 0, sz, 0, 0, 0, 0, 1])
+        matrix = matrix * MEulerRotation(rotation[0], rotation[1], rotation[2], order).asMatrix()
+        if node.type == 'joint':
+            orient = [math.radians(v) for v in self._vector(node, 'jointOrient', time)]
+            if any(orient):
+                matrix = matrix * MEulerRotation(orient).asMatrix()
+        matrix[12], matrix[13], matrix[14] = tx, ty, tz
+        if time is None and self._cacheable(node):
+            node.localCache = matrix
+        return matrix
+
+    def worldMatrix(self, node, time=None):
+        if time is not None:
+            matrix = self.localMatrix(node, time)
+            for ancestor in node.ancestors():
+                matrix = matrix * self.localMatrix(ancestor, time)
+            return matrix
+        # Walk up to the nearest cached ancestor, then compose back down caching as we go
+        chain = []
+        current = node
+        while current is not None and current.type != 'world' and current.worldCache is None:
+            chain.append(current)
+            current = current.parent
+        matrix = current.worldCache if current is not None and current.type != 'world' else None
+        cacheable = True
+        for record in reversed(chain):
+            local = self.localMatrix(record)
+            matrix = local if matrix is None else local * matrix
+            cacheable = cacheable and self._cacheable(record)
+            if cacheable:
+                record.worldCache = matrix
+        return matrix if matrix is not None else MMatrix()
+
+    def parentMatrix(self, node, time=None):
+        if node.parent is None or node.parent.type == 'world':
+            return MMatrix()
+        return self.worldMatrix(node.parent, time)
+
+    def _computedMatrix(self, node, attr, time=None):
+        if attr == 'matrix':
+            return self.localMatrix(node, time)
+        if attr == 'inverseMatrix':
+            return self.localMatrix(node, time).inverse()
+        if attr == 'worldMatrix':
+            return self.worldMatrix(node, time)
+        if attr == 'worldInverseMatrix':
+            return self.worldMatrix(node, time).inverse()
+        if attr == 'parentMatrix':
+            return self.parentMatrix(node, time)
+        if attr == 'parentInverseMatrix':
+            return self.parentMatrix(node, time).inverse()
+        raise RuntimeError('Unknown matrix attribute %s' % attr)
+
+    def _setVector(self, node, attr, values):
+        spec = node.spec(attr)
+        for child, value in zip(spec.children, values):
+            plug = Plug(node, child)
+            self._checkLocked(plug)
+            node.values[child.longName] = float(value)
+        self._invalidate(node)
+
+    def setLocalMatrix(self, node, matrix, translation=True, rotation=True, scale=True):
+        transformation = MTransformationMatrix(matrix)
+        if translation:
+            self._setVector(node, 'translate', transformation.translation())
+        if rotation:
+            self.setLocalRotation(node, transformation.rotation(True))
+        if scale:
+            self._setVector(node, 'scale', transformation.scale())
+
+    def setWorldMatrix(self, node, matrix, translation=True, rotation=True, scale=True):
+        local = MMatrix(matrix) * self.parentMatrix(node).inverse()
+        self.setLocalMatrix(node, local, translation, rotation, scale)
+
+    def setLocalRotation(self, node, quaternion):
+        if node.type == 'joint':
+            orient = [math.radians(v) for v in self._vector(node, 'jointOrient')]
+            if any(orient):
+                quaternion = quaternion * MEulerRotation(orient).asQuaternion().inverse()
+        euler = MEulerRotation.decompose(quaternion.asMatrix(), int(self._leaf(node, node.spec('rotateOrder'))))
+        self._setVector(node, 'rotate', [math.degrees(v) for v in euler])
+
+    def setWorldRotation(self, node, quaternion):
+        parent = MTransformationMatrix(self.parentMatrix(node)).rotation(True)
+        self.setLocalRotation(node, quaternion * parent.inverse())
+
+    def worldRotation(self, node):
+        return MTransformationMatrix(self.worldMatrix(node)).rotation(True)
+
+    def setWorldTranslation(self, node, vector):
+        point = MPoint(vector) * self.parentMatrix(node).inverse()
+        self._setVector(node, 'translate', [point.x, point.y, point.z])
+
+    def worldTranslation(self, node):
+        matrix = self.worldMatrix(node)
+        return MVector(matrix[12], matrix[13], matrix[14])
+
+
+_STRING_TYPES = (str, type(u''))
+
+
+def _isSequence(value):
+    return hasattr(value, '__iter__') and not isinstance(value, _STRING_TYPES)
+
+
+def _flatten(value):
+    if not _isSequence(value):
+        return [value]
+    flat = []
+    for item in value:
+        flat.extend(_flatten(item))
+    return flat
+
+
+_scene = Scene()
+
+
+def current():
+    '''
+    :return: The active headless scene.
+    '''
+    return _scene
+
+
+def reset():
+    '''
+    Replaces the active scene with an empty one and clears the call counters.
+    :return: The new scene.
+    '''
+    global _scene
+    # Like a new file in Maya, handles to the old scene's nodes stop being valid
+    for node in _scene.nodes.values():
+        node.alive = False
+    _scene = Scene()
+    calls.clear()
+    return _scene
@@ -1,16 +1,63 @@
-import maya.cmds as cmds
-import maya.api.OpenMaya as om
-import pymel.core as pmc
+import backend
+from backend import cmds, om, pmc
 from context_library import UndoOnError
+from array import array
 import pprint
+import functools
+import hashlib
 import math
+import struct
+import weakref
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
 
 
 class Attribute(object):
+    '''
+    An attribute on a node.
+    The MPlug is resolved on first use and kept, so the typed getters and setters, lock, unlock and hide skip
+    command parsing and name lookups entirely. get and set take the usual cmds flags and still go through cmds.
+    Plug writes are made directly on the dependency graph and are not recorded in the undo queue.
+    Typed values are in internal units, so angles are in radians.
+    '''
+
+    __slots__ = ('_owner', '_attrName', '_plug')
+
+    def __init__(self, attr_name, node=None):
+        '''
+        :param attr_name: The full node.attr path, or just the attribute name when node is given.
+        :param node: The Node the attribute belongs to, the plug is then found through its handle.
+        '''
+        self._owner = node
+        self._attrName = attr_name
+        self._plug = None
+
+    @property
+    def _attr(self):
+        if self._owner is not None:
+            return '%s.%s' % (self._owner.name, self._attrName)
+        return self._attrName
+
+    @property
+    def _node(self):
+        return self._attr.split('.')[0]
+
+    def __str__(self):
+        return self._attr
 
-    def __init__(self, attr_name):
-        self._node = attr_name.split('.')[0]
-        self._attr = attr_name
+    @property
+    def plug(self):
+        if self._plug is None:
+            if self._owner is not None and '.' not in self._attrName and '[' not in self._attrName:
+                self._plug = om.MFnDependencyNode(self._owner.mObject).findPlug(self._attrName, False)
+            else:
+                selList = om.MSelectionList()
+                selList.add(self._attr)
+                self._plug = selList.getPlug(0)
+        return self._plug
 
     def get(self, **kwargs):
         return cmds.getAttr(self._attr, **kwargs)
@@ -18,43 +65,424 @@ class Attribute(object):
     def set(self, value, **kwargs):
         return cmds.setAttr(self._attr, value, **kwargs)
 
+    def getDouble(self):
+        return self.plug.asDouble()
+
+    def setDouble(self, value):
+        self.plug.setDouble(value)
+
+    def getDouble3(self):
+        plug = self.plug
+        return tuple(plug.child(index).asDouble() for index in range(3))
+
+    def setDouble3(self, values):
+        plug = self.plug
+        for index in range(3):
+            plug.child(index).setDouble(values[index])
+
+    def getMatrix(self):
+        return om.MFnMatrixData(self.plug.asMObject()).matrix()
+
+    def setMatrix(self, matrix):
+        self.plug.setMObject(om.MFnMatrixData().create(om.MMatrix(matrix)))
+
+    def getBool(self):
+        return self.plug.asBool()
+
+    def setBool(self, value):
+        self.plug.setBool(value)
+
     def connect(self, target_attr, **kwargs):
-        cmds.connectAttr(self._attr, target_attr, **kwargs)
+        if isinstance(target_attr, Attribute) and not kwargs:
+            modifier = om.MDGModifier()
+            modifier.connect(self.plug, target_attr.plug)
+            modifier.doIt()
+        else:
+            cmds.connectAttr(self._attr, str(target_attr), **kwargs)
 
     def hide(self):
-        return cmds.setAttr(self._attr, k=False, cb=False)
+        plug = self.plug
+        plug.isKeyable = False
+        plug.isChannelBox = False
 
     def lock(self):
-        return cmds.setAttr(self._attr, lock=True)
+        self.plug.isLocked = True
 
     def unlock(self):
-        return cmds.setAttr(self._attr, lock=False)
+        self.plug.isLocked = False
+
+
+class BatchValue(object):
+    '''
+    The result of a get queued on an AttributeBatch, readable once the batch has been flushed.
+    '''
+
+    __slots__ = ('attribute', '_reader', '_value', '_read')
+
+    def __init__(self, attribute, reader):
+        self.attribute = attribute
+        self._reader = reader
+        self._value = None
+        self._read = False
+
+    @property
+    def value(self):
+        assert self._read, 'Batch has not been flushed yet: %s' % self.attribute
+        return self._value
+
+    def _resolve(self):
+        self._value = self._reader(self.attribute)
+        self._read = True
+
+
+class AttributeBatch(object):
+    '''
+    Collects attribute gets, sets, locks and connections across any number of nodes and applies them together.
+    Sets and connections are queued on a single MDGModifier and applied in one doIt on flush. Unlocks are applied
+    before it and locks and visibility flags after, so a batch can unlock, set and relock the same channels.
+    Gets are read once everything else has been applied. undo reverts the whole flushed batch as one unit.
+    Values are in internal units, like the typed Attribute setters.
+    Used as a context manager the batch is flushed on exit, unless an exception was raised.
+    '''
+
+    def __init__(self):
+        self._modifier = om.MDGModifier()
+        self._before = []
+        self._after = []
+        self._reads = []
+        self._queued = 0
+        self._history = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    @classmethod
+    def join(cls, batch=None):
+        '''
+        Lets methods take an optional batch, queuing onto it or applying right away when none is given.
+        :param batch: An AttributeBatch to queue onto, left for its owner to flush.
+        :return: A context manager yielding the batch to use.
+        '''
+        return _JoinedBatch(batch) if batch is not None else cls()
+
+    @staticmethod
+    def _attribute(attribute):
+        return attribute if isinstance(attribute, Attribute) else Attribute(str(attribute))
+
+    def get(self, attribute, reader=None):
+        '''
+        Queues a read.
+        :param attribute: An Attribute or node.attr path.
+        :param reader: A function taking the Attribute and returning its value, defaults to Attribute.get.
+        :return: A BatchValue holding the value once the batch is flushed.
+        '''
+        value = BatchValue(self._attribute(attribute), reader or Attribute.get)
+        self._reads.append(value)
+        return value
+
+    def set(self, attribute, value):
+        '''
+        Queues a write, picking the plug setter from the type of the value.
+        Booleans, numbers, 3 value sequences, matrices and strings are supported.
+        '''
+        if isinstance(value, bool):
+            return self.setBool(attribute, value)
+        if isinstance(value, (int, long, float)):
+            return self.setDouble(attribute, value)
+        if isinstance(value, (str, unicode)):
+            plug = self._attribute(attribute).plug
+            self._modifier.newPlugValueString(plug, value)
+            self._queued += 1
+            return
+        if isinstance(value, om.MMatrix) or len(value) == 16:
+            return self.setMatrix(attribute, value)
+        if len(value) == 3:
+            return self.setDouble3(attribute, value)
+        raise TypeError('Unsupported value for %s: %s' % (attribute, value))
+
+    def setDouble(self, attribute, value):
+        self._modifier.newPlugValueDouble(self._attribute(attribute).plug, value)
+        self._queued += 1
+
+    def setDouble3(self, attribute, values):
+        plug = self._attribute(attribute).plug
+        for index in range(3):
+            self._modifier.newPlugValueDouble(plug.child(index), values[index])
+        self._queued += 1
+
+    def setBool(self, attribute, value):
+        self._modifier.newPlugValueBool(self._attribute(attribute).plug, value)
+        self._queued += 1
+
+    def setInt(self, attribute, value):
+        self._modifier.newPlugValueInt(self._attribute(attribute).plug, value)
+        self._queued += 1
+
+    def setMatrix(self, attribute, matrix):
+        data = om.MFnMatrixData().create(om.MMatrix(matrix))
+        self._modifier.newPlugValue(self._attribute(attribute).plug, data)
+        self._queued += 1
+
+    def connect(self, source, target):
+        self._modifier.connect(self._attribute(source).plug, self._attribute(target).plug)
+        self._queued += 1
+
+    def disconnect(self, source, target):
+        self._modifier.disconnect(self._attribute(source).plug, self._attribute(target).plug)
+        self._queued += 1
+
+    def lock(self, attribute):
+        self._after.append((self._attribute(attribute).plug, 'isLocked', True))
+
+    def unlock(self, attribute):
+        self._before.append((self._attribute(attribute).plug, 'isLocked', False))
+
+    def hide(self, attribute):
+        plug = self._attribute(attribute).plug
+        self._after.append((plug, 'isKeyable', False))
+        self._after.append((plug, 'isChannelBox', False))
+
+    def _applyFlags(self, flags, history):
+        for plug, flag, value in flags:
+            previous = getattr(plug, flag)
+            if previous != value:
+                setattr(plug, flag, value)
+                history.append((plug, flag, previous))
+
+    def flush(self):
+        '''
+        Applies everything queued so far and resolves the queued gets.
+        '''
+        modifier = self._modifier
+        before, after, reads = self._before, self._after, self._reads
+        self._modifier = om.MDGModifier()
+        self._before, self._after, self._reads = [], [], []
+        self._queued = 0
+
+        changed = []
+        self._applyFlags(before, changed)
+        modifier.doIt()
+        self._history.append((modifier, changed))
+        self._applyFlags(after, changed)
+        for value in reads:
+            value._resolve()
+
+    def undo(self):
+        '''
+        Reverts the most recent flush.
+        '''
+        assert self._history, 'Nothing to undo'
+        modifier, changed = self._history.pop()
+        # Anything unlocked by the batch stays unlocked until the modifier has restored its values
+        for plug, flag, previous in reversed(changed):
+            if not (flag == 'isLocked' and previous):
+                setattr(plug, flag, previous)
+        modifier.undoIt()
+        for plug, flag, previous in reversed(changed):
+            if flag == 'isLocked' and previous:
+                setattr(plug, flag, previous)
+
+
+class _JoinedBatch(object):
+
+    def __init__(self, batch):
+        self._batch = batch
+
+    def __enter__(self):
+        return self._batch
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class AttributeSchemaCache(object):
+    '''
+    Remembers which static attributes each node type has, so attribute lookups only query Maya the first time
+    an attribute name is seen on a type. Dynamic attributes are tracked per node by Node itself.
+    '''
+
+    def __init__(self):
+        self._static = {}
+        self.hits = 0
+        self.misses = 0
+
+    def hasStatic(self, nodeType, attr):
+        '''
+        :return: True if every node of the given type has the attribute.
+        '''
+        exists, cached = self._lookupStatic(nodeType, attr)
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return exists
+
+    def _lookupStatic(self, nodeType, attr):
+        '''
+        Looks the attribute up like hasStatic without counting it, for callers counting the lookup themselves.
+        :return: Whether every node of the type has the attribute and whether that was already known.
+        '''
+        known = self._static.setdefault(nodeType, {})
+        exists = known.get(attr)
+        if exists is not None:
+            return exists, True
+        exists = known[attr] = bool(cmds.attributeQuery(attr, type=nodeType, exists=True))
+        return exists, False
+
+    def stats(self):
+        '''
+        :return: The hit and miss counts along with the hit rate.
+        '''
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'rate': self.hits / float(total) if total else 0.0}
+
+    def clear(self):
+        self._static = {}
+        self.hits = 0
+        self.misses = 0
+
+
+schemaCache = AttributeSchemaCache()
+
+
+class NodeRegistry(object):
+    '''
+    Interns Node wrappers by the hash of their MObjectHandle, so hierarchy walks keep handing back the same wrapper
+    for the same node, along with everything it has cached. Wrappers are held weakly and dropped once unused.
+    Off by default, since interned wrappers also share any state callers hang on them.
+    '''
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._nodes = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def find(self, handle, cls):
+        '''
+        :return: The interned wrapper for the handle's node if it is an instance of cls, otherwise None.
+        '''
+        node = self._nodes.get(handle.hashCode())
+        if node is not None and isinstance(node, cls) and handle.isValid() and node._handle == handle:
+            self.hits += 1
+            return node
+        self.misses += 1
+        return None
+
+    def add(self, node):
+        self._nodes[node._handle.hashCode()] = node
+
+    def clear(self):
+        self._nodes.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+registry = NodeRegistry()
 
 
 class Node(object):
+    '''
+    Wraps a node by its MObjectHandle rather than its name.
+    The node is looked up once on construction, so the wrapper keeps pointing at the same node through renames
+    and reparents. The name it was last seen under is only used to look the node up again if the handle dies.
+    Wrappers are slotted to keep rigs with thousands of them small, so subclasses should declare __slots__ too.
+    '''
+
+    __slots__ = ('_lastName', '_handle', '_mDagPath', '_isDag', '_nodeType', '_attributes', '_dynamicAttrs',
+                 '__weakref__')
+    _slotNames = frozenset(__slots__)
 
     _name = 'Node'
 
     def __init__(self, node):
+        self._reset()
+
         if isinstance(node, om.MObject):
-            self._node = self._getName(node)
-        elif isinstance(node, pmc.PyNode):
-            self._node = node.name()
+            self._bind(node)
+            self._lastName = self.name
+        elif backend.loaded('pmc') and isinstance(node, pmc.PyNode):
+            self._lastName = node.name()
         elif isinstance(node, str) or isinstance(node, unicode):
-            self._node = str(node)
+            self._lastName = str(node)
         else:
             raise AssertionError('Invalid type for Transform, received: %s' % str(type(node)))
 
-        assert cmds.objExists(self._node), 'Specified node does not exist: %s' % self._node
+        assert cmds.objExists(self._lastName), 'Specified node does not exist: %s' % self._lastName
+
+        if self._handle is None:
+            self._bind(self._getMObject(self._lastName))
+        if registry.enabled:
+            registry.add(self)
+
+    @classmethod
+    def fromMObject(cls, mObject):
+        '''
+        Wraps an MObject the caller knows to exist, such as one just returned by the API.
+        Skips the name lookup and existence check the constructor does.
+        Returns the interned wrapper instead when the registry is enabled and has one.
+        '''
+        handle = om.MObjectHandle(mObject)
+        if registry.enabled:
+            node = registry.find(handle, cls)
+            if node is not None:
+                return node
+        node = cls.__new__(cls)
+        node._reset()
+        node._bind(mObject, handle)
+        if registry.enabled:
+            registry.add(node)
+        return node
+
+    @classmethod
+    def fromDagPath(cls, dagPath):
+        '''
+        Wraps the node at the end of a valid dag path, keeping a copy of the path so it never has to be looked up.
+        '''
+        node = cls.fromMObject(dagPath.node())
+        if node._mDagPath is not None and node._mDagPath != dagPath and node._mDagPath.isValid():
+            # An interned wrapper for another instance of the node, this path needs a wrapper of its own
+            node = cls.__new__(cls)
+            node._reset()
+            node._bind(dagPath.node())
+        if node._mDagPath is None:
+            node._mDagPath = om.MDagPath(dagPath)
+        return node
+
+    def _reset(self):
+        self._lastName = None
+        self._handle = None
+        self._mDagPath = None
+        self._isDag = False
+        self._nodeType = None
+        # Most wrappers never look up an attribute, so these are only created once something goes in them
+        self._attributes = None
+        self._dynamicAttrs = None
 
     def __str__(self):
         return self._node
 
     def __getattr__(self, attr):
-        if self.hasAttr(attr):
-            return self.attr(attr)
+        if attr in Node._slotNames or attr[:2] == '__':
+            # An unset slot means the wrapper is not initialised yet, so this can only be a missing python attribute
+            raise AttributeError(attr)
+        attribute = self.attr(attr)
+        if attribute is not None:
+            return attribute
         raise AttributeError('%s does not have attribute: %s' % (self._node, attr))
 
+    def _bind(self, mObject, handle=None):
+        self._handle = handle if handle is not None else om.MObjectHandle(mObject)
+        self._mDagPath = None
+        self._isDag = mObject.hasFn(om.MFn.kDagNode)
+
     def _getName(self, mObject):
         return om.MFnDependencyNode(mObject).name()
 
@@ -69,11 +497,32 @@ class Node(object):
         return selList.getDependNode(0)
 
     def attr(self, attr):
-        if self.hasAttr(attr):
-            return Attribute('%s.%s' % (self._node, attr))
+        attribute = self._attributes.get(attr) if self._attributes is not None else None
+        if attribute is not None:
+            schemaCache.hits += 1
+        elif self.hasAttr(attr):
+            if self._attributes is None:
+                self._attributes = {}
+            attribute = self._attributes[attr] = Attribute(attr, self)
+        return attribute
 
     def hasAttr(self, attr):
-        return cmds.attributeQuery(attr, node=self._node, exists=True)
+        if self._dynamicAttrs is not None and attr in self._dynamicAttrs:
+            schemaCache.hits += 1
+            return True
+        # Each lookup counts once, as a miss whenever Maya had to be queried
+        exists, cached = schemaCache._lookupStatic(self.nodeType, attr)
+        if not exists:
+            # Dynamic attributes can be added from anywhere, so only ones known to exist are remembered
+            cached = False
+            exists = cmds.attributeQuery(attr, node=self._node, exists=True)
+            if exists:
+                self._addDynamicAttr(attr)
+        if cached:
+            schemaCache.hits += 1
+        else:
+            schemaCache.misses += 1
+        return exists
 
     def getAttr(self, attr, **kwargs):
         return cmds.getAttr('%s.%s' % (self._node, attr), **kwargs)
@@ -82,23 +531,50 @@ class Node(object):
         return cmds.setAttr('%s.%s' % (self._node, attr), value, **kwargs)
 
     def addAttr(self, attr, **kwargs):
-        return cmds.addAttr(self._node, ln=attr, **kwargs)
+        result = cmds.addAttr(self._node, ln=attr, **kwargs)
+        self._addDynamicAttr(attr)
+        shortName = kwargs.get('shortName', kwargs.get('sn'))
+        if shortName:
+            self._addDynamicAttr(shortName)
+        return result
+
+    def _addDynamicAttr(self, attr):
+        if self._dynamicAttrs is None:
+            self._dynamicAttrs = set()
+        self._dynamicAttrs.add(attr)
+
+    @property
+    def nodeType(self):
+        if self._nodeType is None:
+            self._nodeType = om.MFnDependencyNode(self.mObject).typeName
+        return self._nodeType
 
     @property
     def mFnDagNode(self):
         return om.MFnDagNode(self.dagPath)
 
+    @property
+    def mObjectHandle(self):
+        if not self._handle.isValid():
+            # The node we bound to is gone, see if something now answers to its last known name
+            assert self._lastName is not None, 'Wrapped node no longer exists'
+            self._bind(self._getMObject(self._lastName))
+        return self._handle
+
     @property
     def dagPath(self):
-        selList = om.MSelectionList()
-        selList.add(self._node)
-        return selList.getDagPath(0)
+        return om.MDagPath(self._getDagPath())
+
+    def _getDagPath(self):
+        # Reparenting invalidates a dag path, so it is rebuilt from the handle whenever that happens
+        handle = self.mObjectHandle
+        if self._mDagPath is None or not self._mDagPath.isValid():
+            self._mDagPath = om.MDagPath.getAPathTo(handle.object())
+        return self._mDagPath
 
     @property
     def mObject(self):
-        selList = om.MSelectionList()
-        selList.add(self._node)
-        return selList.getDependNode(0)
+        return self.mObjectHandle.object()
 
     @property
     def node(self):
@@ -106,7 +582,16 @@ class Node(object):
 
     @property
     def name(self):
-        return self._node
+        if self._handle is not None and self._handle.isValid():
+            if self._isDag:
+                self._lastName = self._getDagPath().partialPathName()
+            else:
+                self._lastName = self._getName(self._handle.object())
+        return self._lastName
+
+    @property
+    def _node(self):
+        return self.name
 
     @property
     def nodeName(self):
@@ -114,7 +599,146 @@ class Node(object):
         name = (name).split(':')[-1]
         return name
 
-class ShapeData(list):
+def _segmentDistance(point, start, end):
+    '''
+    :return: The distance from a point to the closest point on the segment between start and end.
+    '''
+    dx, dy, dz = end[0] - start[0], end[1] - start[1], end[2] - start[2]
+    px, py, pz = point[0] - start[0], point[1] - start[1], point[2] - start[2]
+    length = dx * dx + dy * dy + dz * dz
+    if length:
+        t = max(0.0, min(1.0, (px * dx + py * dy + pz * dz) / length))
+        px, py, pz = px - dx * t, py - dy * t, pz - dz * t
+    return math.sqrt(px * px + py * py + pz * pz)
+
+
+def _simplifyPolyline(points, tolerance):
+    '''
+    Finds the points to keep so that no dropped point is further than the tolerance from the line replacing it.
+    :return: The sorted indices of the points to keep and the furthest any dropped point ends up from the line.
+    '''
+    keep = set([0, len(points) - 1])
+    deviation = 0.0
+    spans = [(0, len(points) - 1)]
+    while spans:
+        start, end = spans.pop()
+        furthest, distance = None, -1.0
+        for index in range(start + 1, end):
+            point_distance = _segmentDistance(points[index], points[start], points[end])
+            if point_distance > distance:
+                furthest, distance = index, point_distance
+        if furthest is None:
+            continue
+        if distance > tolerance:
+            keep.add(furthest)
+            spans.append((start, furthest))
+            spans.append((furthest, end))
+        else:
+            deviation = max(deviation, distance)
+    return sorted(keep), deviation
+
+
+def _transformPacked(values, matrix, points=False):
+    '''
+    Multiplies xyz triples packed in an array('d') by the matrix in place, one column of the result at a time.
+    :param values: The packed values, three per CV.
+    :param matrix: An om.MMatrix or 16 values in row order.
+    :param points: Whether to treat the triples as points, so the translation applies too.
+    :return: The minimum and maximum of the result on each axis.
+    '''
+    if isinstance(matrix, om.MMatrix):
+        m = [matrix.getElement(row, column) for row in range(4) for column in range(4)]
+    else:
+        m = [float(value) for value in matrix]
+    xyz = list(zip(values[0::3], values[1::3], values[2::3]))
+    low, high = [], []
+    for axis in range(3):
+        mx, my, mz = m[axis], m[axis + 4], m[axis + 8]
+        offset = m[axis + 12] if points else 0.0
+        column = array('d', [x * mx + y * my + z * mz + offset for x, y, z in xyz])
+        values[axis::3] = column
+        low.append(min(column))
+        high.append(max(column))
+    return tuple(low), tuple(high)
+
+
+class CurveData(MutableMapping):
+    '''
+    A dict-style view of one curve in a ShapeData, with 'cvs', 'knots' and 'degree' keys.
+    Reads and writes go straight to the ShapeData arrays, so the view follows the curve at its index.
+    '''
+
+    __slots__ = ('_data', '_index')
+
+    _keys = ('cvs', 'knots', 'degree')
+
+    def __init__(self, data, index):
+        self._data = data
+        self._index = index
+
+    def __getitem__(self, key):
+        if key == 'cvs':
+            return self._data.getCVs(self._index)
+        if key == 'knots':
+            return self._data.getKnots(self._index)
+        if key == 'degree':
+            return self._data.getDegree(self._index)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'cvs':
+            self._data.setCVs(self._index, value)
+        elif key == 'knots':
+            self._data.setKnots(self._index, value)
+        elif key == 'degree':
+            self._data.setDegree(self._index, value)
+        else:
+            raise KeyError('Curves only hold cvs, knots and degree: %s' % key)
+
+    def __delitem__(self, key):
+        raise KeyError('Curve data keys cannot be removed: %s' % key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def preset(func):
+    '''
+    Turns a ShapeData classmethod building a shape into a memoized preset.
+    The shape is built once per class and kept unchanged, every call returns a copy sharing its arrays, which
+    only get copied once the caller writes to them.
+    '''
+    @functools.wraps(func)
+    def wrapper(cls):
+        key = (cls, func.__name__)
+        data = ShapeData._presets.get(key)
+        if data is None:
+            data = ShapeData._presets[key] = func(cls)
+            data.getBounds()
+        return cls(data)
+    wrapper._isPreset = True
+    return classmethod(wrapper)
+
+
+class ShapeData(object):
+    '''
+    The curves making up a control shape.
+    The CVs of every curve are packed into one flat array of doubles, three per CV, with the knots and degrees in
+    arrays of their own and offsets marking where each curve starts, so the whole shape can be transformed in a
+    single pass. Indexing and iterating give CurveData views.
+    ShapeData is not a list, but it keeps the list operations the old list of {'cvs', 'knots', 'degree'} dicts
+    was used with: indexing, slicing, len, append, extend, insert, pop, del, + and comparing to lists. Anything
+    that checks for a list or serializes one, such as json.dumps, needs asList() instead.
+    Copying a ShapeData shares its arrays, which are only copied once either side is modified.
+    '''
+
+    _presets = {}
 
     @classmethod
     def create(cls, node):
@@ -123,6 +747,35 @@ class ShapeData(list):
         return cls(data)
 
     @classmethod
+    def presetNames(cls):
+        '''
+        :return: The names of every preset shape, sorted.
+        '''
+        return sorted(name for name in dir(cls) if getattr(getattr(cls, name), '_isPreset', False))
+
+    @classmethod
+    def fromArrays(cls, points, cvOffsets, knots, knotOffsets, degrees):
+        '''
+        Wraps arrays already laid out the way ShapeData keeps them, such as ones read back from a shape library.
+        The arrays are taken as they are and not checked.
+        :param points: An array('d') of CV positions, three values per CV.
+        :param cvOffsets: An array('l') of the index of each curve's first CV, followed by the CV count.
+        :param knots: An array('d') of every curve's knots.
+        :param knotOffsets: An array('l') of the index of each curve's first knot, followed by the knot count.
+        :param degrees: An array('l') of each curve's degree.
+        '''
+        data = cls.__new__(cls)
+        data._shared = False
+        data._bounds = None
+        data._radius = None
+        data._points = points
+        data._cvOffsets = cvOffsets
+        data._knots = knots
+        data._knotOffsets = knotOffsets
+        data._degrees = degrees
+        return data
+
+    @preset
     def circle(cls):
         return cls([{
             'cvs': [([0.783611624891, 4.79823734099e-17, -0.783611624891]),
@@ -141,7 +794,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def triangle(cls):
         return cls([
         {
@@ -176,7 +829,7 @@ class ShapeData(list):
             "degree": 1
         }])
 
-    @classmethod
+    @preset
     def locator(cls):
         return cls([
         {'cvs': [[0.0, 0.0, -25.0], [0.0, 0.0, 25.0]],
@@ -190,7 +843,7 @@ class ShapeData(list):
           'knots': [0.0, 1.0]}
     ])
 
-    @classmethod
+    @preset
     def starburst(cls):
         return cls([
         {
@@ -400,7 +1053,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def cross(cls):
         return cls([
         {
@@ -490,7 +1143,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def sphere(cls):
         return cls(
             [{'cvs': [[0.7836116248912245, 4.798237340988473e-17, -0.7836116248912246],
@@ -604,7 +1257,7 @@ class ShapeData(list):
                         10.0]}]
         )
 
-    @classmethod
+    @preset
     def cube(cls):
         return cls([
         {
@@ -712,7 +1365,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def arrow(cls):
         return cls([
         {
@@ -772,7 +1425,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def trapezoid(cls):
         return cls([
         {
@@ -814,7 +1467,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def star(cls):
         return cls([
         {
@@ -892,7 +1545,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def octohedron(cls):
         return cls([
         {
@@ -988,7 +1641,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def square(cls):
         return cls(
             [{'cvs': [[-25.0, 0.0, 25.0],
@@ -1000,7 +1653,7 @@ class ShapeData(list):
               'knots': [0.0, 1.0, 2.0, 3.0, 4.0]}]
         )
 
-    @classmethod
+    @preset
     def fourarrow(cls):
         return cls([
         {
@@ -1162,7 +1815,7 @@ class ShapeData(list):
         }
     ])
 
-    @classmethod
+    @preset
     def tetrahedron(cls):
         return cls([
         {
@@ -1228,32 +1881,450 @@ class ShapeData(list):
         }
     ])
 
-    def __init__(self, data):
-        list.__init__([])
+    def __init__(self, data=()):
+        '''
+        :param data: Another ShapeData or a list of dicts with 'cvs', 'knots' and 'degree' keys.
+        '''
+        if isinstance(data, ShapeData):
+            # Share the arrays until either side writes to them
+            self._points = data._points
+            self._cvOffsets = data._cvOffsets
+            self._knots = data._knots
+            self._knotOffsets = data._knotOffsets
+            self._degrees = data._degrees
+            self._shared = data._shared = True
+            self._bounds = data._bounds
+            self._radius = data._radius
+            return
+        self._shared = False
+        self._bounds = None
+        self._radius = None
+        self._points = array('d')
+        self._cvOffsets = array('l', [0])
+        self._knots = array('d')
+        self._knotOffsets = array('l', [0])
+        self._degrees = array('l')
         self.extend(data)
 
     def __str__(self):
-        return pprint.pformat(self)
+        return pprint.pformat(self.asList())
+
+    def __repr__(self):
+        return 'ShapeData(%r)' % self.asList()
+
+    def __len__(self):
+        return len(self._degrees)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield CurveData(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ShapeData([self[i] for i in range(*index.indices(len(self)))])
+        return CurveData(self, self._index(index))
+
+    def __setitem__(self, index, curve):
+        index = self._index(index)
+        self.setCVs(index, curve['cvs'])
+        self.setKnots(index, curve['knots'])
+        self.setDegree(index, curve['degree'])
+
+    def __delitem__(self, index):
+        index = self._index(index)
+        self.setCVs(index, [])
+        self.setKnots(index, [])
+        self._own()
+        del self._cvOffsets[index + 1]
+        del self._knotOffsets[index + 1]
+        del self._degrees[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (ShapeData, list, tuple)):
+            return self.asList() == [dict(curve) for curve in other]
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __add__(self, other):
+        if not isinstance(other, (ShapeData, list, tuple)):
+            return NotImplemented
+        data = ShapeData(self)
+        data.extend(other)
+        return data
+
+    def __radd__(self, other):
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return ShapeData(other) + self
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def _own(self):
+        '''
+        Readies the arrays to be written to, copying them if they are shared with another ShapeData and dropping
+        the cached bounds.
+        '''
+        self._bounds = None
+        self._radius = None
+        if self._shared:
+            self._points = array('d', self._points)
+            self._cvOffsets = array('l', self._cvOffsets)
+            self._knots = array('d', self._knots)
+            self._knotOffsets = array('l', self._knotOffsets)
+            self._degrees = array('l', self._degrees)
+            self._shared = False
+
+    def _index(self, index):
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('ShapeData index out of range: %s' % index)
+        return index
+
+    def append(self, curve):
+        '''
+        :param curve: A dict or CurveData with 'cvs', 'knots' and 'degree' keys.
+        '''
+        self._own()
+        self._degrees.append(int(curve['degree']))
+        self._cvOffsets.append(self._cvOffsets[-1])
+        self._knotOffsets.append(self._knotOffsets[-1])
+        self.setCVs(-1, curve['cvs'])
+        self.setKnots(-1, curve['knots'])
+
+    def extend(self, curves):
+        if curves is self:
+            curves = self.asList()
+        for curve in curves:
+            self.append(curve)
+
+    def insert(self, index, curve):
+        '''
+        Inserts a curve before the index, clamping the index to the ends like list.insert.
+        :param curve: A dict or CurveData with 'cvs', 'knots' and 'degree' keys.
+        '''
+        # Read the curve first, as a CurveData of this shape would move with the insert
+        cvs, knots, degree = list(curve['cvs']), list(curve['knots']), int(curve['degree'])
+        count = len(self)
+        index = min(max(index + count, 0) if index < 0 else index, count)
+        self._own()
+        self._degrees.insert(index, degree)
+        self._cvOffsets.insert(index + 1, self._cvOffsets[index])
+        self._knotOffsets.insert(index + 1, self._knotOffsets[index])
+        self.setCVs(index, cvs)
+        self.setKnots(index, knots)
+
+    def pop(self, index=-1):
+        '''
+        Removes a curve like list.pop.
+        :return: The removed curve as a plain dict.
+        '''
+        curve = dict(self[index])
+        del self[index]
+        return curve
+
+    def asList(self):
+        '''
+        :return: The curves as a list of plain dicts.
+        '''
+        return [dict(curve) for curve in self]
+
+    def getCVs(self, index):
+        points = self._points
+        index = self._index(index)
+        return [[points[i], points[i + 1], points[i + 2]]
+                for i in range(self._cvOffsets[index] * 3, self._cvOffsets[index + 1] * 3, 3)]
+
+    def setCVs(self, index, cvs):
+        index = self._index(index)
+        start, end = self._cvOffsets[index], self._cvOffsets[index + 1]
+        self._own()
+        self._points[start * 3:end * 3] = array('d', [value for cv in cvs for value in (cv[0], cv[1], cv[2])])
+        self._shift(self._cvOffsets, index, len(cvs) - (end - start))
+
+    def getKnots(self, index):
+        index = self._index(index)
+        return self._knots[self._knotOffsets[index]:self._knotOffsets[index + 1]].tolist()
+
+    def setKnots(self, index, knots):
+        index = self._index(index)
+        start, end = self._knotOffsets[index], self._knotOffsets[index + 1]
+        self._own()
+        self._knots[start:end] = array('d', knots)
+        self._shift(self._knotOffsets, index, len(knots) - (end - start))
+
+    def getDegree(self, index):
+        return self._degrees[self._index(index)]
+
+    def setDegree(self, index, degree):
+        self._own()
+        self._degrees[self._index(index)] = int(degree)
+
+    @staticmethod
+    def _shift(offsets, index, amount):
+        if amount:
+            for i in range(index + 1, len(offsets)):
+                offsets[i] += amount
 
     @property
     def cvs(self):
-        return [shape['cvs'] for shape in self]
+        return [self.getCVs(index) for index in range(len(self))]
 
     @cvs.setter
     def cvs(self, value):
-        for i, shape in enumerate(self):
-            shape['cvs'] = value[i]
+        for index, cvs in enumerate(value):
+            self.setCVs(index, cvs)
+
+    def getHash(self, tolerance=1e-6):
+        '''
+        Hashes the shape's content, so shapes matching to within the tolerance hash the same.
+        CVs and knots are snapped to multiples of the tolerance first, so values either side of a step still differ.
+        :param tolerance: The step CVs and knots are snapped to.
+        :return: A hex digest of the degrees, CVs and knots of every curve.
+        '''
+        digest = hashlib.sha1()
+        for values in (self._degrees, self._cvOffsets, self._knotOffsets):
+            digest.update(struct.pack('<%dq' % len(values), *values))
+        for values in (self._points, self._knots):
+            digest.update(struct.pack('<%dq' % len(values), *[int(round(value / tolerance)) for value in values]))
+        return digest.hexdigest()
+
+    def simplify(self, tolerance):
+        '''
+        Drops CVs that lie within the tolerance of the control polygon left once they are gone.
+        Linear curves keep the knots of the CVs they keep. Periodic and other higher degree curves get uniform knots,
+        and keep every CV if simplifying would leave too few for their degree.
+        :param tolerance: The furthest a dropped CV can be from the simplified control polygon.
+        :return: A new ShapeData and the furthest any dropped CV is from it.
+        '''
+        simplified = ShapeData()
+        deviation = 0.0
+        for index in range(len(self)):
+            cvs, knots, degree = self.getCVs(index), self.getKnots(index), self.getDegree(index)
+            periodic = degree > 1 and len(cvs) > degree * 2 and cvs[:degree] == cvs[-degree:]
+            points = cvs[:-degree] + cvs[:1] if periodic else cvs
+            keep, curve_deviation = _simplifyPolyline(points, tolerance)
+
+            if periodic:
+                keep = keep[:-1]
+                if len(keep) > degree:
+                    cvs = [cvs[i] for i in keep] + [cvs[i] for i in keep[:degree]]
+                    knots = [float(knot) for knot in range(1 - degree, len(keep) + degree)]
+                    deviation = max(deviation, curve_deviation)
+            elif degree == 1:
+                cvs = [cvs[i] for i in keep]
+                knots = [knots[i] for i in keep]
+                deviation = max(deviation, curve_deviation)
+            elif len(keep) > degree and len(keep) < len(cvs):
+                cvs = [cvs[i] for i in keep]
+                spans = len(cvs) - degree
+                knots = [0.0] * degree + [float(knot) for knot in range(1, spans)] + [float(spans)] * degree
+                deviation = max(deviation, curve_deviation)
+            simplified.append({'cvs': cvs, 'knots': knots, 'degree': degree})
+        return simplified, deviation
+
+    def buildLODs(self, tolerances):
+        '''
+        Simplifies the shape once per tolerance, giving progressively lighter levels of detail.
+        :param tolerances: The tolerance of each level, usually increasing.
+        :return: A list of each level's ShapeData and deviation.
+        '''
+        return [self.simplify(tolerance) for tolerance in tolerances]
+
+    def getCVCount(self):
+        return len(self._points) // 3
+
+    def getBounds(self):
+        '''
+        The bounds are cached until the CVs change, and transformCVs works out the new ones as it goes.
+        :return: The minimum and maximum corners of the box around every CV, or None if there are no CVs.
+        '''
+        if self._bounds is None:
+            points = self._points
+            if not points:
+                return None
+            xs, ys, zs = points[0::3], points[1::3], points[2::3]
+            self._bounds = ((min(xs), min(ys), min(zs)), (max(xs), max(ys), max(zs)))
+        return list(self._bounds[0]), list(self._bounds[1])
+
+    def getCenter(self):
+        '''
+        :return: The center of the bounds, or None if there are no CVs.
+        '''
+        bounds = self.getBounds()
+        if bounds is None:
+            return None
+        return [(low + high) * 0.5 for low, high in zip(*bounds)]
+
+    def getSize(self):
+        '''
+        :return: The width, height and depth of the bounds, or None if there are no CVs.
+        '''
+        bounds = self.getBounds()
+        if bounds is None:
+            return None
+        return [high - low for low, high in zip(*bounds)]
+
+    def getRadius(self):
+        '''
+        :return: The distance from the center of the bounds to the furthest CV, or None if there are no CVs.
+        '''
+        if self._radius is None:
+            center = self.getCenter()
+            if center is None:
+                return None
+            cx, cy, cz = center
+            points = self._points
+            self._radius = math.sqrt(max((x - cx) ** 2 + (y - cy) ** 2 + (z - cz) ** 2
+                                         for x, y, z in zip(points[0::3], points[1::3], points[2::3])))
+        return self._radius
+
+    def transformCVs(self, matrix, points=False):
+        '''
+        Multiplies the CVs of every curve by the matrix in one pass over the packed points, updating the bounds.
+        By default CVs are treated as vectors, like multiplying om.MVectors, so only the rotation and scale apply.
+        :param matrix: An om.MMatrix or 16 values in row order.
+        :param points: Whether to treat CVs as points instead, so the translation applies too.
+        '''
+        self._own()
+        if self._points:
+            self._bounds = _transformPacked(self._points, matrix, points)
+
+# Control colors by side and then role, as RGB in the 0-1 range
+colorPalette = {
+    'left': {'primary': (0.0, 0.2, 1.0), 'secondary': (0.3, 0.7, 1.0), 'detail': (0.6, 0.85, 1.0)},
+    'right': {'primary': (1.0, 0.0, 0.0), 'secondary': (1.0, 0.45, 0.45), 'detail': (1.0, 0.7, 0.7)},
+    'center': {'primary': (1.0, 0.85, 0.0), 'secondary': (1.0, 0.55, 0.0), 'detail': (1.0, 1.0, 0.6)},
+}
+
+
+# How far apart color components can be and still match, as float3 plugs read back with single precision
+colorTolerance = 1e-4
+
+
+def _isColor(value):
+    if isinstance(value, (str, unicode)):
+        return True
+    if len(value) == 2 and isinstance(value[0], (str, unicode)):
+        # Only a role name makes a pair, otherwise it is a color per item like ['left', 'right']
+        return value[1] in colorPalette.get(value[0], {})
+    return len(value) == 3 and all(isinstance(item, (int, long, float)) for item in value)
+
+
+def colorsMatch(first, second):
+    '''
+    :return: Whether two RGB colors match within colorTolerance, where None only matches None.
+    '''
+    if first is None or second is None:
+        return first is None and second is None
+    return all(abs(a - b) <= colorTolerance for a, b in zip(first, second))
+
+
+def _roundColor(color):
+    # Index colors are left as they are, RGB ones are rounded well within colorTolerance's reach
+    if color is None or color[0] == 'index':
+        return color
+    return tuple(round(value, 4) for value in color)
+
+
+def resolveColor(color):
+    '''
+    :param color: An RGB color, a side from colorPalette or a (side, role) pair naming a role of that side.
+    :return: The color as an RGB tuple.
+    '''
+    if isinstance(color, (str, unicode)):
+        color = (color, 'primary')
+    if isinstance(color[0], (str, unicode)):
+        side, role = color
+        assert side in colorPalette and role in colorPalette[side], 'Unknown palette color %s %s' % (side, role)
+        return colorPalette[side][role]
+    return (float(color[0]), float(color[1]), float(color[2]))
+
+
+def _resolveColors(colors, count):
+    '''
+    :param colors: One color for every item or a color per item, anything resolveColor takes.
+    :param count: The number of items.
+    :return: An RGB tuple per item.
+    '''
+    if _isColor(colors):
+        colors = [colors] * count
+    # Colors tend to repeat, so each distinct one is only resolved once
+    resolved = {}
+    for color in colors:
+        key = color if isinstance(color, (str, unicode)) else tuple(color)
+        if key not in resolved:
+            resolved[key] = resolveColor(key)
+    return [resolved[color if isinstance(color, (str, unicode)) else tuple(color)] for color in colors]
 
-    def transformCVs(self, matrix):
-        new_cvs = []
-        for cvs in self.cvs:
-            points = [om.MVector(cv) for cv in cvs]
-            points = [point * matrix for point in points]
-            new_cvs.append([list(point) for point in points])
-        self.cvs = new_cvs
 
 class Shape(Node):
 
+    __slots__ = ()
+
+    @classmethod
+    def setColors(cls, shapes, colors, skipMatching=True, batch=None, undoable=False):
+        '''
+        Colors any number of shapes in one batched write.
+        :param shapes: Shapes or shape names.
+        :param colors: One color for every shape or a color per shape, anything resolveColor takes.
+        :param skipMatching: Whether to leave out shapes already showing the color, which costs a read per shape.
+        :param batch: An AttributeBatch to queue onto instead of applying right away.
+        :param undoable: Whether to set the colors through cmds so they can be undone, at three commands per shape.
+            Batched writes are not recorded for undo, so this can't be combined with a batch.
+        :return: The number of shapes queued for a change.
+        '''
+        assert not (undoable and batch), 'Undoable colors are set through cmds and cannot be batched'
+        shapes = [shape if isinstance(shape, Shape) else Shape(str(shape)) for shape in shapes]
+        colors = _resolveColors(colors, len(shapes))
+        if skipMatching:
+            pairs = [(shape, color) for shape, color in zip(shapes, colors)
+                     if not colorsMatch(shape.getColor(), color)]
+        else:
+            pairs = list(zip(shapes, colors))
+        if undoable:
+            for shape, color in pairs:
+                cmds.setAttr(shape.name + '.overrideEnabled', True)
+                cmds.setAttr(shape.name + '.overrideRGBColors', True)
+                cmds.setAttr(shape.name + '.overrideColorRGB', *color)
+            return len(pairs)
+        with AttributeBatch.join(batch) as batch:
+            for shape, color in pairs:
+                shape.setColor(color, batch)
+        return len(pairs)
+
+    def getColor(self):
+        '''
+        :return: The override RGB color the shape is drawn with, or None if it has no RGB override.
+        '''
+        if not (self.attr('overrideEnabled').getBool() and self.attr('overrideRGBColors').getBool()):
+            return None
+        return self.attr('overrideColorRGB').getDouble3()
+
+    def _getColorKey(self):
+        # Index colors count too, so shapes only compare equal when they are drawn the same
+        if not self.attr('overrideEnabled').getBool():
+            return None
+        if self.attr('overrideRGBColors').getBool():
+            return self.attr('overrideColorRGB').getDouble3()
+        return ('index', self.attr('overrideColor').plug.asInt())
+
+    def _setColorKey(self, color, batch):
+        if color[0] != 'index':
+            self.setColor(color, batch)
+            return
+        batch.setBool(self.attr('overrideEnabled'), True)
+        batch.setBool(self.attr('overrideRGBColors'), False)
+        batch.setInt(self.attr('overrideColor'), color[1])
+
     def getCVs(self):
         return [list(point)[:3] for point in self.mFnNurbsCurve.cvPositions(om.MSpace.kTransform)]
 
@@ -1276,12 +2347,11 @@ class Shape(Node):
         shape_data['degree'] = self.getDegree()
         return shape_data
 
-    def setColor(self, color):
-        self.overrideEnabled.set(True)
-        self.overrideRGBColors.set(True)
-        self.overrideColorR.set(color[0])
-        self.overrideColorG.set(color[1])
-        self.overrideColorB.set(color[2])
+    def setColor(self, color, batch=None):
+        with AttributeBatch.join(batch) as batch:
+            batch.setBool(self.attr('overrideEnabled'), True)
+            batch.setBool(self.attr('overrideRGBColors'), True)
+            batch.setDouble3(self.attr('overrideColorRGB'), color)
 
     @property
     def mFnNurbsCurve(self):
@@ -1289,6 +2359,8 @@ class Shape(Node):
 
 class Transform(Node):
 
+    __slots__ = ()
+
     _name = 'Transform'
 
     @classmethod
@@ -1298,10 +2370,14 @@ class Transform(Node):
         return cls(node)
 
     def getParent(self, index=0):
+        if index == 0:
+            # The first parent is just this node's own path with the last node popped off
+            path = self.dagPath.pop()
+            return Transform.fromDagPath(path) if path.length() > 0 else None
         try:
-            parent = self._getName(self.mFnDagNode.parent(index))
-            if parent != 'world':
-                return Transform(parent)
+            parent = self.mFnDagNode.parent(index)
+            if not parent.hasFn(om.MFn.kWorld):
+                return Transform.fromMObject(parent)
             else:
                 return None
         except RuntimeError:
@@ -1326,7 +2402,12 @@ class Transform(Node):
             return self
 
     def getBufferAt(self, index):
-        parent = self.getParent(index)
+        # Buffers stack upwards, so the nth buffer is the nth parent as long as every parent below it is a buffer
+        parent = self.getParent()
+        for _ in range(index):
+            if not parent or not parent.hasAttr('_isBuffer'):
+                return None
+            parent = parent.getParent()
 
         if parent and parent.hasAttr('_isBuffer'):
             return parent
@@ -1335,9 +2416,9 @@ class Transform(Node):
 
     def getShapes(self):
         shapes = []
-        for index in range(self.dagPath.numberOfShapesDirectlyBelow()):
-            name = self._getName(self.dagPath.extendToShape(index).node())
-            shapes.append(Shape(name))
+        path = self._getDagPath()
+        for index in range(path.numberOfShapesDirectlyBelow()):
+            shapes.append(Shape.fromDagPath(om.MDagPath(path).extendToShape(index)))
         return shapes
 
     def addBuffer(self, name=None, suffix='BUF'):
@@ -1345,13 +2426,19 @@ class Transform(Node):
         name = '_'.join([name, suffix])
         buffer = Transform.create(name)
         buffer.addAttr('_isBuffer', at='message')
-        buffer.match(self.getTopBuffer())
-        pmc.parent(buffer, self.getTopBuffer().getParent())
-        pmc.parent(self.getTopBuffer(), buffer)
+        top = self.getTopBuffer()
+        buffer.match(top)
+        parent = top.getParent()
+        if parent is not None:
+            cmds.parent(buffer.name, parent.name)
+        cmds.parent(top.name, buffer.name)
         return buffer
 
     def match(self, target_node, translation=True, rotation=True):
-        target_transform = om.MFnTransform(self._getMDagPath(str(target_node)))
+        if isinstance(target_node, Node):
+            target_transform = om.MFnTransform(target_node.dagPath)
+        else:
+            target_transform = om.MFnTransform(self._getMDagPath(str(target_node)))
         matrix = om.MTransformationMatrix(om.MMatrix(cmds.xform(target_node, matrix=True, ws=1, q=True)))
         if translation:
             translation = om.MVector(target_transform.rotatePivot(om.MSpace.kWorld))
@@ -1383,31 +2470,35 @@ class Transform(Node):
         if rotation:
             self.setRotation(matrix.rotation(True), worldSpace)
 
-    def lockTransform(self, translate=False, rotate=False, scale=False, hide=False):
-        def lock(prefix):
-            for attr in ['x', 'y', 'z']:
-                self.attr(prefix + attr).lock()
-                if hide:
-                    self.attr(prefix + attr).hide()
-        if translate:
-            lock('t')
-        if rotate:
-            lock('r')
-        if scale:
-            lock('s')
-
-    def unlockTransform(self, translate=False, rotate=False, scale=False, hide=False):
-        def unlock(prefix):
-            for attr in ['x', 'y', 'z']:
-                self.attr(prefix + attr).unlock()
-                if hide:
-                    self.attr(prefix + attr).hide()
-        if translate:
-            unlock('t')
-        if rotate:
-            unlock('r')
-        if scale:
-            unlock('s')
+    def lockTransform(self, translate=False, rotate=False, scale=False, hide=False, batch=None):
+        with AttributeBatch.join(batch) as batch:
+            def lock(prefix):
+                for attr in ['x', 'y', 'z']:
+                    attribute = self.attr(prefix + attr)
+                    batch.lock(attribute)
+                    if hide:
+                        batch.hide(attribute)
+            if translate:
+                lock('t')
+            if rotate:
+                lock('r')
+            if scale:
+                lock('s')
+
+    def unlockTransform(self, translate=False, rotate=False, scale=False, hide=False, batch=None):
+        with AttributeBatch.join(batch) as batch:
+            def unlock(prefix):
+                for attr in ['x', 'y', 'z']:
+                    attribute = self.attr(prefix + attr)
+                    batch.unlock(attribute)
+                    if hide:
+                        batch.hide(attribute)
+            if translate:
+                unlock('t')
+            if rotate:
+                unlock('r')
+            if scale:
+                unlock('s')
 
     @property
     def mFnTransform(self):
@@ -1427,23 +2518,293 @@ class Transform(Node):
 
 
 class ControlCurve(Transform):
+    '''
+    A transform with nurbs curve shapes.
+    The wrapper remembers the shape data it last built or read, and keeps it in step with its own shape edits,
+    so sizing the shape does not have to read the CVs back from the scene.
+    Shape transforms can be deferred, collecting them into one matrix applied in a single pass over the CVs.
+    '''
+
+    __slots__ = ('_shapeData', '_pendingMatrix')
 
     _name = 'ControlCurve'
 
     @classmethod
-    def create(cls, name=None, shapeType='circle'):
+    def create(cls, name=None, shapeType='circle', instance=False, undoable=True):
+        '''
+        :param name: The name of the control.
+        :param shapeType: A preset or library shape name, ShapeData or a list of curve dicts.
+        :param instance: Whether to instance the shape nodes of an earlier control with the same uncolored shape
+            instead of creating new ones. The first control created this way provides the shapes for the rest.
+            Instancing goes through the API, so only the control's transform can be undone.
+        :param undoable: Whether the shapes can be undone, see addShape.
+        '''
         data = cls._getData(shapeType)
         name = name or cls._name
         node = ControlCurve(cmds.group(empty=True, name=name))
-        node.addShape(data)
+        node._shapeData = ShapeData()
+        if not instance:
+            node.addShape(data, undoable)
+            return node
+        data = data if isinstance(data, ShapeData) else ShapeData(data)
+        key = cls._instanceKey(data.getHash(), [None] * len(data))
+        sources = cls._findInstanceSource(key)
+        if sources is not None:
+            node._instanceShapes(sources)
+        else:
+            modifier = om.MDagModifier()
+            cls._addInstanceSource(key, node._createCurves(data, modifier))
+            modifier.doIt()
+        node._shapeData = ShapeData(data)
         return node
 
+    @classmethod
+    def createMany(cls, names, shapeType='circle', matrices=None, parents=None, colors=None, suffix='BUF',
+                   instance=False):
+        '''
+        Creates buffered controls in bulk. Every transform is created in one modifier pass, the shape names are
+        fixed in a second and the placements and colors are applied in a single AttributeBatch.
+        None of this is recorded for undo, create makes controls that can be undone. The colors, parents and
+        matrices are all checked before anything is created, so bad input leaves nothing behind.
+        :param names: The name of each control.
+        :param shapeType: The shape every control gets, anything create accepts.
+        :param matrices: An optional world matrix for each control, only its translation and rotation are used.
+        :param parents: An optional parent for each control's buffer, as a Node or name.
+        :param colors: An optional color for every control or a color for each, anything resolveColor takes.
+        :param suffix: The suffix of the buffer names.
+        :param instance: Whether controls sharing a color also share instanced shape nodes, like create.
+        :return: The new ControlCurves, in the order of the names.
+        '''
+        names = list(names)
+        if not names:
+            # cmds.addAttr would otherwise fall back on the selection
+            return []
+        data = cls._getData(shapeType)
+        matrices = matrices or [None] * len(names)
+        parents = parents or [None] * len(names)
+        if not colors:
+            colors = [None] * len(names)
+        elif _isColor(colors):
+            colors = [colors] * len(names)
+        count = len(names)
+        assert len(matrices) == len(parents) == len(colors) == count, 'Need a matrix, parent and color per name'
+
+        # Nothing created here can be undone, so the input is checked before the first doIt
+        colors = [resolveColor(color) if color is not None else None for color in colors]
+        matrices = [om.MMatrix(matrix) if matrix is not None else None for matrix in matrices]
+        # Parents are kept by name, which for Nodes costs a lookup, so each name is only taken once
+        parents = [str(parent) if parent is not None else None for parent in parents]
+        parentObjects = {}
+        for parent in parents:
+            if parent is not None and parent not in parentObjects:
+                parentObjects[parent] = Node(parent).mObject
+
+        modifier = om.MDagModifier()
+        created = []
+        for name, parent in zip(names, parents):
+            parentObject = om.MObject.kNullObj if parent is None else parentObjects[parent]
+            buffer = modifier.createNode('transform', parentObject)
+            modifier.renameNode(buffer, '_'.join([name, suffix]))
+            control = modifier.createNode('transform', buffer)
+            modifier.renameNode(control, name)
+            created.append((buffer, control))
+        modifier.doIt()
+
+        buffers = [Transform.fromMObject(buffer) for buffer, _ in created]
+        controls = [cls.fromMObject(control) for _, control in created]
+        cmds.addAttr([buffer.name for buffer in buffers], longName='_isBuffer', attributeType='message')
+
+        if instance:
+            data = data if isinstance(data, ShapeData) else ShapeData(data)
+            dataHash = data.getHash()
+        sources = {}
+        curves = []
+        modifier = om.MDagModifier()
+        for control, color in zip(controls, colors):
+            if instance:
+                key = cls._instanceKey(dataHash, [color] * len(data))
+                if key not in sources:
+                    sources[key] = cls._findInstanceSource(key)
+                if sources[key] is not None:
+                    # Instanced shapes already carry the color
+                    control._instanceShapes(sources[key])
+                    curves.append([])
+                    continue
+            created = control._createCurves(data, modifier)
+            curves.append(created)
+            if instance:
+                sources[key] = created
+                cls._addInstanceSource(key, created)
+        modifier.doIt()
+        for control in controls:
+            control._shapeData = ShapeData(data)
+
+        parentInverses = {}
+        with AttributeBatch() as batch:
+            for buffer, parent, matrix in zip(buffers, parents, matrices):
+                if matrix is None:
+                    continue
+                if parent is not None:
+                    inverse = parentInverses.get(parent)
+                    if inverse is None:
+                        inverse = parentInverses[parent] = Node(parent).dagPath.inclusiveMatrixInverse()
+                    matrix = matrix * inverse
+                transformation = om.MTransformationMatrix(matrix)
+                rotation = transformation.rotation()
+                batch.setDouble3(buffer.attr('translate'), transformation.translation(om.MSpace.kTransform))
+                batch.setDouble3(buffer.attr('rotate'), [rotation.x, rotation.y, rotation.z])
+            for shapes, color in zip(curves, colors):
+                if color is not None:
+                    for curve in shapes:
+                        Shape.fromMObject(curve).setColor(color, batch)
+        return controls
+
+    @staticmethod
+    def _instanceKey(dataHash, colors):
+        # Plug reads come back with single precision, so colors are rounded to match the ones passed in
+        return dataHash, tuple(_roundColor(tuple(color)) if color is not None else None for color in colors)
+
+    @classmethod
+    def _addInstanceSource(cls, key, shapes):
+        cls._instanceSources[key] = [om.MObjectHandle(shape) for shape in shapes]
+
+    @classmethod
+    def _findInstanceSource(cls, key):
+        '''
+        :return: The MObjects of the shapes registered for the shape hash and colors, or None if there are none
+            or they no longer match.
+        '''
+        handles = cls._instanceSources.get(key)
+        if handles is None:
+            return None
+        if all(handle.isValid() for handle in handles):
+            # Shared shapes can still be edited directly in the viewport or through cmds, so always check them
+            shapes = [Shape.fromMObject(handle.object()) for handle in handles]
+            data = ShapeData([shape.getData() for shape in shapes])
+            if cls._instanceKey(data.getHash(), [shape._getColorKey() for shape in shapes]) == key:
+                return [shape.mObject for shape in shapes]
+        del cls._instanceSources[key]
+        return None
+
+    def _instanceShapes(self, shapes):
+        fn = om.MFnDagNode(self.mObject)
+        for shape in shapes:
+            fn.addChild(shape, om.MFnDagNode.kNextPos, True)
+
+    def shareShapes(self):
+        '''
+        Swaps this control's shapes for instances of an earlier control's shapes with the same curves and colors.
+        When there are none yet, this control's shapes are the ones later controls will share.
+        :return: The number of shape nodes removed.
+        '''
+        shapes = self.shapes
+        if not shapes:
+            return 0
+        data = self.getShapeData()
+        key = self._instanceKey(data.getHash(), [shape._getColorKey() for shape in shapes])
+        sources = self._findInstanceSource(key)
+        if sources is None:
+            self._addInstanceSource(key, [shape.mObject for shape in shapes])
+            return 0
+        handles = set(om.MObjectHandle(source).hashCode() for source in sources)
+        if all(shape.mObjectHandle.hashCode() in handles for shape in shapes):
+            return 0
+        # removeChild only takes this control's instance away, shapes nobody else shares have to be deleted
+        fn = om.MFnDagNode(self.mObject)
+        owned = []
+        for shape in shapes:
+            if om.MFnDagNode(shape.mObject).isInstanced(False):
+                fn.removeChild(shape.mObject)
+            else:
+                owned.append(shape.name)
+        if owned:
+            cmds.delete(owned)
+        self._instanceShapes(sources)
+        self._shapeData = data
+        return len(shapes)
+
+    def expandShapes(self):
+        '''
+        Gives the control its own copy of every shape it shares with other controls through instancing, keeping
+        the colors. Edits made through the control call this first, so they never reach the other controls.
+        :return: The number of shapes copied.
+        '''
+        return self._expandShapes(self.shapes)[1]
+
+    def _expandShapes(self, shapes):
+        '''
+        Expands the shapes if any are shared.
+        :param shapes: Shapes of this control, any that are not shared are left as they are.
+        :return: The control's shapes afterwards and the number that were copied.
+        '''
+        # Only shapes with parents of their own to fall back on are shared, an instanced ancestor doesn't count
+        shared = [shape for shape in shapes if om.MFnDagNode(shape.mObject).isInstanced(False)]
+        if not shared:
+            return shapes, 0
+        fn = om.MFnDagNode(self.mObject)
+        modifier = om.MDagModifier()
+        with AttributeBatch() as batch:
+            for shape in shared:
+                color = shape._getColorKey()
+                copy = self._createCurves([shape.getData()], modifier)[0]
+                fn.removeChild(shape.mObject)
+                if color is not None:
+                    Shape.fromMObject(copy)._setColorKey(color, batch)
+        modifier.doIt()
+        shapes = self.shapes
+        if len(shared) < len(shapes):
+            # The copies go after any shapes that were not shared, so the cached order no longer holds
+            self._shapeData = None
+        return shapes, len(shared)
+
+    def _createCurves(self, data, modifier, undoable=False):
+        '''
+        Creates each curve of the data straight under this control, queuing the renames of the new shapes onto
+        the modifier for the caller to apply.
+        :param undoable: Whether to build the curves through cmds so they can be undone, at several commands per
+            curve. Otherwise they are created with MFnNurbsCurve, which is much faster but not recorded for undo.
+        :return: The MObjects of the new shapes.
+        '''
+        name = self.nodeName + 'Shape'
+        if undoable:
+            curves = []
+            for shape in data:
+                transform = cmds.curve(p=shape['cvs'], k=shape['knots'], d=shape['degree'])
+                curve = cmds.listRelatives(transform, shapes=True, fullPath=True)[0]
+                curve = cmds.parent(curve, self.name, shape=True, relative=True)[0]
+                cmds.delete(transform)
+                curves.append(self._getMObject(curve))
+                cmds.rename(curve, name)
+            return curves
+        parent = self.mObject
+        fn = om.MFnNurbsCurve()
+        curves = []
+        for shape in data:
+            curve = fn.create(om.MPointArray(shape['cvs']), om.MDoubleArray(shape['knots']), shape['degree'],
+                              om.MFnNurbsCurve.kOpen, False, False, parent)
+            modifier.renameNode(curve, name)
+            curves.append(curve)
+        return curves
+
+    # Shape nodes shared through instancing, by the hash of the shape and the color of each curve
+    _instanceSources = {}
+
+    def _reset(self):
+        Transform._reset(self)
+        self._shapeData = None
+        self._pendingMatrix = None
+
     @classmethod
     def _getData(self, shapeType):
         if isinstance(shapeType, str):
-            assert shapeType in ShapeData.__dict__, 'Could not find shape data for %s' % shapeType
-            return getattr(ShapeData, shapeType)()
-        elif isinstance(shapeType, list):
+            # Imported here since shape_library builds on this module
+            import shape_library
+            if shapeType in shape_library.registry:
+                return shape_library.registry.load(shapeType)
+            preset = getattr(ShapeData, shapeType, None)
+            assert getattr(preset, '_isPreset', False), 'Could not find shape data for %s' % shapeType
+            return preset()
+        elif isinstance(shapeType, (list, ShapeData)):
             return shapeType
         raise TypeError('Invalid shape type %s' % shapeType)
 
@@ -1457,27 +2818,159 @@ class ControlCurve(Transform):
         self.setShape(data)
 
     def getShapeData(self):
-        return ShapeData([shape.getData() for shape in self.shapes])
-
-    def setShape(self, shape):
+        data = ShapeData([shape.getData() for shape in self.shapes])
+        self._shapeData = ShapeData(data)
+        return data
+
+    def _getCachedShapeData(self):
+        if self._shapeData is None:
+            self.getShapeData()
+        return self._shapeData
+
+    def fitToSize(self, size):
+        '''
+        Scales the shape about the pivot so its largest dimension matches the size.
+        Measures the shape this wrapper last built or read, so edits made to the CVs by other means are not seen
+        until getShapeData is called. Transforms deferred so far are taken into account.
+        :param size: The size to fit to.
+        :return: The scale that was applied.
+        '''
+        data = self._getCachedShapeData()
+        if self._pendingMatrix is not None and self._pendingMatrix != om.MMatrix():
+            # The cache doesn't hold the deferred transforms yet, so they are measured on a copy
+            data = ShapeData(data)
+            data.transformCVs(self._pendingMatrix, points=True)
+        extent = max(data.getSize() or [0.0])
+        assert extent > 0, 'Shape has no size to fit: %s' % self._node
+        factor = float(size) / extent
+        self.scaleShape([factor] * 3)
+        return factor
+
+    def fitToJointLength(self, joint, ratio=1.0):
+        '''
+        Fits the shape to a joint's length, the distance to its first child joint.
+        :param joint: The joint, as a name, PyNode or Node.
+        :param ratio: The fraction of the joint's length the shape should span.
+        :return: The scale that was applied.
+        '''
+        children = cmds.listRelatives(str(joint), children=True, type='joint', fullPath=True)
+        assert children, 'Joint has no child joint to measure: %s' % joint
+        length = math.sqrt(sum(value * value for value in cmds.getAttr(children[0] + '.translate')[0]))
+        return self.fitToSize(length * ratio)
+
+    def setShape(self, shape, undoable=True):
+        '''
+        Replaces the shape with the data, keeping the existing shape nodes wherever it can.
+        Curves matching the CV count, degree and knots of the shape in their place only have their CVs rewritten,
+        other curves are rebuilt in place, so shape names, colors and connections carry over either way.
+        Curves beyond the existing shapes are added and shapes beyond the data are deleted.
+        :param shape: Anything create accepts.
+        :param undoable: Whether the change can be undone. CVs are then rewritten through cmds as well, and curves
+            are added as addShape does. Expanding shapes shared through instancing still goes through the API.
+        :return: The number of shapes updated in place, rebuilt, added and removed.
+        '''
         data = self._getData(shape)
-        for shape in self.shapes:
-            cmds.delete(shape, shape=True)
-        self.addShape(data)
-
-    def addShape(self, shape):
+        curves = list(data)
+        shapes = self._expandShapes(self.shapes)[0]
+        update, rebuild = [], []
+        for shape, curve in zip(shapes, curves):
+            fn = shape.mFnNurbsCurve
+            if (fn.numCVs == len(curve['cvs']) and fn.degree == curve['degree']
+                    and list(fn.knots()) == [float(knot) for knot in curve['knots']]):
+                update.append((shape, fn, curve))
+            else:
+                rebuild.append((shape, curve))
+        if undoable:
+            # CV writes through the API are not recorded for undo, so these are replaced through cmds instead
+            replace = [(shape, curve) for shape, _, curve in update] + rebuild
+        else:
+            for _, fn, curve in update:
+                fn.setCVPositions(om.MPointArray(curve['cvs']), om.MSpace.kTransform)
+                fn.updateCurve()
+            replace = rebuild
+        removed = shapes[len(curves):]
+        if replace or removed:
+            with UndoOnError():
+                for shape, curve in replace:
+                    cmds.curve(shape.name, replace=True, p=curve['cvs'], k=curve['knots'], d=curve['degree'])
+                if removed:
+                    cmds.delete([shape.name for shape in removed])
+        added = curves[len(shapes):]
+        if added:
+            modifier = om.MDagModifier()
+            self._createCurves(added, modifier, undoable)
+            modifier.doIt()
+        self._shapeData = ShapeData(data)
+        return {'updated': min(len(shapes), len(curves)) - len(rebuild), 'rebuilt': len(rebuild),
+                'added': len(added), 'removed': len(removed)}
+
+    def addShape(self, shape, undoable=True):
+        '''
+        Adds the curves of the shape under the control.
+        :param shape: Anything create accepts.
+        :param undoable: Whether to build the curves through cmds so they can be undone. Turning this off creates
+            them through the API instead, which is several times faster for scripts building many controls.
+        '''
         data = self._getData(shape)
-        for shape in data:
-            curve = Transform(cmds.curve(p=shape['cvs'], k=shape['knots'], d=shape['degree']))
-            cmds.parent(curve.getShapes()[0], self._node, shape=True, r=True)
-            cmds.delete(curve)
+        modifier = om.MDagModifier()
+        self._createCurves(data, modifier, undoable)
+        modifier.doIt()
+        if self._shapeData is not None:
+            if len(self._shapeData):
+                self._shapeData.extend(data)
+            else:
+                self._shapeData = ShapeData(data)
+
+    def simplifyShape(self, tolerance):
+        '''
+        Replaces the shape with its simplified version if that drops any CVs.
+        :param tolerance: The furthest a dropped CV can be from the simplified control polygon.
+        :return: The CV counts before and after along with the deviation.
+        '''
+        data = self.getShapeData()
+        simplified, deviation = data.simplify(tolerance)
+        if simplified.getCVCount() < data.getCVCount():
+            self.setShape(simplified)
+        return data.getCVCount(), simplified.getCVCount(), deviation
 
     def getColor(self):
         return self.shapes[0].overrideColorRGB.get()
 
-    def setColor(self, color):
-        for shape in self.shapes:
-            shape.setColor(color)
+    def setColor(self, color, batch=None):
+        self.setColors([self], [color], False, batch)
+
+    @classmethod
+    def setColors(cls, controls, colors, skipMatching=True, batch=None, undoable=False):
+        '''
+        Colors the shapes of any number of controls in one batched write.
+        :param controls: ControlCurves.
+        :param colors: One color for every control or a color per control, anything resolveColor takes.
+        :param skipMatching: Whether to leave out shapes already showing the color. Shapes shared through
+            instancing that already show it are always left out, so they stay shared.
+        :param batch: An AttributeBatch to queue onto instead of applying right away.
+        :param undoable: Whether the color changes can be undone, see Shape.setColors. Expanding shared shapes
+            still goes through the API.
+        :return: The number of shapes queued for a change.
+        '''
+        controls = list(controls)
+        shapes, shapeColors = [], []
+        for control, color in zip(controls, _resolveColors(colors, len(controls))):
+            changing = control.shapes
+            if skipMatching:
+                changing = [shape for shape in changing if not colorsMatch(shape.getColor(), color)]
+            shared = [shape for shape in changing if om.MFnDagNode(shape.mObject).isInstanced(False)]
+            if shared:
+                # Shared shapes are only copied when their color changes, ones already showing it stay shared
+                if not skipMatching:
+                    shared = [shape for shape in shared if not colorsMatch(shape.getColor(), color)]
+                control._expandShapes(shared)
+                # The copies keep the old color, so they are picked out from the control's shapes the same way
+                changing = [shape for shape in control.shapes if not om.MFnDagNode(shape.mObject).isInstanced(False)]
+                if skipMatching:
+                    changing = [shape for shape in changing if not colorsMatch(shape.getColor(), color)]
+            shapes.extend(changing)
+            shapeColors.extend([color] * len(changing))
+        return Shape.setColors(shapes, shapeColors, False, batch, undoable)
 
     def translateShape(self, translation, worldSpace=False):
         matrix = om.MTransformationMatrix()
@@ -1501,19 +2994,100 @@ class ControlCurve(Transform):
         self.scaleShape(vector, worldSpace)
 
     def transformShape(self, matrix, worldSpace=False):
+        '''
+        Transforms the CVs of every shape, or adds the matrix to the pending one while shape transforms are deferred.
+        :param matrix: The om.MMatrix to transform by.
+        :param worldSpace: Whether to transform along the world axes rather than the control's own.
+            The control's orientation is taken at the time of the call, even when deferred.
+        '''
+        if worldSpace:
+            rotation_matrix = om.MTransformationMatrix(self.dagPath.inclusiveMatrix()).rotation(True).asMatrix()
+            matrix = rotation_matrix * matrix * rotation_matrix.inverse()
+        if self._pendingMatrix is not None:
+            self._pendingMatrix = self._pendingMatrix * matrix
+            return
+        self._applyShapeMatrix(matrix)
+
+    @classmethod
+    def transformShapes(cls, controls, matrix, worldSpace=False):
+        '''
+        Transforms the shapes of several controls, such as the current selection, in one undo chunk.
+        :param controls: ControlCurves.
+        :param matrix: The om.MMatrix to transform by.
+        :param worldSpace: Whether to transform along the world axes rather than each control's own.
+        '''
         with UndoOnError():
-            for shape in self.shapes:
-                cvs = [om.MPoint(cv) for cv in shape.getCVs()]
-                rotation_matrix = om.MTransformationMatrix(om.MMatrix(self.worldMatrix.get())).rotation(True).asMatrix()
-                new_cvs = cvs
-                if worldSpace:
-                    new_cvs = [cv * rotation_matrix for cv in new_cvs]
-                new_cvs = [cv * matrix for cv in new_cvs]
-                if worldSpace:
-                    new_cvs = [cv * rotation_matrix.inverse() for cv in new_cvs]
-                shape.setCVs(new_cvs)
-                shape.updateCurve()
+            for control in controls:
+                control.transformShape(matrix, worldSpace)
+
+    def _applyShapeMatrix(self, matrix):
+        # Every shape's CVs are read into one packed array, transformed in a single pass and written back per shape
+        space = om.MSpace.kTransform
+        fns = [shape.mFnNurbsCurve for shape in self._expandShapes(self.shapes)[0]]
+        if not fns:
+            return
+        offsets = array('l', [0])
+        values = array('d')
+        for fn in fns:
+            positions = fn.cvPositions(space)
+            values.extend([value for point in positions for value in (point.x, point.y, point.z)])
+            offsets.append(offsets[-1] + len(positions))
+        bounds = _transformPacked(values, matrix, points=True)
+        with UndoOnError():
+            for index, fn in enumerate(fns):
+                fn.setCVPositions(om.MPointArray([om.MPoint(values[i], values[i + 1], values[i + 2])
+                                                  for i in range(offsets[index] * 3, offsets[index + 1] * 3, 3)]),
+                                  space)
+                fn.updateCurve()
+        data = self._shapeData
+        if data is not None and data._cvOffsets == offsets:
+            # The CVs just read are the current ones, so the cache takes them over rather than being transformed
+            data._own()
+            data._points = values
+            data._bounds = bounds
+        elif data is not None:
+            self._shapeData = None
+
+    def deferShapeTransforms(self):
+        '''
+        Defers shape transforms for the duration of a with block, applying them together once it exits.
+        Nested blocks join the outer one. Transforms still pending when an exception escapes are dropped.
+        '''
+        return _DeferredShapeTransforms(self)
+
+    def flushShapeTransforms(self):
+        '''
+        Applies the shape transforms deferred so far in a single pass. Further transforms are deferred again
+        until the with block exits.
+        '''
+        matrix = self._pendingMatrix
+        if matrix is None or matrix == om.MMatrix():
+            return
+        self._pendingMatrix = om.MMatrix()
+        self._applyShapeMatrix(matrix)
 
     @property
     def shapes(self):
         return self.getShapes()
+
+
+class _DeferredShapeTransforms(object):
+
+    def __init__(self, control):
+        self._control = control
+        self._outermost = False
+
+    def __enter__(self):
+        if self._control._pendingMatrix is None:
+            self._control._pendingMatrix = om.MMatrix()
+            self._outermost = True
+        return self._control
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._outermost:
+            return
+        try:
+            if exc_type is None:
+                self._control.flushShapeTransforms()
+        finally:
+            self._control._pendingMatrix = None
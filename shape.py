@@ -1,6 +1,7 @@
 import pymel.core as pmc
 import pymel.core.datatypes as dt
 import pprint
+import nodes
 
 class Shape(object):
 
@@ -27,10 +28,9 @@ class Shape(object):
 
     @classmethod
     def set_color(cls, shapes, color=dt.Color(0,0,1)):
-        for shape in shapes:
-            shape.overrideEnabled.set(True)
-            shape.overrideRGBColors.set(True)
-            shape.overrideColorRGB.set(color)
+        # Colors set through the UI need to be undoable, so they skip the batched write
+        nodes.Shape.setColors([shape.name() for shape in shapes], [color[0], color[1], color[2]],
+                              undoable=True)
 
     @property
     def data(self):
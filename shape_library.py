@@ -0,0 +1,491 @@
+'''
+Reads and writes libraries of control shapes in a compact binary format, and finds shapes across directories of them.
+
+A library file holds any number of named ShapeData. It starts with a header and an index of every shape's name and
+where its data sits in the file, followed by the packed arrays of each shape. Libraries are memory-mapped when
+opened, and only the index is read up front, so loading a shape by name never touches the rest of the file.
+
+All values are little-endian:
+
+    header      magic 'MLSH', version (uint16), reserved (uint16), shape count (uint32)
+    index       per shape: name length (uint16), utf-8 name, data offset (uint64), data size (uint32),
+                and since version 2, CV count (uint32) and bounds (six float64, minimum then maximum corner)
+    data        per shape: curve count, CV count and knot count (uint32 each),
+                degrees (int32 per curve), CV offsets and knot offsets (int32 per curve plus one),
+                CV positions (three float64 per CV), knots (float64 per knot)
+
+The registry indexes every library in the directories listed in the MAYALIB_SHAPE_PATH environment variable, and
+ControlCurve.create looks shape names up in it before falling back to the ShapeData presets.
+
+Control shapes can also be dumped as JSON lines, one record per control, which are written and read back
+incrementally so dumps of whole rigs run in bounded memory and can be diffed line by line.
+'''
+
+from array import array
+import collections
+import glob
+import json
+import mmap
+import os
+import struct
+import tempfile
+import sys
+
+from backend import cmds
+from nodes import ControlCurve, ShapeData
+
+MAGIC = b'MLSH'
+VERSION = 2
+EXTENSION = '.mlsh'
+
+_header = struct.Struct('<4sHHI')
+_nameLength = struct.Struct('<H')
+_entries = {1: struct.Struct('<QI'), 2: struct.Struct('<QII6d')}
+_counts = struct.Struct('<III')
+
+ShapeInfo = collections.namedtuple('ShapeInfo', ['name', 'path', 'cvs', 'bounds'])
+
+
+def _toBytes(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes() if hasattr(values, 'tobytes') else values.tostring()
+
+
+def _fromBytes(typecode, data):
+    values = array(typecode)
+    if hasattr(values, 'frombytes'):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _packShape(data):
+    return b''.join([
+        _counts.pack(len(data._degrees), len(data._points) // 3, len(data._knots)),
+        _toBytes(array('i', data._degrees)),
+        _toBytes(array('i', data._cvOffsets)),
+        _toBytes(array('i', data._knotOffsets)),
+        _toBytes(data._points),
+        _toBytes(data._knots),
+    ])
+
+
+def _unpackShape(buffer, offset):
+    curves, cvs, knots = _counts.unpack_from(buffer, offset)
+    offset += _counts.size
+    arrays = []
+    for typecode, count, size in (('i', curves, 4), ('i', curves + 1, 4), ('i', curves + 1, 4),
+                                  ('d', cvs * 3, 8), ('d', knots, 8)):
+        arrays.append(_fromBytes(typecode, buffer[offset:offset + count * size]))
+        offset += count * size
+    degrees, cvOffsets, knotOffsets, points, knots = arrays
+    return ShapeData.fromArrays(points, array('l', cvOffsets), knots, array('l', knotOffsets), array('l', degrees))
+
+
+def writeLibrary(path, shapes):
+    '''
+    Writes shapes to a library file, replacing anything already there.
+    Shapes with identical data are stored once, with every name pointing at the same data.
+    :param path: The file to write.
+    :param shapes: A dict of names to ShapeData, or lists of curve dicts, or an iterable of name and shape pairs.
+    :return: The number of shapes written.
+    '''
+    items = shapes.items() if hasattr(shapes, 'items') else shapes
+    names = []
+    payloads = []
+    summaries = []
+    for name, data in items:
+        data = data if isinstance(data, ShapeData) else ShapeData(data)
+        bounds = data.getBounds() or ([0.0] * 3, [0.0] * 3)
+        names.append(name.encode('utf-8') if not isinstance(name, bytes) else name)
+        payloads.append(_packShape(data))
+        summaries.append((data.getCVCount(), bounds[0] + bounds[1]))
+
+    entry = _entries[VERSION]
+    offset = _header.size + sum(_nameLength.size + len(name) + entry.size for name in names)
+    offsets = {}
+    index = []
+    unique = []
+    for name, payload, (cvs, bounds) in zip(names, payloads, summaries):
+        if payload not in offsets:
+            offsets[payload] = offset
+            unique.append(payload)
+            offset += len(payload)
+        index.append(_nameLength.pack(len(name)) + name + entry.pack(offsets[payload], len(payload), cvs, *bounds))
+
+    # Open ShapeLibrary instances map the file, so it is never rewritten in place. The new file is written alongside
+    # and renamed over it, which leaves existing maps reading the old one.
+    handle, temp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(handle, 'wb') as library:
+            library.write(_header.pack(MAGIC, VERSION, 0, len(names)))
+            library.write(b''.join(index))
+            for payload in unique:
+                library.write(payload)
+        # mkstemp only gives the owner access, libraries are usually shared so the usual permissions are kept
+        if os.path.exists(path):
+            mode = os.stat(path).st_mode & 0o777
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(temp, mode)
+        if os.name == 'nt' and os.path.exists(path):
+            # Windows will not rename over an existing file
+            os.remove(path)
+        os.rename(temp, path)
+    except Exception:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    return len(names)
+
+
+class ShapeLibrary(object):
+    '''
+    A library file opened for reading.
+    Only the header and index are read when opening, each shape is unpacked from the mapped file when asked for.
+    '''
+
+    def __init__(self, path):
+        '''
+        :param path: The library file to open.
+        '''
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index = self._readIndex()
+        except Exception:
+            self.close()
+            raise
+
+    def _readIndex(self):
+        buffer = self._buffer
+        assert len(buffer) >= _header.size, 'Not a shape library: %s' % self.path
+        magic, version, _, count = _header.unpack_from(buffer, 0)
+        assert magic == MAGIC, 'Not a shape library: %s' % self.path
+        assert version in _entries, 'Unsupported shape library version %d: %s' % (version, self.path)
+
+        entry = _entries[version]
+        index = {}
+        offset = _header.size
+        for _ in range(count):
+            length, = _nameLength.unpack_from(buffer, offset)
+            offset += _nameLength.size
+            name = buffer[offset:offset + length].decode('utf-8')
+            offset += length
+            index[name] = entry.unpack_from(buffer, offset)
+            offset += entry.size
+        return index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __getitem__(self, name):
+        return self.load(name)
+
+    def names(self):
+        '''
+        :return: The names of every shape in the library, sorted.
+        '''
+        return sorted(self._index)
+
+    def size(self, name):
+        '''
+        :return: The number of bytes the named shape's data takes up in the file.
+        '''
+        return self._index[name][1]
+
+    def load(self, name):
+        '''
+        Unpacks a single shape, without reading any of the others.
+        :param name: The name the shape was stored under.
+        :return: A new ShapeData.
+        '''
+        if name not in self._index:
+            raise KeyError('Shape library %s has no shape: %s' % (self.path, name))
+        return _unpackShape(self._buffer, self._index[name][0])
+
+    def info(self, name):
+        '''
+        :return: A ShapeInfo with the named shape's CV count and bounds, read from the index when the file has them.
+        '''
+        entry = self._index[name]
+        if len(entry) > 2:
+            return ShapeInfo(name, self.path, entry[2], (list(entry[3:6]), list(entry[6:9])))
+        data = self.load(name)
+        return ShapeInfo(name, self.path, data.getCVCount(), data.getBounds())
+
+    def close(self):
+        if getattr(self, '_buffer', None) is not None:
+            self._buffer.close()
+            self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _payloadSize(data):
+    return _counts.size + 4 * (3 * len(data._degrees) + 2) + 8 * (len(data._points) + len(data._knots))
+
+
+class ShapeIndex(object):
+    '''
+    Keeps each distinct shape once, keyed by its content hash, with any number of names referencing it.
+    Shapes whose CVs and knots match to within the tolerance count as the same shape, and the first one added is kept.
+    '''
+
+    def __init__(self, tolerance=1e-6):
+        '''
+        :param tolerance: How far apart CVs and knots can be for shapes to still count as the same.
+        '''
+        self.tolerance = tolerance
+        self.shapes = collections.OrderedDict()
+        self.references = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.references)
+
+    def __contains__(self, name):
+        return name in self.references
+
+    def add(self, name, data):
+        '''
+        :param name: The name to reference the shape by, such as the control it came from.
+        :param data: A ShapeData or a list of curve dicts.
+        :return: The shape's content hash.
+        '''
+        data = data if isinstance(data, ShapeData) else ShapeData(data)
+        key = data.getHash(self.tolerance)
+        if key not in self.shapes:
+            self.shapes[key] = data
+        self.references[name] = key
+        return key
+
+    def addControls(self, controls):
+        '''
+        Adds the shapes of every control, referenced by the controls' names.
+        :param controls: ControlCurves.
+        '''
+        for control in controls:
+            self.add(control.name, control.getShapeData())
+
+    def get(self, name):
+        '''
+        :return: A copy of the shape stored for the name.
+        '''
+        return ShapeData(self.shapes[self.references[name]])
+
+    def stats(self):
+        '''
+        :return: The number of references and unique shapes, and how many bytes storing each shape once saves
+            over storing every reference in full.
+        '''
+        sizes = dict((key, _payloadSize(data)) for key, data in self.shapes.items())
+        total = sum(sizes[key] for key in self.references.values())
+        unique = sum(sizes.values())
+        return {'references': len(self.references), 'unique': len(self.shapes), 'bytes': total,
+                'uniqueBytes': unique, 'savedBytes': total - unique,
+                'saved': (total - unique) / float(total) if total else 0.0}
+
+    def writeLibrary(self, path):
+        '''
+        Writes a library with an entry for every reference, storing each unique shape once.
+        :return: The number of entries written.
+        '''
+        return writeLibrary(path, [(name, self.shapes[key]) for name, key in self.references.items()])
+
+
+class ShapeRegistry(object):
+    '''
+    Finds shapes by name across every library in a list of directories.
+    Only the library indexes are read when the directories are scanned, shapes are loaded the first time they are
+    asked for and the most recently used ones are kept. Where several libraries hold the same name, the first
+    directory listed wins.
+    '''
+
+    def __init__(self, paths=(), cacheSize=64):
+        '''
+        :param paths: The directories to look for library files in.
+        :param cacheSize: How many loaded shapes to keep, 0 or less to keep none.
+        '''
+        self.paths = list(paths)
+        self.cacheSize = cacheSize
+        self._index = None
+        self._libraries = {}
+        self._cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def index(self):
+        '''
+        :return: A dict of every shape name to its ShapeInfo, scanning the directories the first time.
+        '''
+        if self._index is None:
+            self.refresh()
+        return self._index
+
+    def addPath(self, path):
+        self.paths.append(path)
+        self._index = None
+
+    def refresh(self):
+        '''
+        Rescans the directories, picking up libraries that were added, changed or removed.
+        '''
+        self._close()
+        index = {}
+        for directory in self.paths:
+            for path in sorted(glob.glob(os.path.join(directory, '*' + EXTENSION))):
+                with ShapeLibrary(path) as library:
+                    for name in library.names():
+                        if name not in index:
+                            index[name] = library.info(name)
+        self._index = index
+
+    def names(self):
+        return sorted(self.index)
+
+    def info(self, name):
+        return self.index[name]
+
+    def load(self, name):
+        '''
+        :param name: The name of a shape in one of the libraries.
+        :return: A copy of the shape, free to modify.
+        '''
+        data = self._cache.pop(name, None)
+        if data is None:
+            self.misses += 1
+            data = self._library(self.index[name].path).load(name)
+            if self.cacheSize <= 0:
+                # Nothing is kept, so the caller can have the loaded copy
+                return data
+            while len(self._cache) >= self.cacheSize:
+                self._cache.popitem(last=False)
+        else:
+            self.hits += 1
+        self._cache[name] = data
+        return ShapeData(data)
+
+    def _library(self, path):
+        library = self._libraries.get(path)
+        if library is None:
+            library = self._libraries[path] = ShapeLibrary(path)
+        return library
+
+    def stats(self):
+        '''
+        :return: The cache hit and miss counts along with the hit rate.
+        '''
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'rate': self.hits / float(total) if total else 0.0}
+
+    def clear(self):
+        '''
+        Empties the cache, closes any open library files and resets the counts.
+        '''
+        self._close()
+        self.hits = 0
+        self.misses = 0
+
+    def _close(self):
+        for library in self._libraries.values():
+            library.close()
+        self._libraries = {}
+        self._cache.clear()
+
+
+registry = ShapeRegistry(path for path in os.environ.get('MAYALIB_SHAPE_PATH', '').split(os.pathsep) if path)
+
+
+def iterControlRecords(controls):
+    '''
+    Reads the shapes of each control only as its record is asked for.
+    :param controls: ControlCurves.
+    :return: A generator of {'name', 'curves'} dicts, one per control.
+    '''
+    for control in controls:
+        yield {'name': control.name, 'curves': control.getShapeData().asList()}
+
+
+def writeRecords(stream, records):
+    '''
+    Writes each record as a line of JSON, with sorted keys so dumps diff cleanly.
+    :param stream: A file open for writing.
+    :param records: An iterable of JSON serializable dicts.
+    :return: The number of records written.
+    '''
+    count = 0
+    for record in records:
+        stream.write(json.dumps(record, sort_keys=True, separators=(',', ':')) + '\n')
+        count += 1
+    return count
+
+
+def readRecords(stream):
+    '''
+    Reads records written by writeRecords one line at a time.
+    :param stream: A file open for reading.
+    :return: A generator of the control name and ShapeData of each record.
+    '''
+    for line in stream:
+        if line.strip():
+            record = json.loads(line)
+            yield record['name'], ShapeData(record['curves'])
+
+
+def exportControls(path, controls):
+    '''
+    Dumps the shapes of every control to a JSON lines file.
+    :param path: The file to write.
+    :param controls: ControlCurves.
+    :return: The number of controls written.
+    '''
+    with open(path, 'w') as stream:
+        return writeRecords(stream, iterControlRecords(controls))
+
+
+def importControls(path, create=False):
+    '''
+    Applies the shapes in a JSON lines dump to the controls of the same name.
+    :param path: The file to read.
+    :param create: Whether to create controls missing from the scene, otherwise their records are skipped.
+    :return: The number of controls updated or created.
+    '''
+    count = 0
+    with open(path) as stream:
+        for name, data in readRecords(stream):
+            if cmds.objExists(name):
+                ControlCurve(name).setShape(data)
+            elif create:
+                ControlCurve.create(name, shapeType=data)
+            else:
+                continue
+            count += 1
+    return count